@@ -1,11 +1,80 @@
-from fastapi import APIRouter
-from . import datasets, experiments, jobs, metrics, stats, comparison
+"""
+API routers. include_routers() mounts them all at import time, or, in fast-boot mode (serverless cold
+starts), mounts placeholders that import a router module on the first request under one of its URL
+prefixes, so a cold request only pays for the routers it uses. Generating the OpenAPI schema loads them all.
+"""
+import importlib
+from typing import Iterable, Tuple
+from fastapi import APIRouter, FastAPI
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from app import boot
 
-api_router = APIRouter()
+# (module, include prefix, tags, URL prefixes it serves below the API prefix)
+ROUTERS: Tuple[Tuple[str, str, list, Tuple[str, ...]], ...] = (
+    ("datasets", "/datasets", ["datasets"], ("/datasets",)),
+    ("experiments", "/experiments", ["experiments"], ("/experiments",)),
+    ("jobs", "/jobs", ["jobs"], ("/jobs/",)),
+    ("metrics", "", ["metrics"], ("/jobs/", "/metrics/")),
+    ("stats", "", ["stats"], ("/stats/",)),
+    ("comparison", "", ["comparison"], ("/experiments/compare",)),
+)
 
-api_router.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
-api_router.include_router(experiments.router, prefix="/experiments", tags=["experiments"])
-api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
-api_router.include_router(metrics.router, prefix="", tags=["metrics"])
-api_router.include_router(stats.router, prefix="", tags=["stats"])
-api_router.include_router(comparison.router, prefix="", tags=["comparison"])
+
+def _router(module: str) -> APIRouter:
+    return importlib.import_module(f"{__name__}.{module}").router
+
+
+def build_api_router() -> APIRouter:
+    api_router = APIRouter()
+    for module, prefix, tags, _ in ROUTERS:
+        api_router.include_router(_router(module), prefix=prefix, tags=tags)
+    return api_router
+
+
+class LazyRouter(BaseRoute):
+    """Placeholder route: on its first match, includes the real router in the app and re-dispatches."""
+
+    def __init__(self, app: FastAPI, api_prefix: str, module: str, prefix: str, tags: list, paths: Iterable[str]):
+        self.app = app
+        self.module = module
+        self.prefix = api_prefix + prefix
+        self.tags = tags
+        self.paths = tuple(api_prefix + p for p in paths)
+        self.loaded = False
+
+    def matches(self, scope) -> Tuple[Match, dict]:
+        if scope["type"] in ("http", "websocket") and scope["path"].startswith(self.paths):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    def load(self):
+        # Runs on the event loop without awaiting, so concurrent first requests cannot load twice
+        if self.loaded:
+            return
+        self.loaded = True
+        with boot.timed_import(f"{__name__}.{self.module}"):
+            self.app.include_router(_router(self.module), prefix=self.prefix, tags=self.tags)
+        self.app.router.routes.remove(self)
+
+    async def handle(self, scope, receive, send):
+        self.load()
+        await self.app.router(scope, receive, send)
+
+
+def include_routers(app: FastAPI, api_prefix: str, lazy: bool = False):
+    if not lazy:
+        app.include_router(build_api_router(), prefix=api_prefix)
+        return
+    placeholders = [LazyRouter(app, api_prefix, *spec) for spec in ROUTERS]
+    app.router.routes.extend(placeholders)
+    openapi = app.openapi
+
+    def openapi_with_all_routes():
+        for placeholder in placeholders:
+            placeholder.load()
+        return openapi()
+
+    app.openapi = openapi_with_all_routes
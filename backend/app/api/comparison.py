@@ -1,48 +1,54 @@
+import asyncio
+from typing import Dict, List
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import Client
-from app.supabase_client import get_supabase
+from app.repositories import FINISHED_STATUSES, ROLLUP_METRICS, Repositories, get_repositories
 from app.schemas.api import ComparisonRequest, ComparisonResponse, ComparisonData
+from app.services.rollups import get_rollups_for_jobs
 
 router = APIRouter()
 
 
 @router.post("/experiments/compare", response_model=ComparisonResponse)
-def compare_experiments(
+async def compare_experiments(
     request: ComparisonRequest,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
-    comparison_data = []
-    for exp_id in request.experiment_ids:
-        exp_res = supabase.table("experiments").select("*").eq("id", exp_id).maybe_single().execute()
-        if not exp_res or not getattr(exp_res, "data", None):
+    exp_ids = list(dict.fromkeys(request.experiment_ids))
+    # Only real metric columns are projected (also keeps arbitrary input out of the select list)
+    metric_names = [m for m in dict.fromkeys(request.metrics) if m in ROLLUP_METRICS]
+
+    experiments, latest_jobs = await asyncio.gather(
+        repos.experiments.get_many(exp_ids),
+        repos.jobs.latest_for_experiments(exp_ids),
+    )
+    for exp_id in exp_ids:
+        if exp_id not in experiments:
             raise HTTPException(status_code=404, detail=f"Experiment {exp_id} not found")
-        experiment = exp_res.data
 
-        job_res = (
-            supabase.table("training_jobs")
-            .select("*")
-            .eq("experiment_id", exp_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
+    job_ids = [latest_jobs[e]["id"] for e in exp_ids if e in latest_jobs]
+    series: Dict[str, List[dict]] = {}
+    rollups: Dict[str, Dict[str, dict]] = {}
+    if job_ids and metric_names:
+        series, rollups = await asyncio.gather(
+            repos.metrics.series_for_jobs(job_ids, metric_names),
+            get_rollups_for_jobs(repos.metrics, job_ids, metric_names),
         )
-        jobs = (job_res.data if job_res else None) or []
-        if not jobs:
-            continue
-        job = jobs[0]
+        # Finished jobs past their retention window only have downsampled tiers (app.services.retention)
+        compacted = [j["id"] for j in latest_jobs.values() if j["id"] not in series and j["status"] in FINISHED_STATUSES]
+        if compacted:
+            series.update(await repos.metrics.tier_series(compacted, metric_names))
 
-        metrics_res = (
-            supabase.table("metrics")
-            .select("*")
-            .eq("job_id", job["id"])
-            .order("epoch")
-            .order("step")
-            .execute()
-        )
-        metrics = (metrics_res.data if metrics_res else None) or []
+    comparison_data = []
+    for exp_id in exp_ids:
+        job = latest_jobs.get(exp_id)
+        if not job:
+            continue
+        experiment = experiments[exp_id]
+        metrics = series.get(job["id"], [])
+        job_rollups = rollups.get(job["id"], {})
 
         metrics_dict = {}
-        for metric_name in request.metrics:
+        for metric_name in metric_names:
             values = []
             data_points = []
             for m in metrics:
@@ -50,7 +56,15 @@ def compare_experiments(
                 if value is not None:
                     values.append(float(value))
                     data_points.append({"epoch": m["epoch"], "value": float(value)})
-            if values:
+            rollup = job_rollups.get(metric_name)
+            if rollup:
+                metrics_dict[metric_name] = {
+                    "min": float(rollup["min"]),
+                    "max": float(rollup["max"]),
+                    "final": float(rollup["last"]),
+                    "data_points": data_points,
+                }
+            elif values:
                 metrics_dict[metric_name] = {
                     "min": min(values),
                     "max": max(values),
@@ -1,8 +1,11 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional, List
-from app.supabase_client import get_supabase
+from app.config import settings
+from app.repositories import Repositories, get_repositories
+from app.services.cache import cache
+from app.utils.conditional import etag_matches, make_etag, not_modified, set_etag
+from app.utils.pagination import COUNT_PATTERN, decode_cursor, is_backwards, keyset_page, query_count_method
 from app.schemas.dataset import DatasetCreate, DatasetResponse, DatasetListResponse
 
 router = APIRouter()
@@ -25,33 +28,38 @@ def _dataset_row_to_response(row: dict) -> dict:
 
 
 @router.get("", response_model=DatasetListResponse)
-def get_datasets(
+async def get_datasets(
     modality: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("created_at"),
     order: Optional[str] = Query("desc"),
-    supabase: Client = Depends(get_supabase),
+    cursor: Optional[str] = Query(None, description="next_cursor/prev_cursor from a previous page; overrides page"),
+    count: str = Query("exact", pattern=COUNT_PATTERN, description="How to compute pagination.total"),
+    repos: Repositories = Depends(get_repositories),
 ):
-    q = supabase.table("datasets").select("*", count="exact")
-    if modality:
-        q = q.eq("modality", modality)
-    if sort_by == "name":
-        q = q.order("name", desc=(order == "desc"))
-    elif sort_by == "size_bytes":
-        q = q.order("size_bytes", desc=(order == "desc"))
-    else:
-        q = q.order("created_at", desc=(order == "desc"))
-    offset = (page - 1) * page_size
-    q = q.range(offset, offset + page_size - 1)
-    res = q.execute()
-    rows = (res.data if res else None) or []
-    total = getattr(res, "count", None) if res and hasattr(res, "count") else None
-    if total is None:
-        count_res = supabase.table("datasets").select("id", count="exact").limit(1).execute()
-        total = getattr(count_res, "count", None) if count_res else None
-    if total is None:
-        total = len(rows)
+    if sort_by not in ("name", "size_bytes"):
+        sort_by = "created_at"
+    order = "asc" if order == "asc" else "desc"
+    decoded = decode_cursor(cursor, sort_by, order) if cursor else None
+
+    count_key = f"count:datasets:{modality or ''}"
+    cached_total = cache.get(count_key) if count == "cached" else None
+    rows, row_count = await repos.datasets.list(
+        modality,
+        sort_by,
+        order == "desc",
+        decoded,
+        page_size,
+        offset=(page - 1) * page_size,
+        count=query_count_method(count, cached_total),
+    )
+    rows, next_cursor, prev_cursor = keyset_page(
+        rows, page_size, sort_by, order, decoded, is_backwards(decoded), has_previous=page > 1
+    )
+    total = cached_total if cached_total is not None else row_count
+    if count == "cached" and cached_total is None and total is not None:
+        cache.set(count_key, total, settings.count_cache_ttl_seconds, tables=("datasets",))
 
     data = [_dataset_row_to_response(r) for r in rows]
     return DatasetListResponse(
@@ -60,41 +68,55 @@ def get_datasets(
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size if total else 0,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
         },
     )
 
 
+def _dataset_etag(row: dict) -> str:
+    return make_etag("dataset", row["id"], row.get("updated_at") or row.get("created_at"))
+
+
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-def get_dataset(
+async def get_dataset(
     dataset_id: str,
-    supabase: Client = Depends(get_supabase),
+    request: Request,
+    response: Response,
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = supabase.table("datasets").select("*").eq("id", dataset_id).maybe_single().execute()
-    if not res or not getattr(res, "data", None):
+    if request.headers.get("if-none-match"):
+        probe = await repos.datasets.version(dataset_id)
+        if probe and etag_matches(request, etag := _dataset_etag(probe)):
+            return not_modified(etag)
+    row = await repos.datasets.get(dataset_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    return DatasetResponse(**_dataset_row_to_response(res.data))
+    set_etag(response, _dataset_etag(row))
+    return DatasetResponse(**_dataset_row_to_response(row))
 
 
 @router.post("", response_model=DatasetResponse, status_code=201)
-def create_dataset(
+async def create_dataset(
     dataset: DatasetCreate,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
     payload = dataset.model_dump()
     payload["id"] = str(uuid.uuid4())
     payload["metadata"] = payload.get("metadata") or {}
-    res = supabase.table("datasets").insert(payload).execute()
-    if not res or not getattr(res, "data", None) or not res.data:
+    row = await repos.datasets.create(payload)
+    if not row:
         raise HTTPException(status_code=500, detail="Insert failed")
-    row = res.data[0] if isinstance(res.data, list) else res.data
+    cache.invalidate_tables("datasets")
     return DatasetResponse(**_dataset_row_to_response(row))
 
 
 @router.delete("/{dataset_id}", status_code=204)
-def delete_dataset(
+async def delete_dataset(
     dataset_id: str,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
-    supabase.table("datasets").delete().eq("id", dataset_id).execute()
+    await repos.datasets.delete(dataset_id)
+    cache.invalidate_tables("datasets")
     return None
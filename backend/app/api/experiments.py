@@ -1,9 +1,9 @@
+import asyncio
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from supabase import Client
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
-from app.supabase_client import get_supabase
 from app.schemas.experiment import (
     ExperimentCreate,
     ExperimentResponse,
@@ -11,7 +11,12 @@ from app.schemas.experiment import (
     JobStartResponse,
     JobCancelResponse,
 )
-from app.services.training import TrainingService
+from app.config import settings
+from app.repositories import Repositories, get_repositories
+from app.services.cache import cache
+from app.services.training import TrainingService, job_owner
+from app.utils.conditional import etag_matches, make_etag, not_modified, set_etag
+from app.utils.pagination import COUNT_PATTERN, decode_cursor, is_backwards, keyset_page, query_count_method
 
 router = APIRouter()
 
@@ -35,8 +40,20 @@ def _exp_row_to_response(exp: dict, dataset_name: Optional[str] = None, current_
     }
 
 
+def _current_job(latest: Optional[dict]) -> Optional[dict]:
+    """current_job from the experiment's latest_job projection (only while that job is running)."""
+    if not latest or latest.get("status") != "running":
+        return None
+    return {
+        "id": latest["id"],
+        "progress": float(latest.get("progress") or 0),
+        "current_epoch": int(latest.get("current_epoch") or 0),
+        "latest_metrics": {k: float(v) for k, v in (latest.get("latest_metrics") or {}).items() if v is not None},
+    }
+
+
 @router.get("", response_model=ExperimentListResponse)
-def get_experiments(
+async def get_experiments(
     status: Optional[str] = Query(None),
     dataset_id: Optional[str] = Query(None),
     tags: Optional[List[str]] = Query(None),
@@ -44,45 +61,37 @@ def get_experiments(
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("created_at"),
     order: Optional[str] = Query("desc"),
-    supabase: Client = Depends(get_supabase),
+    cursor: Optional[str] = Query(None, description="next_cursor/prev_cursor from a previous page; overrides page"),
+    count: str = Query("exact", pattern=COUNT_PATTERN, description="How to compute pagination.total"),
+    repos: Repositories = Depends(get_repositories),
 ):
-    q = supabase.table("experiments").select("*, datasets(name), training_jobs(*)", count="exact")
-    if status:
-        q = q.eq("status", status)
-    if dataset_id:
-        q = q.eq("dataset_id", dataset_id)
-    if sort_by == "name":
-        q = q.order("name", desc=(order == "desc"))
-    else:
-        q = q.order("created_at", desc=(order == "desc"))
-    offset = (page - 1) * page_size
-    q = q.range(offset, offset + page_size - 1)
-    res = q.execute()
-    rows = (res.data if res else None) or []
-    total = getattr(res, "count", None) if res else None
-    if total is None:
-        total = len(rows)
-
-    experiment_responses = []
-    for exp in rows:
-        dataset_name = None
-        if isinstance(exp.get("datasets"), dict):
-            dataset_name = exp["datasets"].get("name")
-        elif isinstance(exp.get("datasets"), list) and exp["datasets"]:
-            dataset_name = exp["datasets"][0].get("name") if isinstance(exp["datasets"][0], dict) else None
-        jobs = exp.get("training_jobs") or []
-        current_job = None
-        if jobs:
-            latest = max(jobs, key=lambda j: j.get("created_at") or "")
-            if latest.get("status") == "running":
-                current_job = {
-                    "id": latest["id"],
-                    "progress": float(latest.get("progress") or 0),
-                    "current_epoch": int(latest.get("current_epoch") or 0),
-                    "latest_metrics": {},
-                }
-        exp_clean = {k: v for k, v in exp.items() if k not in ("datasets", "training_jobs")}
-        experiment_responses.append(ExperimentResponse(**_exp_row_to_response(exp_clean, dataset_name, current_job)))
+    sort_by = "name" if sort_by == "name" else "created_at"
+    order = "asc" if order == "asc" else "desc"
+    decoded = decode_cursor(cursor, sort_by, order) if cursor else None
+
+    count_key = f"count:experiments:{status or ''}:{dataset_id or ''}"
+    cached_total = cache.get(count_key) if count == "cached" else None
+    rows, row_count = await repos.experiments.list(
+        status,
+        dataset_id,
+        sort_by,
+        order == "desc",
+        decoded,
+        page_size,
+        offset=(page - 1) * page_size,
+        count=query_count_method(count, cached_total),
+    )
+    rows, next_cursor, prev_cursor = keyset_page(
+        rows, page_size, sort_by, order, decoded, is_backwards(decoded), has_previous=page > 1
+    )
+    total = cached_total if cached_total is not None else row_count
+    if count == "cached" and cached_total is None and total is not None:
+        cache.set(count_key, total, settings.count_cache_ttl_seconds, tables=("experiments",))
+
+    experiment_responses = [
+        ExperimentResponse(**_exp_row_to_response(exp, exp.get("dataset_name"), _current_job(exp.get("latest_job"))))
+        for exp in rows
+    ]
 
     return ExperimentListResponse(
         data=experiment_responses,
@@ -90,50 +99,44 @@ def get_experiments(
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size if total else 0,
+            "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
         },
     )
 
 
+def _experiment_etag(exp: dict) -> Optional[str]:
+    # experiments.updated_at is bumped on every write, including latest_job refreshes from job progress
+    if "updated_at" not in exp:
+        return None  # Column not migrated yet (see supabase/schema.sql): no validator
+    return make_etag("experiment", exp["id"], exp["updated_at"], exp.get("status"))
+
+
 @router.get("/{experiment_id}", response_model=ExperimentResponse)
-def get_experiment(
+async def get_experiment(
     experiment_id: str,
-    supabase: Client = Depends(get_supabase),
+    request: Request,
+    response: Response,
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = (
-        supabase.table("experiments")
-        .select("*, datasets(name), training_jobs(*)")
-        .eq("id", experiment_id)
-        .maybe_single()
-        .execute()
-    )
-    if not res or not getattr(res, "data", None):
+    if request.headers.get("if-none-match"):
+        probe = await repos.experiments.version(experiment_id)
+        etag = _experiment_etag(probe) if probe else None
+        if etag and etag_matches(request, etag):
+            return not_modified(etag)
+    exp = await repos.experiments.get(experiment_id)
+    if not exp:
         raise HTTPException(status_code=404, detail="Experiment not found")
-    exp = res.data
-    dataset_name = None
-    if isinstance(exp.get("datasets"), dict):
-        dataset_name = exp["datasets"].get("name")
-    elif isinstance(exp.get("datasets"), list) and exp["datasets"]:
-        dataset_name = exp["datasets"][0].get("name") if isinstance(exp["datasets"][0], dict) else None
-    jobs = exp.get("training_jobs") or []
-    current_job = None
-    if jobs:
-        latest = max(jobs, key=lambda j: j.get("created_at") or "")
-        if latest.get("status") == "running":
-            current_job = {
-                "id": latest["id"],
-                "progress": float(latest.get("progress") or 0),
-                "current_epoch": int(latest.get("current_epoch") or 0),
-                "latest_metrics": {},
-            }
-    exp_clean = {k: v for k, v in exp.items() if k not in ("datasets", "training_jobs")}
-    return ExperimentResponse(**_exp_row_to_response(exp_clean, dataset_name, current_job))
+    if etag := _experiment_etag(exp):
+        set_etag(response, etag)
+    return ExperimentResponse(**_exp_row_to_response(exp, exp.get("dataset_name"), _current_job(exp.get("latest_job"))))
 
 
 @router.post("", response_model=ExperimentResponse, status_code=201)
-def create_experiment(
+async def create_experiment(
     experiment: ExperimentCreate,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
     payload = experiment.model_dump()
     payload["id"] = str(uuid.uuid4())
@@ -141,27 +144,27 @@ def create_experiment(
     payload["config"] = payload.get("config") or {}
     if "tags" in payload and payload["tags"] is None:
         payload["tags"] = []
-    res = supabase.table("experiments").insert(payload).execute()
-    if not res or not getattr(res, "data", None) or not res.data:
+    insert = repos.experiments.create(payload)
+    if payload.get("dataset_id"):
+        # The dataset name lookup does not depend on the insert; run both at once
+        row, ds = await asyncio.gather(insert, repos.datasets.get(payload["dataset_id"]))
+    else:
+        row, ds = await insert, None
+    if not row:
         raise HTTPException(status_code=500, detail="Insert failed")
-    row = res.data[0] if isinstance(res.data, list) else res.data
-    dataset_name = None
-    if row.get("dataset_id"):
-        ds = supabase.table("datasets").select("name").eq("id", row["dataset_id"]).maybe_single().execute()
-        if ds and getattr(ds, "data", None):
-            dataset_name = ds.data.get("name")
-    return ExperimentResponse(**_exp_row_to_response(row, dataset_name, None))
+    cache.invalidate_tables("experiments")
+    return ExperimentResponse(**_exp_row_to_response(row, ds.get("name") if ds else None, None))
 
 
 @router.post("/{experiment_id}/start", response_model=JobStartResponse)
-def start_experiment(
+async def start_experiment(
     experiment_id: str,
-    supabase: Client = Depends(get_supabase),
+    priority: int = Query(0, description="Higher runs first among queued jobs"),
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = supabase.table("experiments").select("*").eq("id", experiment_id).maybe_single().execute()
-    if not res or not getattr(res, "data", None):
+    experiment = await repos.experiments.get(experiment_id)
+    if not experiment:
         raise HTTPException(status_code=404, detail="Experiment not found")
-    experiment = res.data
 
     if experiment["status"] not in ["created", "queued"]:
         raise HTTPException(
@@ -174,23 +177,26 @@ def start_experiment(
     num_epochs = hp.get("num_epochs", 10)
     job_id = str(uuid.uuid4())
 
-    supabase.table("training_jobs").insert({
-        "id": job_id,
-        "experiment_id": experiment_id,
-        "status": "pending",
-        "total_epochs": num_epochs,
-        "progress": 0,
-        "current_epoch": 0,
-    }).execute()
-
     now = datetime.utcnow().isoformat()
-    supabase.table("experiments").update({
-        "status": "queued",
-        "started_at": now,
-    }).eq("id", experiment_id).execute()
+    await asyncio.gather(
+        repos.jobs.create({
+            "id": job_id,
+            "experiment_id": experiment_id,
+            "status": "pending",
+            "total_epochs": num_epochs,
+            "progress": 0,
+            "current_epoch": 0,
+            "priority": priority,
+        }),
+        repos.experiments.update(experiment_id, {
+            "status": "queued",
+            "started_at": now,
+        }),
+    )
+    cache.invalidate_tables("experiments", "training_jobs")
 
     training_service = TrainingService()
-    training_service.start_training(job_id, config, supabase)
+    training_service.start_training(job_id, config, owner=job_owner(experiment), priority=priority)
 
     return JobStartResponse(
         experiment_id=experiment_id,
@@ -201,20 +207,13 @@ def start_experiment(
 
 
 @router.post("/{experiment_id}/cancel", response_model=JobCancelResponse)
-def cancel_experiment(
+async def cancel_experiment(
     experiment_id: str,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = (
-        supabase.table("experiments")
-        .select("*, training_jobs(*)")
-        .eq("id", experiment_id)
-        .maybe_single()
-        .execute()
-    )
-    if not res or not getattr(res, "data", None):
+    experiment = await repos.experiments.get(experiment_id, with_jobs=True)
+    if not experiment:
         raise HTTPException(status_code=404, detail="Experiment not found")
-    experiment = res.data
 
     if experiment["status"] not in ["queued", "running"]:
         raise HTTPException(
@@ -223,17 +222,29 @@ def cancel_experiment(
         )
 
     now = datetime.utcnow().isoformat()
-    supabase.table("experiments").update({
-        "status": "cancelled",
-        "completed_at": now,
-    }).eq("id", experiment_id).execute()
-
-    for job in (experiment.get("training_jobs") or []):
-        if job.get("status") == "running":
-            supabase.table("training_jobs").update({
+    active_job_ids = [
+        job["id"] for job in (experiment.get("jobs") or []) if job.get("status") in ("pending", "running")
+    ]
+    updates = [
+        repos.experiments.update(experiment_id, {
+            "status": "cancelled",
+            "completed_at": now,
+        })
+    ]
+    if active_job_ids:
+        updates.append(
+            repos.jobs.update_many(active_job_ids, {
                 "status": "cancelled",
                 "completed_at": now,
-            }).eq("id", job["id"]).execute()
+            })
+        )
+    await asyncio.gather(*updates)
+
+    training_service = TrainingService()
+    for job_id in active_job_ids:
+        # Publishing the cancel signal may hit Redis; keep it off the event loop
+        await run_in_threadpool(training_service.cancel_job, job_id)
+    cache.invalidate_tables("experiments", "training_jobs")
 
     return JobCancelResponse(
         experiment_id=experiment_id,
@@ -243,12 +254,11 @@ def cancel_experiment(
 
 
 @router.delete("/{experiment_id}", status_code=204)
-def delete_experiment(
+async def delete_experiment(
     experiment_id: str,
-    supabase: Client = Depends(get_supabase),
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = supabase.table("experiments").select("id").eq("id", experiment_id).maybe_single().execute()
-    if not res or not getattr(res, "data", None):
+    if not await repos.experiments.delete(experiment_id):
         raise HTTPException(status_code=404, detail="Experiment not found")
-    supabase.table("experiments").delete().eq("id", experiment_id).execute()
+    cache.invalidate_tables("experiments", "training_jobs")
     return None
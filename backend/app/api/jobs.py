@@ -1,20 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
-from supabase import Client
-from app.supabase_client import get_supabase
-from app.schemas.job import TrainingJobResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.repositories import Repositories, get_repositories
+from app.schemas.job import TrainingJobResponse, SchedulerStats
+from app.services.training import TrainingService
+from app.utils.conditional import etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter()
 
+# Everything a running job changes moves at least one of these
+JOB_VERSION_COLUMNS = ("status", "progress", "current_epoch", "completed_at", "error_message")
+
+
+def job_etag(job: dict) -> str:
+    return make_etag("job", job["id"], *(job.get(c) for c in JOB_VERSION_COLUMNS))
+
+
+@router.get("/scheduler/stats", response_model=SchedulerStats)
+async def get_scheduler_stats():
+    """Queue depth, worker utilisation and queue wait times for the training scheduler."""
+    return SchedulerStats(**TrainingService().scheduler.stats())
+
 
 @router.get("/{job_id}", response_model=TrainingJobResponse)
-def get_job(
+async def get_job(
     job_id: str,
-    supabase: Client = Depends(get_supabase),
+    request: Request,
+    response: Response,
+    repos: Repositories = Depends(get_repositories),
 ):
-    res = supabase.table("training_jobs").select("*").eq("id", job_id).maybe_single().execute()
-    if not res or not getattr(res, "data", None):
+    if request.headers.get("if-none-match"):
+        probe = await repos.jobs.version(job_id, JOB_VERSION_COLUMNS)
+        if probe and etag_matches(request, etag := job_etag(probe)):
+            return not_modified(etag)
+    j = await repos.jobs.get(job_id)
+    if not j:
         raise HTTPException(status_code=404, detail="Job not found")
-    j = res.data
+    set_etag(response, job_etag(j))
     return TrainingJobResponse(
         id=j["id"],
         experiment_id=j["experiment_id"],
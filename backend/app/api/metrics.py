@@ -1,38 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
-from supabase import Client
-from typing import Optional, List
-from app.supabase_client import get_supabase
+import asyncio
+import importlib.util
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Tuple
+from app.repositories import Repositories, get_repositories
 from app.schemas.metric import MetricResponse, MetricsResponse, MetricSummary
+from app.services.metric_export import EXPORT_COLUMNS, stream_arrow, stream_ndjson, stream_parquet
+from app.services.rollups import get_job_rollups, variance
 from app.services.training import TrainingService
+from app.utils.conditional import etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter()
 
 
+async def _downsample_job_metrics(
+    repos: Repositories,
+    job_id: str,
+    start_epoch: Optional[int],
+    end_epoch: Optional[int],
+    max_points: int,
+    method: str,
+) -> Tuple[List[dict], int]:
+    """Return at most max_points rows preserving the loss curve's shape, plus the full series length."""
+    # The database pre-selects each bucket's min/max (MinMaxLTTB for lttb: ~4x candidates), so only
+    # O(max_points) rows are transferred; the final selection runs vectorized here.
+    buckets = max_points * 2 if method == "lttb" else max(1, (max_points - 2) // 2)
+    rows, total_points = await repos.metrics.downsample(job_id, buckets, start_epoch, end_epoch, "loss")
+    if not rows:
+        return [], 0
+    from app.utils.downsampling import downsample_rows  # NumPy is loaded on first use (cold starts)
+
+    return downsample_rows(rows, max_points, method, x=[r["point_index"] for r in rows]), total_points
+
+
+async def _compacted_job_metrics(
+    repos: Repositories,
+    job_id: str,
+    start_epoch: Optional[int],
+    end_epoch: Optional[int],
+    step: int,
+    max_points: Optional[int],
+    method: str,
+) -> Tuple[List[dict], int]:
+    """Rows from the finest retention tier (app.services.retention) of a job whose raw metrics were compacted."""
+    rows = (await repos.metrics.tier_series([job_id], start_epoch=start_epoch, end_epoch=end_epoch)).get(job_id, [])
+    if max_points and len(rows) > max_points:
+        from app.utils.downsampling import downsample_rows
+
+        return downsample_rows(rows, max_points, method), len(rows)
+    return rows if max_points else rows[::step], len(rows)
+
+
+async def _metrics_version(repos: Repositories, job_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """Job progress and the newest (epoch, step): both move whenever metrics are appended."""
+    return await asyncio.gather(
+        repos.jobs.version(job_id, ("status", "progress", "current_epoch")),
+        repos.metrics.last_point(job_id),
+    )
+
+
+def _metrics_etag(request: Request, job: dict, last: Optional[dict]) -> str:
+    # The query string is part of the representation (range, sampling, downsampling)
+    return make_etag(
+        "metrics",
+        job["id"],
+        sorted(request.query_params.multi_items()),
+        job.get("status"),
+        job.get("progress"),
+        job.get("current_epoch"),
+        last and (last["epoch"], last["step"]),
+    )
+
+
 @router.get("/jobs/{job_id}/metrics", response_model=MetricsResponse)
-def get_job_metrics(
+async def get_job_metrics(
     job_id: str,
+    request: Request,
+    response: Response,
     start_epoch: Optional[int] = Query(0),
     end_epoch: Optional[int] = Query(None),
     step: int = Query(1, ge=1),
-    supabase: Client = Depends(get_supabase),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample to at most this many points"),
+    downsample: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams rows in constant memory"),
+    repos: Repositories = Depends(get_repositories),
 ):
-    job_res = supabase.table("training_jobs").select("id").eq("id", job_id).maybe_single().execute()
-    if not job_res or not getattr(job_res, "data", None):
-        raise HTTPException(status_code=404, detail="Job not found")
+    if format == "ndjson":
+        if max_points:
+            raise HTTPException(status_code=400, detail="max_points is not supported with format=ndjson")
+        if not await repos.jobs.existing([job_id]):
+            raise HTTPException(status_code=404, detail="Job not found")
+        return StreamingResponse(
+            stream_ndjson(repos.metrics, job_id, start_epoch, end_epoch, step), media_type="application/x-ndjson"
+        )
+
+    if request.headers.get("if-none-match"):
+        job, last = await _metrics_version(repos, job_id)
+        if job and etag_matches(request, etag := _metrics_etag(request, job, last)):
+            return not_modified(etag)
 
-    q = supabase.table("metrics").select("*").eq("job_id", job_id).gte("epoch", start_epoch).order("epoch").order("step")
-    if end_epoch is not None:
-        q = q.lte("epoch", end_epoch)
-    res = q.execute()
-    all_rows = (res.data if res else None) or []
+    async def load_series() -> Tuple[List[dict], int]:
+        if max_points:
+            rows, total = await _downsample_job_metrics(repos, job_id, start_epoch, end_epoch, max_points, downsample)
+        else:
+            all_rows = await repos.metrics.series(job_id, start_epoch, end_epoch)
+            rows, total = [all_rows[i] for i in range(0, len(all_rows), step)], len(all_rows)
+        if rows:
+            return rows, total
+        return await _compacted_job_metrics(repos, job_id, start_epoch, end_epoch, step, max_points, downsample)
 
-    metrics_sampled = [all_rows[i] for i in range(0, len(all_rows), step)]
+    # Existence/version check, series and rollups are independent: one round trip of latency instead of three
+    (job, last), (metrics_sampled, total_points), rollups = await asyncio.gather(
+        _metrics_version(repos, job_id),
+        load_series(),
+        get_job_rollups(repos.metrics, job_id, start_epoch=start_epoch, end_epoch=end_epoch),
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    set_etag(response, _metrics_etag(request, job, last))
 
-    if metrics_sampled:
+    if rollups.get("loss"):
+        loss, accuracy = rollups["loss"], rollups.get("accuracy")
+        summary = MetricSummary(
+            total_points=int(loss["count"]),
+            returned_points=len(metrics_sampled),
+            best_loss=float(loss["min"]),
+            best_accuracy=float(accuracy["max"]) if accuracy else 0.0,
+            current_loss=float(loss["last"]),
+            current_accuracy=float(accuracy["last"]) if accuracy else 0.0,
+            by_metric={
+                metric: {
+                    "count": int(r["count"]),
+                    "min": float(r["min"]),
+                    "max": float(r["max"]),
+                    "last": float(r["last"]),
+                    "mean": float(r["mean"]),
+                    "variance": variance(r),
+                }
+                for metric, r in rollups.items()
+            },
+        )
+    elif metrics_sampled:
+        # Jobs without rollups (written before metric_rollups existed): summarise the fetched rows
         losses = [float(m["loss"]) for m in metrics_sampled]
         accuracies = [float(m["accuracy"]) for m in metrics_sampled if m.get("accuracy") is not None]
         summary = MetricSummary(
-            total_points=len(all_rows),
+            total_points=total_points,
             returned_points=len(metrics_sampled),
             best_loss=min(losses),
             best_accuracy=max(accuracies) if accuracies else 0.0,
@@ -70,6 +183,57 @@ def get_job_metrics(
     return MetricsResponse(job_id=job_id, metrics=metric_responses, summary=summary)
 
 
+EXPORT_FORMATS = {
+    # format: (media type, file extension, encoder)
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", stream_arrow),
+    "parquet": ("application/vnd.apache.parquet", "parquet", stream_parquet),
+}
+
+
+@router.get("/metrics/export")
+async def export_metrics(
+    job_ids: List[str] = Query(..., alias="job_id", description="Job to export; repeat for several jobs"),
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated metric columns (default: all)"),
+    repos: Repositories = Depends(get_repositories),
+):
+    """
+    Stream job metrics as an Arrow IPC stream or a Parquet file (job_id, epoch, step + projected columns),
+    encoded one page at a time. Loads directly with pyarrow/pandas/polars.
+    """
+    job_ids = list(dict.fromkeys(job_ids))
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(EXPORT_COLUMNS)
+    unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metric columns: {', '.join(unknown)}")
+    if importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Columnar export requires pyarrow")
+
+    found = await repos.jobs.existing(job_ids)
+    missing = [j for j in job_ids if j not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Job {missing[0]} not found")
+
+    media_type, extension, encode = EXPORT_FORMATS[format]
+    filename = f"metrics-{job_ids[0]}.{extension}" if len(job_ids) == 1 else f"metrics-{len(job_ids)}-jobs.{extension}"
+    return StreamingResponse(
+        encode(repos.metrics, job_ids, list(dict.fromkeys(selected))),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/jobs/{job_id}/metrics/export")
+async def export_job_metrics(
+    job_id: str,
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated metric columns (default: all)"),
+    repos: Repositories = Depends(get_repositories),
+):
+    """Single-job form of /metrics/export."""
+    return await export_metrics([job_id], format, columns, repos)
+
+
 @router.websocket("/jobs/{job_id}/metrics/stream")
 async def websocket_metrics_stream(
     websocket: WebSocket,
@@ -77,12 +241,13 @@ async def websocket_metrics_stream(
 ):
     await websocket.accept()
     training_service = TrainingService()
-    async def send_update(update: dict):
-        try:
-            await websocket.send_json(update)
-        except Exception as e:
-            print(f"Error sending update: {e}")
-    training_service.subscribe_to_job(job_id, send_update)
+    subscription = training_service.subscribe_to_job(job_id)
+
+    async def send_updates():
+        while (text := await subscription.get()) is not None:
+            await websocket.send_text(text)
+
+    sender = asyncio.create_task(send_updates())
     try:
         while True:
             try:
@@ -97,7 +262,8 @@ async def websocket_metrics_stream(
     except Exception as e:
         print(f"WebSocket connection error: {e}")
     finally:
-        training_service.unsubscribe_from_job(job_id)
+        training_service.unsubscribe_from_job(subscription)
+        sender.cancel()
         try:
             await websocket.close()
         except Exception:
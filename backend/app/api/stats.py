@@ -1,50 +1,37 @@
 from fastapi import APIRouter, Depends
-from app.supabase_client import get_supabase
-from supabase import Client
+from app.config import settings
+from app.repositories import Repositories, get_repositories
+from app.services.cache import cache
 from app.schemas.api import StatsOverview
 
 router = APIRouter()
 
+STATS_CACHE_KEY = "stats:overview"
+STATS_TABLES = ("experiments", "datasets", "training_jobs")
 
-@router.get("/stats/overview", response_model=StatsOverview)
-def get_stats_overview(supabase: Client = Depends(get_supabase)):
-    # Experiments: fetch all and aggregate
-    exp_res = supabase.table("experiments").select("*").execute()
-    experiments = (exp_res.data if exp_res else None) or []
-    exp_total = len(experiments)
-    exp_running = sum(1 for e in experiments if e.get("status") == "running")
-    exp_completed = sum(1 for e in experiments if e.get("status") == "completed")
-    exp_failed = sum(1 for e in experiments if e.get("status") == "failed")
-    exp_cancelled = sum(1 for e in experiments if e.get("status") == "cancelled")
-
-    # Datasets
-    ds_res = supabase.table("datasets").select("*").execute()
-    datasets = (ds_res.data if ds_res else None) or []
-    ds_total = len(datasets)
-    total_size_bytes = sum((d.get("size_bytes") or 0) for d in datasets)
-    modality_counts = {}
-    for d in datasets:
-        m = d.get("modality") or "unknown"
-        modality_counts[m] = modality_counts.get(m, 0) + 1
 
-    # Jobs
-    jobs_res = supabase.table("training_jobs").select("status").execute()
-    jobs = (jobs_res.data if jobs_res else None) or []
-    job_active = sum(1 for j in jobs if j.get("status") == "running")
-    job_queued = sum(1 for j in jobs if j.get("status") == "pending")
+@router.get("/stats/overview", response_model=StatsOverview)
+async def get_stats_overview(repos: Repositories = Depends(get_repositories)):
+    cached = cache.get(STATS_CACHE_KEY)
+    if cached is not None:
+        return cached
 
-    total_size_gb = total_size_bytes / (1024**3)
+    agg = await repos.overview()
+    exp_counts = agg.get("experiments_by_status") or {}
+    modality_counts = agg.get("datasets_by_modality") or {}
+    job_counts = agg.get("jobs_by_status") or {}
+    total_size_gb = float(agg.get("datasets_total_size_bytes") or 0) / (1024**3)
 
-    return StatsOverview(
+    overview = StatsOverview(
         experiments={
-            "total": exp_total,
-            "running": exp_running,
-            "completed": exp_completed,
-            "failed": exp_failed,
-            "cancelled": exp_cancelled,
+            "total": sum(exp_counts.values()),
+            "running": exp_counts.get("running", 0),
+            "completed": exp_counts.get("completed", 0),
+            "failed": exp_counts.get("failed", 0),
+            "cancelled": exp_counts.get("cancelled", 0),
         },
         datasets={
-            "total": ds_total,
+            "total": sum(modality_counts.values()),
             "by_modality": {
                 "text": modality_counts.get("text", 0),
                 "image": modality_counts.get("image", 0),
@@ -55,8 +42,10 @@ def get_stats_overview(supabase: Client = Depends(get_supabase)):
             "total_size_gb": round(total_size_gb, 2),
         },
         jobs={
-            "active": job_active,
-            "queued": job_queued,
-            "avg_duration_minutes": 245,
+            "active": job_counts.get("running", 0),
+            "queued": job_counts.get("pending", 0),
+            "avg_duration_minutes": round(float(agg.get("avg_job_duration_minutes") or 0)),
         },
     )
+    cache.set(STATS_CACHE_KEY, overview, settings.stats_cache_ttl_seconds, tables=STATS_TABLES)
+    return overview
@@ -0,0 +1,113 @@
+"""
+Cold-start timing. app.main marks when its import starts and ends, the startup hook and the first response
+mark theirs, and lazily imported routers record their own import time; GET /health/boot returns the report.
+Only light standard-library modules are imported here, so timing starts before FastAPI loads.
+
+    python -m app.boot [--runs 5] [--top 15]
+
+starts fresh interpreters that import app.main with and without FAST_BOOT and prints the median import
+time and the slowest modules (python -X importtime).
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+_marks: Dict[str, float] = {}
+_lazy_imports: Dict[str, float] = {}
+
+
+def mark(name: str):
+    """Record the first time name happens (later calls are no-ops)."""
+    if name not in _marks:
+        _marks[name] = time.perf_counter()
+
+
+@contextmanager
+def timed_import(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _lazy_imports[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _process_age_seconds() -> Optional[float]:
+    # Linux: time since the interpreter was exec'd (covers interpreter and platform bootstrap before app.main)
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _ms_between(start: str, end: str) -> Optional[float]:
+    if start in _marks and end in _marks:
+        return round((_marks[end] - _marks[start]) * 1000, 2)
+    return None
+
+
+def report(fast_boot: bool) -> dict:
+    age = _process_age_seconds()
+    before_import = None
+    if age is not None and "import_started" in _marks:
+        before_import = round((age - (time.perf_counter() - _marks["import_started"])) * 1000, 2)
+    return {
+        "fast_boot": fast_boot,
+        "before_import_ms": before_import,
+        "import_ms": _ms_between("import_started", "imported"),
+        "startup_ms": _ms_between("startup_started", "startup_complete"),
+        "first_response_ms": _ms_between("import_started", "first_response"),
+        "lazy_imports_ms": dict(_lazy_imports),
+        "modules_loaded": len(sys.modules),
+    }
+
+
+# The measuring CLI imports its modules inside functions, since app.main imports this module first thing
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print((time.perf_counter() - t) * 1000)"
+
+
+def _import_ms(env: dict) -> float:
+    import subprocess
+
+    out = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _slowest_modules(env: dict, top: int) -> List[tuple]:
+    import re
+    import subprocess
+
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=env, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if m and len(m.group(3)) <= 2:  # top-level imports and their direct children
+            rows.append((int(m.group(2)) / 1000, m.group(4)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of app.main.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    for fast_boot in ("false", "true"):
+        env = {**os.environ, "FAST_BOOT": fast_boot, "SKIP_DB_INIT": "1"}
+        times = [_import_ms(env) for _ in range(args.runs)]
+        print(f"FAST_BOOT={fast_boot}: import app.main median {statistics.median(times):.0f} ms "
+              f"(min {min(times):.0f}, max {max(times):.0f}, {args.runs} runs)")
+        for ms, module in _slowest_modules(env, args.top):
+            print(f"  {ms:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,22 @@ class Settings(BaseSettings):
     supabase_url: str = "https://your-project.supabase.co"
     supabase_service_key: str = ""  # Service role key (server-side only; never expose to frontend)
 
+    # Async PostgREST connection pool (request handlers)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 50
+    http_keepalive_expiry_seconds: float = 30.0
+    http_timeout_seconds: float = 30.0
+
+    # Storage backend: "supabase" (PostgREST API above) or "postgres" (direct asyncpg pool on database_url)
+    storage_backend: str = "supabase"
+    database_url: str = ""
+    # asyncpg pool bounds (storage_backend=postgres)
+    database_pool_min_size: int = 1
+    database_pool_max_size: int = 10
+
+    # Serverless cold starts: lazy router imports, no pub/sub, seeding or sweeps at startup (always on when VERCEL=1)
+    fast_boot: bool = False
+
     # Redis
     redis_url: str = "redis://localhost:6379"
     
@@ -32,7 +48,54 @@ class Settings(BaseSettings):
     
     # Logging
     log_level: str = "INFO"
-    
+    # Query tracing: X-Query-Trace response header and repeated-query (N+1) warnings per request
+    query_debug: bool = False
+    # ...warn when one query shape runs this many times within a request
+    query_repeat_threshold: int = 3
+
+    # Training metric writes: buffered per job, flushed as one bulk insert + one progress update
+    metric_flush_rows: int = 100
+    metric_flush_interval_seconds: float = 5.0
+
+    # Training scheduler: size of the worker pool that runs queued jobs
+    training_max_workers: int = 4
+    # Where jobs run: "thread" (in the API process) or "process" (one worker process per scheduler worker, off its GIL)
+    training_executor: str = "thread"
+    # ...nice increment for training worker processes (0 = same CPU priority as the API)
+    training_worker_nice: int = 10
+    # Durable job queue: seconds a worker's lease on a queued/running job lasts; other workers resume it once expired
+    job_lease_seconds: int = 60
+    # ...seconds between lease heartbeats (each also reaps jobs whose lease expired)
+    job_heartbeat_seconds: float = 15.0
+    # Shutdown: seconds to wait for running jobs to stop and flush before their leases are released
+    job_drain_timeout_seconds: float = 10.0
+
+    # GET /stats/overview cache (also invalidated by writes to experiments/datasets/training_jobs)
+    stats_cache_ttl_seconds: float = 10.0
+    # List endpoints with count=cached: how long a memoized total is reused
+    count_cache_ttl_seconds: float = 30.0
+
+    # Metric export/streaming: rows per keyset page read from the metrics table
+    metric_page_rows: int = 1000
+    # Parquet export: rows buffered per row group
+    parquet_row_group_rows: int = 131072
+
+    # Metrics retention (opt-in; compaction deletes raw rows): finished jobs keep raw metrics this many days, then
+    # per-k-step + per-epoch tiers (0 = forever)
+    metric_retention_full_days: int = 0
+    # ...and after this many days only the per-epoch tier (0 = keep the per-k-step tier forever)
+    metric_retention_step_days: int = 0
+    # Steps per bucket in the per-k-step tier
+    metric_compaction_step_bucket: int = 100
+    # Minutes between in-process compaction sweeps (0 = none; run python -m app.services.retention from cron instead)
+    metric_compaction_interval_minutes: float = 0.0
+
+    # WebSocket live updates: per-connection queue bound (oldest metric updates are dropped beyond it)
+    websocket_queue_size: int = 100
+
+    # Live-update transport between API processes: "memory" (single process) or "redis" (uses redis_url)
+    pubsub_backend: str = "memory"
+
     class Config:
         env_file = [".env.local", ".env"]
         case_sensitive = False
@@ -1,9 +1,19 @@
-import asyncio
-import os
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.api import api_router
+from app import boot
+
+# Marked before the imports below so /health/boot's import_ms includes them (hence the E402 exemptions)
+boot.mark("import_started")
+
+import asyncio  # noqa: E402
+import os  # noqa: E402
+from fastapi import FastAPI, Response  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.api import include_routers  # noqa: E402
+from app.services.instrumentation import TRACE_HEADER, MetricsMiddleware  # noqa: E402
+from app.utils.prometheus import CONTENT_TYPE, REGISTRY  # noqa: E402
+
+# Fast boot (serverless cold starts): routers load on first use and startup does no background or DB work
+FAST_BOOT = settings.fast_boot or os.getenv("VERCEL") == "1"
 
 app = FastAPI(
     title="ML Training Dashboard API",
@@ -18,39 +28,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the dashboard read per-request query traces in development (QUERY_DEBUG)
+    expose_headers=[TRACE_HEADER] if settings.query_debug else [],
 )
+# Request metrics (outermost, so the time spent in CORS handling is included)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
-app.include_router(api_router, prefix=settings.api_v1_prefix)
+include_routers(app, settings.api_v1_prefix, lazy=FAST_BOOT)
 
 
 @app.on_event("startup")
 async def startup_event():
-    # Capture main event loop for TrainingService (notifications from background thread)
+    boot.mark("startup_started")
+    try:
+        await _startup()
+    finally:
+        boot.mark("startup_complete")
+
+
+async def _startup():
+    # Capture main event loop for TrainingService (notifications and storage calls from background threads)
+    from app.repositories import bind_loop
     from app.services.training import TrainingService
     try:
-        TrainingService._loop = asyncio.get_running_loop()
+        loop = asyncio.get_running_loop()
+        TrainingService.hub.bind_loop(loop)
+        bind_loop(loop)
     except RuntimeError:
         pass
-    # On Vercel (or SKIP_DB_INIT), skip auto-seed
-    if os.getenv("VERCEL") == "1" or os.getenv("SKIP_DB_INIT", "").lower() in ("1", "true", "yes"):
+    # On fast boot the listener starts with the first WebSocket subscription instead
+    if FAST_BOOT:
         return
+    # Start listening for job updates published by any worker (PUBSUB_BACKEND)
+    TrainingService().pubsub.start()
+    # SKIP_DB_INIT: no auto-seed, compaction sweeps or job reaping
+    if os.getenv("SKIP_DB_INIT", "").lower() in ("1", "true", "yes"):
+        return
+    # Lease heartbeats; the first beat resumes jobs orphaned by a crashed or redeployed worker
+    TrainingService().leases.start()
+    # Periodic metrics compaction (METRIC_RETENTION_*), only when an operator sets the interval; not on serverless,
+    # where nothing outlives a request
+    if settings.metric_compaction_interval_minutes > 0:
+        from app.repositories import get_repositories
+        from app.services.retention import run_periodically
+        app.state.compaction_task = asyncio.create_task(
+            run_periodically(get_repositories(), settings.metric_compaction_interval_minutes * 60)
+        )
     auto_seed = os.getenv("AUTO_SEED", "true").lower() == "true"
     if not auto_seed:
         return
 
     def _maybe_seed():
-        from app.supabase_client import get_supabase
-        from app.utils.seed_data import seed_datasets, seed_experiments, seed_jobs_and_metrics
+        # Writes through the storage backend (STORAGE_BACKEND), so it works on supabase and postgres alike
+        from app.repositories import get_repositories
+        from app.utils.seed_data import is_empty, seed_all
         try:
-            supabase = get_supabase()
-            res = supabase.table("datasets").select("id").limit(1).execute()
-            rows = (res.data if res else None) or []
-            if len(rows) == 0:
+            repos = get_repositories()
+            if is_empty(repos):
                 print("📦 Database is empty. Auto-seeding with demo data...")
-                seed_datasets(supabase)
-                seed_experiments(supabase)
-                seed_jobs_and_metrics(supabase)
+                seed_all(repos)
                 print("✅ Demo data seeded successfully!")
         except Exception as e:
             print(f"⚠️  Error seeding database: {e}")
@@ -60,11 +97,36 @@ async def startup_event():
     await loop.run_in_executor(None, _maybe_seed)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from starlette.concurrency import run_in_threadpool
+    from app.repositories import close_repositories
+    from app.services.training import TrainingService
+    task = getattr(app.state, "compaction_task", None)
+    if task is not None:
+        task.cancel()
+    # Flush running jobs and hand their leases over before the storage connections close
+    await run_in_threadpool(TrainingService().drain)
+    await close_repositories()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/boot", include_in_schema=False)
+def boot_report():
+    """Cold-start timings for this process: import, startup, first response and lazily loaded routers."""
+    return boot.report(FAST_BOOT)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Request latency, DB call and training gauges in Prometheus text format (per process)."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def root():
     return {
@@ -72,3 +134,6 @@ def root():
         "docs": "/docs",
         "version": "1.0.0",
     }
+
+
+boot.mark("imported")
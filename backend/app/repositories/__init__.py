@@ -0,0 +1,103 @@
+"""
+Storage backends behind one repository interface (app.repositories.base).
+STORAGE_BACKEND=supabase (default) goes through Supabase's PostgREST API; STORAGE_BACKEND=postgres
+connects straight to DATABASE_URL with asyncpg.
+Request handlers depend on get_repositories(). Worker threads (training) call run_sync(), which runs
+a repository coroutine on the event loop that owns the HTTP client / connection pool and waits for it.
+"""
+import asyncio
+import threading
+from typing import Awaitable, Optional, TypeVar
+from app.config import settings
+from app.repositories.base import (
+    FINISHED_STATUSES,
+    JOB_EPOCH,
+    ROLLUP_METRICS,
+    TIER_COLUMNS,
+    DatasetRepository,
+    ExperimentRepository,
+    JobRepository,
+    MetricRepository,
+    Repositories,
+)
+
+T = TypeVar("T")
+
+_repositories: Optional[Repositories] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def create_repositories(backend: Optional[str] = None) -> Repositories:
+    backend = (backend or settings.storage_backend).lower()
+    if backend == "postgres":
+        from app.repositories.postgres import PostgresRepositories
+
+        return PostgresRepositories(settings.database_url)
+    from app.repositories.supabase import SupabaseRepositories
+
+    return SupabaseRepositories()
+
+
+def get_repositories() -> Repositories:
+    """Return the configured storage backend (singleton)."""
+    global _repositories
+    if _repositories is None:
+        _repositories = create_repositories()
+    return _repositories
+
+
+async def close_repositories():
+    """Close the backend's connections (app shutdown)."""
+    global _repositories
+    if _repositories is not None:
+        await _repositories.close()
+        _repositories = None
+
+
+def bind_loop(loop: asyncio.AbstractEventLoop):
+    """Run worker-thread storage calls on this loop (the app's, at startup)."""
+    global _loop
+    _loop = loop
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    # Outside the app (scripts, tests) nothing binds a loop: start a private one on a daemon thread
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="repositories-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a repository coroutine from a worker thread and return its result. Never call it on the loop itself."""
+    loop = _worker_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the event loop thread; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+__all__ = [
+    "FINISHED_STATUSES",
+    "JOB_EPOCH",
+    "ROLLUP_METRICS",
+    "TIER_COLUMNS",
+    "DatasetRepository",
+    "ExperimentRepository",
+    "JobRepository",
+    "MetricRepository",
+    "Repositories",
+    "bind_loop",
+    "close_repositories",
+    "create_repositories",
+    "get_repositories",
+    "run_sync",
+]
@@ -0,0 +1,240 @@
+"""
+Storage interface used by the API routers and the training service.
+Rows are plain dicts shaped like PostgREST returns them (timestamps as ISO strings, numbers as
+int/float, JSONB as dicts/lists), whichever backend produced them.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Numeric metric columns: each has per-job and per-epoch rollups (metric_rollups) and tier averages
+ROLLUP_METRICS = ("loss", "accuracy", "learning_rate", "throughput", "gpu_utilization", "memory_used_gb")
+# metric_rollups.epoch of the whole-job rollup rows
+JOB_EPOCH = -1
+# (rows, total) for list queries; total is None when no count was requested
+ListResult = Tuple[List[dict], Optional[int]]
+# Job statuses whose metrics no longer change
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Columns of a compacted metrics tier row besides job_id, resolution, epoch and step (see app.services.retention)
+TIER_COLUMNS = ("points", *ROLLUP_METRICS, "timestamp")
+
+
+class DatasetRepository(ABC):
+    @abstractmethod
+    async def list(
+        self,
+        modality: Optional[str],
+        sort_by: str,
+        desc: bool,
+        cursor: Optional[dict],
+        limit: int,
+        offset: int = 0,
+        count: Optional[str] = None,
+    ) -> ListResult:
+        """
+        One keyset page ordered by (sort_by, id), see app.utils.pagination: up to limit + 1 rows past the
+        decoded cursor (scanned in reverse for a "prev" cursor), or from offset without one.
+        count is "exact", "planned", "estimated" or None.
+        """
+
+    @abstractmethod
+    async def get(self, dataset_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def version(self, dataset_id: str) -> Optional[dict]:
+        """id, created_at, updated_at only (conditional GET probe)."""
+
+    @abstractmethod
+    async def create(self, row: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def delete(self, dataset_id: str) -> bool:
+        ...
+
+
+class ExperimentRepository(ABC):
+    @abstractmethod
+    async def list(
+        self,
+        status: Optional[str],
+        dataset_id: Optional[str],
+        sort_by: str,
+        desc: bool,
+        cursor: Optional[dict],
+        limit: int,
+        offset: int = 0,
+        count: Optional[str] = None,
+    ) -> ListResult:
+        """Keyset page like DatasetRepository.list; rows carry dataset_name and latest_job."""
+
+    @abstractmethod
+    async def get(self, experiment_id: str, with_jobs: bool = False) -> Optional[dict]:
+        """The experiment with dataset_name and latest_job; with_jobs adds "jobs": [{id, status}, ...]."""
+
+    @abstractmethod
+    async def version(self, experiment_id: str) -> Optional[dict]:
+        """id, status, updated_at only (conditional GET probe); None if unavailable."""
+
+    @abstractmethod
+    async def get_many(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        """id, name and config of each existing experiment, by id."""
+
+    @abstractmethod
+    async def create(self, row: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def update(self, experiment_id: str, fields: dict) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, experiment_id: str) -> bool:
+        """Delete (jobs and metrics cascade); False if it did not exist."""
+
+
+class JobRepository(ABC):
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def version(self, job_id: str, columns: Sequence[str]) -> Optional[dict]:
+        """id plus the given columns only (conditional GET probes)."""
+
+    @abstractmethod
+    async def existing(self, job_ids: Sequence[str]) -> Set[str]:
+        """The subset of job_ids that exist."""
+
+    @abstractmethod
+    async def latest_for_experiments(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        """Newest job (id, experiment_id, status, progress, current_epoch, created_at) per experiment."""
+
+    @abstractmethod
+    async def create(self, row: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def update(self, job_id: str, fields: dict, expect_status: Optional[str] = None) -> Optional[dict]:
+        """Update one job, only if its status is expect_status when given. Returns the updated row or None."""
+
+    @abstractmethod
+    async def update_many(self, job_ids: Sequence[str], fields: dict):
+        ...
+
+    @abstractmethod
+    async def compaction_candidates(self, metrics_tier: str, completed_before: str, limit: int) -> List[str]:
+        """Finished jobs at metrics_tier that completed before the given ISO timestamp, oldest first."""
+
+    @abstractmethod
+    async def claim(self, job_id: str, worker: str, lease_seconds: int) -> Optional[dict]:
+        """
+        Mark the job running under worker's lease (claim_training_job in supabase/schema.sql), if it is pending
+        or running and unleased, leased to worker, or its lease expired. Returns the job row or None.
+        """
+
+    @abstractmethod
+    async def renew_leases(self, worker: str, job_ids: Sequence[str], lease_seconds: int) -> Set[str]:
+        """Heartbeat: extend worker's leases on job_ids; the ids it still holds."""
+
+    @abstractmethod
+    async def reap(self, worker: str, lease_seconds: int, limit: int) -> List[dict]:
+        """
+        Lease up to limit pending/running jobs whose lease expired to worker: id, experiment_id, status,
+        priority and the experiment's config, created_by and tags.
+        """
+
+    @abstractmethod
+    async def release_leases(self, worker: str, job_ids: Sequence[str]) -> int:
+        """Expire worker's leases on job_ids now, so other workers pick the jobs up; number released."""
+
+
+class MetricRepository(ABC):
+    @abstractmethod
+    async def series(self, job_id: str, start_epoch: Optional[int] = None, end_epoch: Optional[int] = None) -> List[dict]:
+        """Every metric row of the job in (epoch, step) order."""
+
+    @abstractmethod
+    async def downsample(
+        self, job_id: str, buckets: int, start_epoch: Optional[int], end_epoch: Optional[int], metric: str = "loss"
+    ) -> Tuple[List[dict], int]:
+        """
+        Bucket min/max candidates of metric (downsample_job_metrics in supabase/schema.sql), each row
+        carrying point_index, plus the full series length.
+        """
+
+    @abstractmethod
+    async def last_point(self, job_id: str) -> Optional[dict]:
+        """epoch and step of the job's newest metric row."""
+
+    @abstractmethod
+    async def page(
+        self,
+        job_id: str,
+        columns: Sequence[str],
+        start_epoch: Optional[int],
+        end_epoch: Optional[int],
+        after: Optional[dict],
+        limit: int,
+    ) -> List[dict]:
+        """Up to limit rows (id, job_id, epoch, step + columns) past `after` in (epoch, step, id) order."""
+
+    @abstractmethod
+    async def series_for_jobs(self, job_ids: Sequence[str], columns: Sequence[str]) -> Dict[str, List[dict]]:
+        """job_id, epoch, step + columns for several jobs, grouped by job in (epoch, step) order."""
+
+    @abstractmethod
+    async def insert(self, rows: List[dict]):
+        """Bulk-append metric rows."""
+
+    @abstractmethod
+    async def rollup_rows(
+        self,
+        job_ids: Sequence[str],
+        metrics: Optional[Iterable[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> List[dict]:
+        """metric_rollups rows; without an epoch range only the whole-job rows (epoch = -1)."""
+
+    @abstractmethod
+    async def upsert_rollups(self, rows: List[dict]):
+        ...
+
+    @abstractmethod
+    async def rebuild_rollups(self, job_id: str):
+        """Recompute the job's metric_rollups from its metrics rows (rebuild_metric_rollups)."""
+
+    @abstractmethod
+    async def tier_series(
+        self,
+        job_ids: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> Dict[str, List[dict]]:
+        """
+        Compacted jobs' finest stored tier (job_id, resolution, epoch, step + columns, default TIER_COLUMNS),
+        grouped by job in (epoch, step) order. Jobs that still have raw rows are absent.
+        """
+
+    @abstractmethod
+    async def compact(self, job_id: str, tier: str, step_bucket: int) -> int:
+        """Move a finished job down to tier ("step" or "epoch") with compact_job_metrics(); rows removed."""
+
+
+class Repositories(ABC):
+    """One storage backend: a repository per aggregate plus cross-table reads."""
+
+    datasets: DatasetRepository
+    experiments: ExperimentRepository
+    jobs: JobRepository
+    metrics: MetricRepository
+
+    @abstractmethod
+    async def overview(self) -> Dict[str, Any]:
+        """Aggregates for GET /stats/overview (the stats_overview() shape in supabase/schema.sql)."""
+
+    async def close(self):
+        """Release connections (app shutdown)."""
+
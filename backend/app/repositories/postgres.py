@@ -0,0 +1,496 @@
+"""
+Repositories over a direct asyncpg connection pool (STORAGE_BACKEND=postgres), for self-hosted
+deployments that skip the PostgREST HTTP hop. Needs the schema from supabase/schema.sql in DATABASE_URL.
+SQL text depends only on the call's shape (filters present, columns), never on values, so asyncpg's
+per-connection prepared-statement cache serves repeat queries without re-parsing or re-planning.
+Metric ingest uses binary COPY. asyncpg is imported when the pool is first created. Every round trip
+is timed and traced with db_call() for the request metrics (app.services.instrumentation).
+"""
+import asyncio
+import json
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from app.config import settings
+from app.repositories.base import (
+    FINISHED_STATUSES,
+    JOB_EPOCH,
+    TIER_COLUMNS,
+    DatasetRepository,
+    ExperimentRepository,
+    JobRepository,
+    ListResult,
+    MetricRepository,
+    Repositories,
+)
+from app.services.instrumentation import db_call
+from app.utils.pagination import is_backwards
+
+# Parameters for these columns arrive as ISO strings (the PostgREST representation) and are bound as timestamptz
+TIMESTAMP_COLUMNS = frozenset(
+    {"created_at", "updated_at", "started_at", "completed_at", "estimated_completion", "timestamp"}
+)
+# count=estimated: exact below this many rows, the planner's estimate above (as PostgREST does with max-rows)
+ESTIMATED_COUNT_THRESHOLD = 1000
+ROLLUP_COLUMNS = ("job_id", "epoch", "metric", "count", "min", "max", "last", "last_epoch", "last_step", "mean", "m2")
+_IDENT = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _dsn(url: str) -> str:
+    # docker-compose uses the SQLAlchemy-style scheme (postgresql+asyncpg://); asyncpg wants plain postgresql://
+    return re.sub(r"^postgres(ql)?\+\w+://", "postgresql://", url)
+
+
+def _ident(name: str) -> str:
+    if not _IDENT.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f'"{name}"'
+
+
+def _param(column: str, value: Any) -> Any:
+    if column in TIMESTAMP_COLUMNS and isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _row(record) -> dict:
+    return {k: _value(v) for k, v in record.items()}
+
+
+async def _init_connection(conn):
+    await conn.set_type_codec("json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    # Binary jsonb (version byte + text) so the codec also works inside binary COPY
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=lambda v: b"\x01" + json.dumps(v).encode(),
+        decoder=lambda b: json.loads(b[1:]),
+        schema="pg_catalog",
+        format="binary",
+    )
+
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|COPY)\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+# Bound values kept in a trace (ANY($1) arrays can be long)
+_TRACE_VALUE_CHARS = 120
+
+
+def _describe(sql: str, args: Sequence[Any]):
+    """Trace builder for db_call(): the SQL text is already the query's shape (values are parameters)."""
+
+    def describe(rows: Optional[int]) -> dict:
+        table = _SQL_TABLE.search(sql)
+        return {
+            "op": sql.split(None, 1)[0].lower(),
+            "table": table.group(1) if table else None,
+            "sql": sql,
+            "params": [str(a)[:_TRACE_VALUE_CHARS] for a in args],
+            "rows": rows,
+            "shape": sql,
+        }
+
+    return describe
+
+
+class Database:
+    """Lazily created asyncpg pool; rows come back as PostgREST-shaped dicts."""
+
+    def __init__(self, url: str):
+        self.dsn = _dsn(url)
+        self._pool = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def pool(self):
+        if self._pool is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._pool is None:
+                    import asyncpg
+
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=settings.database_pool_min_size,
+                        max_size=settings.database_pool_max_size,
+                        init=_init_connection,
+                        server_settings={"timezone": "UTC", "application_name": "conductor"},
+                    )
+        return self._pool
+
+    async def fetch(self, sql: str, *args) -> List[dict]:
+        pool = await self.pool()
+        with db_call(_describe(sql, args)) as call:
+            rows = [_row(r) for r in await pool.fetch(sql, *args)]
+            call.rows = len(rows)
+        return rows
+
+    async def fetchrow(self, sql: str, *args) -> Optional[dict]:
+        pool = await self.pool()
+        with db_call(_describe(sql, args)) as call:
+            record = await pool.fetchrow(sql, *args)
+            call.rows = int(record is not None)
+        return _row(record) if record is not None else None
+
+    async def fetchval(self, sql: str, *args) -> Any:
+        pool = await self.pool()
+        with db_call(_describe(sql, args)):
+            return _value(await pool.fetchval(sql, *args))
+
+    async def execute(self, sql: str, *args):
+        pool = await self.pool()
+        with db_call(_describe(sql, args)):
+            await pool.execute(sql, *args)
+
+    async def executemany(self, sql: str, args: List[tuple]):
+        pool = await self.pool()
+        with db_call(_describe(sql, ())) as call:
+            await pool.executemany(sql, args)
+            call.rows = len(args)
+
+    async def copy(self, table: str, columns: Sequence[str], records: List[tuple]):
+        pool = await self.pool()
+        with db_call(_describe(f"COPY {table} ({', '.join(columns)})", ())) as call:
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table(table, records=records, columns=list(columns))
+            call.rows = len(records)
+
+    async def insert(self, table: str, row: dict) -> dict:
+        columns = list(row)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(map(_ident, columns))}) "
+            f"VALUES ({', '.join(f'${i}' for i in range(1, len(columns) + 1))}) RETURNING *"
+        )
+        return await self.fetchrow(sql, *(_param(c, row[c]) for c in columns))
+
+    def set_clause(self, fields: dict) -> Tuple[str, List[Any]]:
+        columns = list(fields)
+        clause = ", ".join(f"{_ident(c)} = ${i}" for i, c in enumerate(columns, 1))
+        return clause, [_param(c, fields[c]) for c in columns]
+
+    async def count(self, from_where: str, args: Sequence[Any], method: Optional[str]) -> Optional[int]:
+        """exact: count(*); planned: the planner's row estimate; estimated: exact unless the estimate is large."""
+        if method not in ("exact", "planned", "estimated"):
+            return None
+        if method != "exact":
+            plan = await self.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where}", *args)
+            planned = int(plan[0]["Plan"]["Plan Rows"])
+            if method == "planned" or planned > ESTIMATED_COUNT_THRESHOLD:
+                return planned
+        return int(await self.fetchval(f"SELECT count(*) {from_where}", *args))
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+async def _keyset_list(
+    db: Database,
+    select: str,
+    from_clause: str,
+    alias: str,
+    where: List[str],
+    args: List[Any],
+    sort_by: str,
+    desc: bool,
+    cursor: Optional[dict],
+    limit: int,
+    offset: int,
+    count: Optional[str],
+) -> ListResult:
+    """SQL form of app.utils.pagination.apply_keyset; the page and the count run concurrently."""
+    filters = f"{from_clause} WHERE {' AND '.join(where)}" if where else from_clause
+    page_where, page_args = list(where), list(args)
+    scan_desc = desc != is_backwards(cursor)
+    direction = "DESC" if scan_desc else "ASC"
+    sort_col = f"{alias}.{_ident(sort_by)}"
+    if cursor:
+        n = len(page_args)
+        page_where.append(f"({sort_col}, {alias}.id) {'<' if scan_desc else '>'} (${n + 1}, ${n + 2})")
+        page_args += [_param(sort_by, cursor["v"]), cursor["id"]]
+        offset = 0
+    page_args += [limit + 1, offset]
+    sql = (
+        f"SELECT {select} {from_clause}"
+        + (f" WHERE {' AND '.join(page_where)}" if page_where else "")
+        + f" ORDER BY {sort_col} {direction}, {alias}.id {direction}"
+        + f" LIMIT ${len(page_args) - 1} OFFSET ${len(page_args)}"
+    )
+    rows, total = await asyncio.gather(db.fetch(sql, *page_args), db.count(filters, args, count))
+    return rows, total
+
+
+class PostgresDatasetRepository(DatasetRepository):
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def list(self, modality, sort_by, desc, cursor, limit, offset=0, count=None) -> ListResult:
+        where, args = ([], []) if not modality else (["d.modality = $1"], [modality])
+        return await _keyset_list(self.db, "d.*", "FROM datasets d", "d", where, args, sort_by, desc, cursor, limit, offset, count)
+
+    async def get(self, dataset_id: str) -> Optional[dict]:
+        return await self.db.fetchrow("SELECT * FROM datasets WHERE id = $1", dataset_id)
+
+    async def version(self, dataset_id: str) -> Optional[dict]:
+        return await self.db.fetchrow("SELECT id, created_at, updated_at FROM datasets WHERE id = $1", dataset_id)
+
+    async def create(self, row: dict) -> dict:
+        return await self.db.insert("datasets", row)
+
+    async def delete(self, dataset_id: str) -> bool:
+        return await self.db.fetchval("DELETE FROM datasets WHERE id = $1 RETURNING id", dataset_id) is not None
+
+
+EXPERIMENT_SELECT = "e.*, d.name AS dataset_name"
+EXPERIMENT_FROM = "FROM experiments e LEFT JOIN datasets d ON d.id = e.dataset_id"
+EXPERIMENT_JOBS = (
+    "COALESCE((SELECT jsonb_agg(jsonb_build_object('id', j.id, 'status', j.status)) "
+    "FROM training_jobs j WHERE j.experiment_id = e.id), '[]'::jsonb) AS jobs"
+)
+
+
+class PostgresExperimentRepository(ExperimentRepository):
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def list(self, status, dataset_id, sort_by, desc, cursor, limit, offset=0, count=None) -> ListResult:
+        where, args = [], []
+        if status:
+            args.append(status)
+            where.append(f"e.status = ${len(args)}")
+        if dataset_id:
+            args.append(dataset_id)
+            where.append(f"e.dataset_id = ${len(args)}")
+        return await _keyset_list(
+            self.db, EXPERIMENT_SELECT, EXPERIMENT_FROM, "e", where, args, sort_by, desc, cursor, limit, offset, count
+        )
+
+    async def get(self, experiment_id: str, with_jobs: bool = False) -> Optional[dict]:
+        select = f"{EXPERIMENT_SELECT}, {EXPERIMENT_JOBS}" if with_jobs else EXPERIMENT_SELECT
+        return await self.db.fetchrow(f"SELECT {select} {EXPERIMENT_FROM} WHERE e.id = $1", experiment_id)
+
+    async def version(self, experiment_id: str) -> Optional[dict]:
+        return await self.db.fetchrow("SELECT id, status, updated_at FROM experiments WHERE id = $1", experiment_id)
+
+    async def get_many(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        rows = await self.db.fetch("SELECT id, name, config FROM experiments WHERE id = ANY($1::text[])", list(experiment_ids))
+        return {e["id"]: e for e in rows}
+
+    async def create(self, row: dict) -> dict:
+        return await self.db.insert("experiments", row)
+
+    async def update(self, experiment_id: str, fields: dict) -> Optional[dict]:
+        clause, args = self.db.set_clause(fields)
+        return await self.db.fetchrow(f"UPDATE experiments SET {clause} WHERE id = ${len(args) + 1} RETURNING *", *args, experiment_id)
+
+    async def delete(self, experiment_id: str) -> bool:
+        return await self.db.fetchval("DELETE FROM experiments WHERE id = $1 RETURNING id", experiment_id) is not None
+
+
+class PostgresJobRepository(JobRepository):
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.db.fetchrow("SELECT * FROM training_jobs WHERE id = $1", job_id)
+
+    async def version(self, job_id: str, columns: Sequence[str]) -> Optional[dict]:
+        select = ", ".join(map(_ident, ("id", *columns)))
+        return await self.db.fetchrow(f"SELECT {select} FROM training_jobs WHERE id = $1", job_id)
+
+    async def existing(self, job_ids: Sequence[str]) -> Set[str]:
+        rows = await self.db.fetch("SELECT id FROM training_jobs WHERE id = ANY($1::text[])", list(job_ids))
+        return {r["id"] for r in rows}
+
+    async def latest_for_experiments(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        rows = await self.db.fetch(
+            "SELECT DISTINCT ON (experiment_id) id, experiment_id, status, progress, current_epoch, created_at "
+            "FROM training_jobs WHERE experiment_id = ANY($1::text[]) ORDER BY experiment_id, created_at DESC",
+            list(experiment_ids),
+        )
+        return {r["experiment_id"]: r for r in rows}
+
+    async def create(self, row: dict) -> dict:
+        return await self.db.insert("training_jobs", row)
+
+    async def update(self, job_id: str, fields: dict, expect_status: Optional[str] = None) -> Optional[dict]:
+        clause, args = self.db.set_clause(fields)
+        sql = f"UPDATE training_jobs SET {clause} WHERE id = ${len(args) + 1}"
+        args.append(job_id)
+        if expect_status is not None:
+            args.append(expect_status)
+            sql += f" AND status = ${len(args)}"
+        return await self.db.fetchrow(sql + " RETURNING *", *args)
+
+    async def update_many(self, job_ids: Sequence[str], fields: dict):
+        clause, args = self.db.set_clause(fields)
+        await self.db.execute(f"UPDATE training_jobs SET {clause} WHERE id = ANY(${len(args) + 1}::text[])", *args, list(job_ids))
+
+    async def compaction_candidates(self, metrics_tier: str, completed_before: str, limit: int) -> List[str]:
+        rows = await self.db.fetch(
+            "SELECT id FROM training_jobs WHERE metrics_tier = $1 AND status = ANY($2::text[]) AND completed_at < $3 "
+            "ORDER BY completed_at LIMIT $4",
+            metrics_tier,
+            list(FINISHED_STATUSES),
+            _param("completed_at", completed_before),
+            limit,
+        )
+        return [r["id"] for r in rows]
+
+    async def claim(self, job_id: str, worker: str, lease_seconds: int) -> Optional[dict]:
+        return await self.db.fetchrow("SELECT * FROM claim_training_job($1, $2, $3)", job_id, worker, lease_seconds)
+
+    async def renew_leases(self, worker: str, job_ids: Sequence[str], lease_seconds: int) -> Set[str]:
+        rows = await self.db.fetch("SELECT id FROM renew_job_leases($1, $2::text[], $3)", worker, list(job_ids), lease_seconds)
+        return {r["id"] for r in rows}
+
+    async def reap(self, worker: str, lease_seconds: int, limit: int) -> List[dict]:
+        return await self.db.fetch("SELECT * FROM reap_training_jobs($1, $2, $3)", worker, lease_seconds, limit)
+
+    async def release_leases(self, worker: str, job_ids: Sequence[str]) -> int:
+        return int(await self.db.fetchval("SELECT release_job_leases($1, $2::text[])", worker, list(job_ids)) or 0)
+
+
+def _epoch_range(where: List[str], args: List[Any], start_epoch: Optional[int], end_epoch: Optional[int], column: str = "epoch"):
+    if start_epoch is not None:
+        args.append(start_epoch)
+        where.append(f"{column} >= ${len(args)}")
+    if end_epoch is not None:
+        args.append(end_epoch)
+        where.append(f"{column} <= ${len(args)}")
+
+
+class PostgresMetricRepository(MetricRepository):
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def series(self, job_id: str, start_epoch: Optional[int] = None, end_epoch: Optional[int] = None) -> List[dict]:
+        where, args = ["job_id = $1"], [job_id]
+        _epoch_range(where, args, start_epoch or 0, end_epoch)
+        return await self.db.fetch(f"SELECT * FROM metrics WHERE {' AND '.join(where)} ORDER BY epoch, step", *args)
+
+    async def downsample(self, job_id, buckets, start_epoch, end_epoch, metric="loss") -> Tuple[List[dict], int]:
+        rows = await self.db.fetch(
+            "SELECT * FROM downsample_job_metrics($1, $2, $3, $4, $5)", job_id, buckets, start_epoch, end_epoch, metric
+        )
+        return rows, int(rows[0]["total_points"]) if rows else 0
+
+    async def last_point(self, job_id: str) -> Optional[dict]:
+        return await self.db.fetchrow(
+            "SELECT epoch, step FROM metrics WHERE job_id = $1 ORDER BY epoch DESC, step DESC LIMIT 1", job_id
+        )
+
+    async def page(self, job_id, columns, start_epoch, end_epoch, after, limit) -> List[dict]:
+        where, args = ["job_id = $1"], [job_id]
+        _epoch_range(where, args, start_epoch, end_epoch)
+        if after:
+            n = len(args)
+            where.append(f"(epoch, step, id) > (${n + 1}, ${n + 2}, ${n + 3})")
+            args += [after["epoch"], after["step"], after["id"]]
+        args.append(limit)
+        select = ", ".join(map(_ident, ("id", "job_id", "epoch", "step", *columns)))
+        return await self.db.fetch(
+            f"SELECT {select} FROM metrics WHERE {' AND '.join(where)} ORDER BY epoch, step, id LIMIT ${len(args)}", *args
+        )
+
+    async def series_for_jobs(self, job_ids: Sequence[str], columns: Sequence[str]) -> Dict[str, List[dict]]:
+        select = ", ".join(map(_ident, ("job_id", "epoch", "step", *columns)))
+        rows = await self.db.fetch(
+            f"SELECT {select} FROM metrics WHERE job_id = ANY($1::text[]) ORDER BY job_id, epoch, step", list(job_ids)
+        )
+        by_job: Dict[str, List[dict]] = {}
+        for r in rows:
+            by_job.setdefault(r["job_id"], []).append(r)
+        return by_job
+
+    async def insert(self, rows: List[dict]):
+        """Binary COPY: one round trip and no per-row statement overhead."""
+        if not rows:
+            return
+        columns = list(dict.fromkeys(k for r in rows for k in r))
+        records = [tuple(_param(c, r.get(c)) for c in columns) for r in rows]
+        await self.db.copy("metrics", columns, records)
+
+    async def rollup_rows(
+        self,
+        job_ids: Sequence[str],
+        metrics: Optional[Iterable[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> List[dict]:
+        where, args = ["job_id = ANY($1::text[])"], [list(job_ids)]
+        if metrics is not None:
+            args.append(list(metrics))
+            where.append(f"metric = ANY(${len(args)}::text[])")
+        if start_epoch is None and end_epoch is None:
+            args.append(JOB_EPOCH)
+            where.append(f"epoch = ${len(args)}")
+        else:
+            _epoch_range(where, args, max(start_epoch or 0, 0), end_epoch)
+        return await self.db.fetch(f"SELECT * FROM metric_rollups WHERE {' AND '.join(where)}", *args)
+
+    async def upsert_rollups(self, rows: List[dict]):
+        if not rows:
+            return
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in ROLLUP_COLUMNS[3:])
+        await self.db.executemany(
+            f"INSERT INTO metric_rollups ({', '.join(ROLLUP_COLUMNS)}) "
+            f"VALUES ({', '.join(f'${i}' for i in range(1, len(ROLLUP_COLUMNS) + 1))}) "
+            f"ON CONFLICT (job_id, epoch, metric) DO UPDATE SET {updates}",
+            [tuple(r.get(c) for c in ROLLUP_COLUMNS) for r in rows],
+        )
+
+    async def rebuild_rollups(self, job_id: str):
+        await self.db.execute("SELECT rebuild_metric_rollups($1)", job_id)
+
+    async def tier_series(
+        self,
+        job_ids: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> Dict[str, List[dict]]:
+        where, args = ["m.job_id = ANY($1::text[])"], [list(job_ids)]
+        _epoch_range(where, args, start_epoch, end_epoch, column="m.epoch")
+        select = ", ".join(f"m.{_ident(c)}" for c in ("job_id", "resolution", "epoch", "step", *(columns or TIER_COLUMNS)))
+        # Finest tier per job: the smallest per-k-step resolution while it is kept, else per-epoch (0)
+        rows = await self.db.fetch(
+            "WITH finest AS (SELECT DISTINCT ON (job_id) job_id, resolution FROM metrics_downsampled "
+            "WHERE job_id = ANY($1::text[]) ORDER BY job_id, resolution = 0, resolution) "
+            f"SELECT {select} FROM metrics_downsampled m JOIN finest f USING (job_id, resolution) "
+            f"WHERE {' AND '.join(where)} ORDER BY m.job_id, m.epoch, m.step",
+            *args,
+        )
+        by_job: Dict[str, List[dict]] = {}
+        for r in rows:
+            by_job.setdefault(r["job_id"], []).append(r)
+        return by_job
+
+    async def compact(self, job_id: str, tier: str, step_bucket: int) -> int:
+        return int(await self.db.fetchval("SELECT compact_job_metrics($1, $2, $3)", job_id, tier, step_bucket) or 0)
+
+
+class PostgresRepositories(Repositories):
+    def __init__(self, url: str):
+        if not url:
+            raise RuntimeError("DATABASE_URL must be set when STORAGE_BACKEND=postgres.")
+        self.db = Database(url)
+        self.datasets = PostgresDatasetRepository(self.db)
+        self.experiments = PostgresExperimentRepository(self.db)
+        self.jobs = PostgresJobRepository(self.db)
+        self.metrics = PostgresMetricRepository(self.db)
+
+    async def overview(self) -> Dict[str, Any]:
+        return await self.db.fetchval("SELECT stats_overview()")
+
+    async def close(self):
+        await self.db.close()
@@ -0,0 +1,399 @@
+"""
+Repositories over Supabase's PostgREST API (the default backend), through the shared async client.
+Functions from supabase/schema.sql are called via rpc(), with a slower fallback when they are missing.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from app.repositories.base import (
+    FINISHED_STATUSES,
+    JOB_EPOCH,
+    TIER_COLUMNS,
+    DatasetRepository,
+    ExperimentRepository,
+    JobRepository,
+    ListResult,
+    MetricRepository,
+    Repositories,
+)
+from app.supabase_client import close_async_supabase, get_async_supabase
+from app.utils.pagination import apply_keyset, quote_value
+
+LATEST_JOB_COLUMNS = "id, experiment_id, status, progress, current_epoch, created_at"
+
+
+def _data(res) -> Any:
+    return res.data if res and getattr(res, "data", None) else None
+
+
+def _first(res) -> Optional[dict]:
+    data = _data(res)
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data
+
+
+def _count_method(count: Optional[str]) -> Optional[str]:
+    return count if count in ("exact", "planned", "estimated") else None
+
+
+class _Base:
+    # Resolved per call so a client installed after construction (tests, benchmarks) is picked up
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        return get_async_supabase()
+
+
+class SupabaseDatasetRepository(_Base, DatasetRepository):
+    async def list(self, modality, sort_by, desc, cursor, limit, offset=0, count=None) -> ListResult:
+        q = self.client.table("datasets").select("*", count=_count_method(count))
+        if modality:
+            q = q.eq("modality", modality)
+        q, _ = apply_keyset(q, sort_by, desc, cursor, limit, offset=offset)
+        res = await q.execute()
+        return _data(res) or [], getattr(res, "count", None)
+
+    async def get(self, dataset_id: str) -> Optional[dict]:
+        return _data(await self.client.table("datasets").select("*").eq("id", dataset_id).maybe_single().execute())
+
+    async def version(self, dataset_id: str) -> Optional[dict]:
+        res = await self.client.table("datasets").select("id, created_at, updated_at").eq("id", dataset_id).maybe_single().execute()
+        return _data(res)
+
+    async def create(self, row: dict) -> dict:
+        return _first(await self.client.table("datasets").insert(row).execute())
+
+    async def delete(self, dataset_id: str) -> bool:
+        return bool(_data(await self.client.table("datasets").delete().eq("id", dataset_id).execute()))
+
+
+def _with_dataset_name(exp: dict) -> dict:
+    datasets = exp.pop("datasets", None)
+    if isinstance(datasets, list):
+        datasets = datasets[0] if datasets else None
+    exp["dataset_name"] = datasets.get("name") if isinstance(datasets, dict) else None
+    return exp
+
+
+class SupabaseExperimentRepository(_Base, ExperimentRepository):
+    async def _attach_latest_jobs(self, rows: List[dict]):
+        """
+        Fill latest_job for rows read before experiments.latest_job existed (see supabase/schema.sql):
+        one projected query for the whole page instead of embedding every job.
+        """
+        missing = [r["id"] for r in rows if "latest_job" not in r]
+        if missing:
+            latest = await SupabaseJobRepository().latest_for_experiments(missing)
+            for r in rows:
+                if "latest_job" not in r:
+                    r["latest_job"] = latest.get(r["id"])
+
+    async def list(self, status, dataset_id, sort_by, desc, cursor, limit, offset=0, count=None) -> ListResult:
+        q = self.client.table("experiments").select("*, datasets(name)", count=_count_method(count))
+        if status:
+            q = q.eq("status", status)
+        if dataset_id:
+            q = q.eq("dataset_id", dataset_id)
+        q, _ = apply_keyset(q, sort_by, desc, cursor, limit, offset=offset)
+        res = await q.execute()
+        rows = [_with_dataset_name(r) for r in _data(res) or []]
+        await self._attach_latest_jobs(rows)
+        return rows, getattr(res, "count", None)
+
+    async def get(self, experiment_id: str, with_jobs: bool = False) -> Optional[dict]:
+        select = "*, datasets(name), training_jobs(id, status)" if with_jobs else "*, datasets(name)"
+        exp = _data(await self.client.table("experiments").select(select).eq("id", experiment_id).maybe_single().execute())
+        if not exp:
+            return None
+        if with_jobs:
+            exp["jobs"] = exp.pop("training_jobs", None) or []
+        await self._attach_latest_jobs([exp])
+        return _with_dataset_name(exp)
+
+    async def version(self, experiment_id: str) -> Optional[dict]:
+        try:
+            res = await self.client.table("experiments").select("id, status, updated_at").eq("id", experiment_id).maybe_single().execute()
+        except APIError:
+            return None  # updated_at not migrated yet
+        return _data(res)
+
+    async def get_many(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        res = await self.client.table("experiments").select("id, name, config").in_("id", list(experiment_ids)).execute()
+        return {e["id"]: e for e in _data(res) or []}
+
+    async def create(self, row: dict) -> dict:
+        return _first(await self.client.table("experiments").insert(row).execute())
+
+    async def update(self, experiment_id: str, fields: dict) -> Optional[dict]:
+        return _first(await self.client.table("experiments").update(fields).eq("id", experiment_id).execute())
+
+    async def delete(self, experiment_id: str) -> bool:
+        return bool(_data(await self.client.table("experiments").delete().eq("id", experiment_id).execute()))
+
+
+class SupabaseJobRepository(_Base, JobRepository):
+    async def get(self, job_id: str) -> Optional[dict]:
+        return _data(await self.client.table("training_jobs").select("*").eq("id", job_id).maybe_single().execute())
+
+    async def version(self, job_id: str, columns: Sequence[str]) -> Optional[dict]:
+        res = await self.client.table("training_jobs").select(", ".join(("id", *columns))).eq("id", job_id).maybe_single().execute()
+        return _data(res)
+
+    async def existing(self, job_ids: Sequence[str]) -> Set[str]:
+        res = await self.client.table("training_jobs").select("id").in_("id", list(job_ids)).execute()
+        return {j["id"] for j in _data(res) or []}
+
+    async def latest_for_experiments(self, experiment_ids: Sequence[str]) -> Dict[str, dict]:
+        res = await (
+            self.client.table("training_jobs")
+            .select(LATEST_JOB_COLUMNS)
+            .in_("experiment_id", list(experiment_ids))
+            .order("created_at", desc=True)
+            .execute()
+        )
+        latest: Dict[str, dict] = {}
+        for job in _data(res) or []:
+            latest.setdefault(job["experiment_id"], job)
+        return latest
+
+    async def create(self, row: dict) -> dict:
+        return _first(await self.client.table("training_jobs").insert(row).execute())
+
+    async def update(self, job_id: str, fields: dict, expect_status: Optional[str] = None) -> Optional[dict]:
+        q = self.client.table("training_jobs").update(fields).eq("id", job_id)
+        if expect_status is not None:
+            q = q.eq("status", expect_status)
+        return _first(await q.execute())
+
+    async def update_many(self, job_ids: Sequence[str], fields: dict):
+        await self.client.table("training_jobs").update(fields).in_("id", list(job_ids)).execute()
+
+    async def compaction_candidates(self, metrics_tier: str, completed_before: str, limit: int) -> List[str]:
+        res = await (
+            self.client.table("training_jobs")
+            .select("id")
+            .eq("metrics_tier", metrics_tier)
+            .in_("status", list(FINISHED_STATUSES))
+            .lt("completed_at", completed_before)
+            .order("completed_at")
+            .limit(limit)
+            .execute()
+        )
+        return [j["id"] for j in _data(res) or []]
+
+    async def claim(self, job_id: str, worker: str, lease_seconds: int) -> Optional[dict]:
+        res = await self.client.rpc(
+            "claim_training_job", {"p_job_id": job_id, "p_worker": worker, "p_lease_seconds": lease_seconds}
+        ).execute()
+        return _first(res)
+
+    async def renew_leases(self, worker: str, job_ids: Sequence[str], lease_seconds: int) -> Set[str]:
+        res = await self.client.rpc(
+            "renew_job_leases", {"p_worker": worker, "p_job_ids": list(job_ids), "p_lease_seconds": lease_seconds}
+        ).execute()
+        return {j["id"] for j in _data(res) or []}
+
+    async def reap(self, worker: str, lease_seconds: int, limit: int) -> List[dict]:
+        res = await self.client.rpc(
+            "reap_training_jobs", {"p_worker": worker, "p_lease_seconds": lease_seconds, "p_limit": limit}
+        ).execute()
+        return _data(res) or []
+
+    async def release_leases(self, worker: str, job_ids: Sequence[str]) -> int:
+        res = await self.client.rpc("release_job_leases", {"p_worker": worker, "p_job_ids": list(job_ids)}).execute()
+        return int(_data(res) or 0)
+
+
+class SupabaseMetricRepository(_Base, MetricRepository):
+    async def series(self, job_id: str, start_epoch: Optional[int] = None, end_epoch: Optional[int] = None) -> List[dict]:
+        q = self.client.table("metrics").select("*").eq("job_id", job_id).gte("epoch", start_epoch or 0)
+        if end_epoch is not None:
+            q = q.lte("epoch", end_epoch)
+        return _data(await q.order("epoch").order("step").execute()) or []
+
+    async def downsample(self, job_id, buckets, start_epoch, end_epoch, metric="loss") -> Tuple[List[dict], int]:
+        try:
+            res = await self.client.rpc(
+                "downsample_job_metrics",
+                {
+                    "p_job_id": job_id,
+                    "p_buckets": buckets,
+                    "p_start_epoch": start_epoch,
+                    "p_end_epoch": end_epoch,
+                    "p_metric": metric,
+                },
+            ).execute()
+        except APIError:
+            # downsample_job_metrics not installed (see supabase/schema.sql): every row is a candidate
+            rows = await self.series(job_id, start_epoch, end_epoch)
+            for i, r in enumerate(rows):
+                r["point_index"] = i
+            return rows, len(rows)
+        rows = _data(res) or []
+        return rows, int(rows[0]["total_points"]) if rows else 0
+
+    async def last_point(self, job_id: str) -> Optional[dict]:
+        res = await (
+            self.client.table("metrics")
+            .select("epoch, step")
+            .eq("job_id", job_id)
+            .order("epoch", desc=True)
+            .order("step", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return _first(res)
+
+    async def page(self, job_id, columns, start_epoch, end_epoch, after, limit) -> List[dict]:
+        q = self.client.table("metrics").select(", ".join(["id", "job_id", "epoch", "step", *columns])).eq("job_id", job_id)
+        if start_epoch is not None:
+            q = q.gte("epoch", start_epoch)
+        if end_epoch is not None:
+            q = q.lte("epoch", end_epoch)
+        if after:
+            e, s, i = after["epoch"], after["step"], quote_value(after["id"])
+            q = q.or_(f"epoch.gt.{e},and(epoch.eq.{e},step.gt.{s}),and(epoch.eq.{e},step.eq.{s},id.gt.{i})")
+        return _data(await q.order("epoch").order("step").order("id").limit(limit).execute()) or []
+
+    async def series_for_jobs(self, job_ids: Sequence[str], columns: Sequence[str]) -> Dict[str, List[dict]]:
+        """All jobs' series in one projected in_() query; extra pages (server max-rows) are fetched concurrently."""
+        select = ", ".join(["job_id", "epoch", "step", *columns])
+
+        def page(offset: int, limit: int, count=None):
+            return (
+                self.client.table("metrics")
+                .select(select, count=count)
+                .in_("job_id", list(job_ids))
+                .order("job_id")
+                .order("epoch")
+                .order("step")
+                .range(offset, offset + limit - 1)
+                .execute()
+            )
+
+        first = await page(0, 10000, count="exact")
+        rows = _data(first) or []
+        total = getattr(first, "count", None) or len(rows)
+        if rows and total > len(rows):
+            size = len(rows)
+            for more in await asyncio.gather(*(page(off, size) for off in range(size, total, size))):
+                rows.extend(_data(more) or [])
+
+        by_job: Dict[str, List[dict]] = {}
+        for r in rows:
+            by_job.setdefault(r["job_id"], []).append(r)
+        return by_job
+
+    async def insert(self, rows: List[dict]):
+        if rows:
+            await self.client.table("metrics").insert(rows).execute()
+
+    async def rollup_rows(
+        self,
+        job_ids: Sequence[str],
+        metrics: Optional[Iterable[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> List[dict]:
+        q = self.client.table("metric_rollups").select("*").in_("job_id", list(job_ids))
+        if metrics is not None:
+            q = q.in_("metric", list(metrics))
+        if start_epoch is None and end_epoch is None:
+            q = q.eq("epoch", JOB_EPOCH)
+        else:
+            q = q.gte("epoch", max(start_epoch or 0, 0))
+            if end_epoch is not None:
+                q = q.lte("epoch", end_epoch)
+        return _data(await q.execute()) or []
+
+    async def upsert_rollups(self, rows: List[dict]):
+        if rows:
+            await self.client.table("metric_rollups").upsert(rows, on_conflict="job_id,epoch,metric").execute()
+
+    async def rebuild_rollups(self, job_id: str):
+        await self.client.rpc("rebuild_metric_rollups", {"p_job_id": job_id}).execute()
+
+    async def tier_series(
+        self,
+        job_ids: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+        start_epoch: Optional[int] = None,
+        end_epoch: Optional[int] = None,
+    ) -> Dict[str, List[dict]]:
+        select = ", ".join(["job_id", "resolution", "epoch", "step", *(columns or TIER_COLUMNS)])
+        q = self.client.table("metrics_downsampled").select(select).in_("job_id", list(job_ids))
+        if start_epoch is not None:
+            q = q.gte("epoch", start_epoch)
+        if end_epoch is not None:
+            q = q.lte("epoch", end_epoch)
+        try:
+            res = await q.order("job_id").order("resolution").order("epoch").order("step").execute()
+        except APIError:
+            return {}  # metrics_downsampled not installed (see supabase/schema.sql): nothing was compacted
+        by_job: Dict[str, Dict[int, List[dict]]] = {}
+        for r in _data(res) or []:
+            by_job.setdefault(r["job_id"], {}).setdefault(r["resolution"], []).append(r)
+        # Finest tier per job: the per-k-step rows while they are kept, else the per-epoch rows
+        return {job: tiers[min(tiers, key=lambda k: k or float("inf"))] for job, tiers in by_job.items()}
+
+    async def compact(self, job_id: str, tier: str, step_bucket: int) -> int:
+        res = await self.client.rpc(
+            "compact_job_metrics", {"p_job_id": job_id, "p_tier": tier, "p_step_bucket": step_bucket}
+        ).execute()
+        return int(_data(res) or 0)
+
+
+def _group_count(rows: list, column: str) -> dict:
+    counts = {}
+    for r in rows:
+        key = r.get(column) or "unknown"
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _avg_duration_minutes(jobs: list) -> float:
+    durations = []
+    for j in jobs:
+        if j.get("status") == "completed" and j.get("started_at") and j.get("completed_at"):
+            started = datetime.fromisoformat(j["started_at"].replace("Z", "+00:00"))
+            completed = datetime.fromisoformat(j["completed_at"].replace("Z", "+00:00"))
+            durations.append((completed - started).total_seconds() / 60)
+    return sum(durations) / len(durations) if durations else 0.0
+
+
+class SupabaseRepositories(_Base, Repositories):
+    def __init__(self):
+        self.datasets = SupabaseDatasetRepository()
+        self.experiments = SupabaseExperimentRepository()
+        self.jobs = SupabaseJobRepository()
+        self.metrics = SupabaseMetricRepository()
+
+    async def overview(self) -> Dict[str, Any]:
+        """Grouped counts, dataset size and average job duration, aggregated in the database."""
+        try:
+            res = await self.client.rpc("stats_overview", {}).execute()
+            if res and res.data:
+                return res.data
+        except APIError:
+            pass
+        # stats_overview not installed (see supabase/schema.sql): aggregate narrow projections here
+        exp_res, ds_res, jobs_res = await asyncio.gather(
+            self.client.table("experiments").select("status").execute(),
+            self.client.table("datasets").select("modality, size_bytes").execute(),
+            self.client.table("training_jobs").select("status, started_at, completed_at").execute(),
+        )
+        experiments = exp_res.data or []
+        datasets = ds_res.data or []
+        jobs = jobs_res.data or []
+        return {
+            "experiments_by_status": _group_count(experiments, "status"),
+            "datasets_by_modality": _group_count(datasets, "modality"),
+            "datasets_total_size_bytes": sum((d.get("size_bytes") or 0) for d in datasets),
+            "jobs_by_status": _group_count(jobs, "status"),
+            "avg_job_duration_minutes": _avg_duration_minutes(jobs),
+        }
+
+    async def close(self):
+        await close_async_supabase()
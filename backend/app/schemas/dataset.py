@@ -29,4 +29,4 @@ class DatasetResponse(DatasetBase):
 
 class DatasetListResponse(BaseModel):
     data: List[DatasetResponse]
-    pagination: Dict[str, int]
+    pagination: Dict[str, Any]
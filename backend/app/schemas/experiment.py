@@ -1,13 +1,21 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
 
+class SimulationConfig(BaseModel):
+    # Curve shape: a key of app.utils.simulation.PROFILES (not imported here, it pulls in NumPy)
+    profile: Optional[Literal["default", "warmup", "plateau", "divergence"]] = None
+    # Added to the per-job seed; the same job id and seed reproduce the same run
+    seed: Optional[int] = Field(None, ge=0)
+
+
 class ExperimentConfig(BaseModel):
     model_type: str
     hyperparameters: Dict[str, Any]
     architecture: Optional[Dict[str, Any]] = None
     data_config: Optional[Dict[str, Any]] = None
+    simulation: Optional[SimulationConfig] = None
 
 
 class ExperimentBase(BaseModel):
@@ -46,7 +54,7 @@ class ExperimentResponse(ExperimentBase):
 
 class ExperimentListResponse(BaseModel):
     data: List[ExperimentResponse]
-    pagination: Dict[str, int]
+    pagination: Dict[str, Any]
 
 
 class JobStartResponse(BaseModel):
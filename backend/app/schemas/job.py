@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
 
 
@@ -20,3 +20,16 @@ class TrainingJobResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SchedulerStats(BaseModel):
+    max_workers: int
+    running: int
+    queue_depth: int
+    queued_by_owner: Dict[str, int]
+    running_by_owner: Dict[str, int]
+    dispatched_total: int
+    oldest_queued_seconds: float
+    avg_wait_seconds: float
+    p95_wait_seconds: float
+    max_wait_seconds: float
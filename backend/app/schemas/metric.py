@@ -28,6 +28,7 @@ class MetricSummary(BaseModel):
     best_accuracy: float
     current_loss: float
     current_accuracy: float
+    by_metric: Optional[Dict[str, Dict[str, float]]] = None  # count/min/max/last/mean/variance per metric
 
 
 class MetricsResponse(BaseModel):
@@ -0,0 +1,103 @@
+"""
+Broadcast hub for live job updates (WebSocket /jobs/{job_id}/metrics/stream).
+Each connection gets its own bounded queue. An update is serialized once and the same text is
+handed to every subscriber of the job. When a slow consumer's queue is full, its oldest
+metric_update is dropped so newer state (and job_complete) still gets through.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+
+class Subscription:
+    """One WebSocket connection's view of a job. Only touched from the event loop thread."""
+
+    def __init__(self, job_id: str, maxsize: int):
+        self.job_id = job_id
+        self.maxsize = max(1, maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._messages: Deque[Tuple[bool, str]] = deque()  # (droppable, text)
+        self._ready = asyncio.Event()
+
+    def offer(self, text: str, droppable: bool = True):
+        if self.closed:
+            return
+        if len(self._messages) >= self.maxsize:
+            for i, (is_droppable, _) in enumerate(self._messages):
+                if is_droppable:
+                    del self._messages[i]
+                    self.dropped += 1
+                    break
+            else:
+                if droppable:
+                    # Queue holds only must-deliver messages; the new metric update is the one to go
+                    self.dropped += 1
+                    return
+        self._messages.append((droppable, text))
+        self._ready.set()
+
+    async def get(self) -> Optional[str]:
+        """Next message for this connection, or None once the subscription is closed."""
+        while not self._messages:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._messages.popleft()[1]
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class BroadcastHub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Event loop that owns the subscriptions; publish() from other threads hands off to it."""
+        self._loop = loop
+
+    def subscribe(self, job_id: str) -> Subscription:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(job_id, self.queue_size)
+        self._subscriptions.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove one connection; other viewers of the same job keep receiving updates."""
+        subscription.close()
+        subs = self._subscriptions.get(subscription.job_id)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self._subscriptions[subscription.job_id]
+
+    def publish(self, job_id: str, update: dict):
+        """Thread-safe: serialize once and fan out on the event loop."""
+        if not self._subscriptions.get(job_id) or self._loop is None:
+            return
+        self.publish_text(job_id, json.dumps(update, default=str), update.get("type") == "metric_update")
+
+    def publish_text(self, job_id: str, text: str, droppable: bool = True):
+        """Thread-safe fan-out of an already serialized update."""
+        if not self._subscriptions.get(job_id) or self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, job_id, text, droppable)
+        except RuntimeError:
+            pass  # Loop closed (shutdown)
+
+    def _fanout(self, job_id: str, text: str, droppable: bool):
+        for subscription in list(self._subscriptions.get(job_id, ())):
+            subscription.offer(text, droppable)
+
+    def subscriber_count(self, job_id: Optional[str] = None) -> int:
+        if job_id is not None:
+            return len(self._subscriptions.get(job_id, ()))
+        return sum(len(subs) for subs in self._subscriptions.values())
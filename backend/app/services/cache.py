@@ -0,0 +1,45 @@
+"""
+Small in-process TTL cache for read-heavy endpoints.
+Entries are tagged with the tables they were computed from; writes to a table call
+invalidate_tables() so readers never wait out the TTL after their own change.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Any, frozenset]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, tables: Iterable[str] = ()):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, frozenset(tables))
+
+    def invalidate_tables(self, *tables: str):
+        """Drop every entry computed from any of the given tables."""
+        with self._lock:
+            stale = [k for k, (_, _, deps) in self._entries.items() if deps.intersection(tables)]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = TTLCache()
@@ -0,0 +1,206 @@
+"""
+Request-level performance metrics, exposed in Prometheus text format at GET /metrics.
+MetricsMiddleware times every HTTP request by route template, counts in-flight requests and response bytes,
+and attributes database calls to the request that made them: storage backends wrap each call in db_call(),
+which adds to the current request's counters (a context variable, so calls in asyncio.gather() children
+count too). Calls made outside a request (training workers, sweeps) only feed the process-wide totals.
+Training and WebSocket gauges are read from TrainingService at scrape time.
+
+Query tracing: with QUERY_DEBUG=true (or this module's logger at DEBUG) each call also records what it ran
+(table, operation, filters, projection, rows, latency) on the request. Traces are logged at DEBUG, returned
+in the X-Query-Trace response header when QUERY_DEBUG is on, and a query shape that repeats
+QUERY_REPEAT_THRESHOLD times within one request is logged as a likely N+1.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from app import boot
+from app.config import settings
+from app.utils.prometheus import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "X-Query-Trace"
+# Responses carry at most this much trace JSON (proxies reject oversized headers); the rest is dropped
+TRACE_HEADER_MAX_BYTES = 8192
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+DB_CALL_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 10, 15, 20, 30, 50, 100)
+DB_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_LABELS = ("method", "route")
+
+REQUESTS = Counter("conductor_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_DURATION = Histogram(
+    "conductor_http_request_duration_seconds", "HTTP request latency, including streamed bodies.", HTTP_LABELS
+)
+REQUESTS_IN_PROGRESS = Gauge("conductor_http_requests_in_progress", "HTTP requests being served.", ("method",))
+RESPONSE_SIZE = Histogram(
+    "conductor_http_response_size_bytes", "HTTP response body size.", HTTP_LABELS, buckets=SIZE_BUCKETS
+)
+REQUEST_DB_CALLS = Histogram(
+    "conductor_http_request_db_calls", "Database calls made by one HTTP request.", HTTP_LABELS, buckets=DB_CALL_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    "conductor_http_request_db_duration_seconds",
+    "Time one HTTP request spent in database calls.",
+    HTTP_LABELS,
+    buckets=DB_SECONDS_BUCKETS,
+)
+DB_CALL_DURATION = Histogram(
+    "conductor_db_call_duration_seconds",
+    "Latency of every database call (requests and background work).",
+    buckets=DB_SECONDS_BUCKETS,
+)
+
+
+def _training_gauge(key: str):
+    def collect() -> Dict[tuple, float]:
+        from app.services.training import TrainingService
+
+        return {(): TrainingService().scheduler.stats()[key]}
+
+    return collect
+
+
+def _websocket_subscribers() -> Dict[tuple, float]:
+    from app.services.training import TrainingService
+
+    return {(): TrainingService.hub.subscriber_count()}
+
+
+Gauge("conductor_training_jobs_running", "Training jobs running in this process.", callback=_training_gauge("running"))
+Gauge("conductor_training_jobs_queued", "Training jobs queued in this process.", callback=_training_gauge("queue_depth"))
+Gauge("conductor_websocket_subscribers", "WebSocket connections subscribed to job updates.", callback=_websocket_subscribers)
+
+
+@dataclass
+class RequestStats:
+    db_calls: int = 0
+    db_seconds: float = 0.0
+    queries: Optional[List[dict]] = None  # traces, when tracing is on
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def tracing_enabled() -> bool:
+    return settings.query_debug or logger.isEnabledFor(logging.DEBUG)
+
+
+def record_db_call(seconds: float, describe: Optional[Callable[[], dict]] = None):
+    """
+    Count one database call. describe() returns its trace ({"op", "table", "shape", ...}, where shape
+    is the query without its values) and is only called when the current request is being traced.
+    """
+    DB_CALL_DURATION.observe(seconds)
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.db_calls += 1
+    stats.db_seconds += seconds
+    if stats.queries is not None and describe is not None:
+        trace = {**describe(), "ms": round(seconds * 1000, 3)}
+        stats.queries.append(trace)
+        logger.debug("query %s", trace)
+
+
+class DbCall:
+    """Handle yielded by db_call(); set rows and describe for the trace."""
+
+    __slots__ = ("rows", "describe")
+
+    def __init__(self):
+        self.rows: Optional[int] = None
+        self.describe: Optional[Callable[[Optional[int]], dict]] = None
+
+
+@contextmanager
+def db_call(describe: Optional[Callable[[Optional[int]], dict]] = None):
+    """Time one database round trip (also when it raises). describe(rows) builds its trace."""
+    call = DbCall()
+    call.describe = describe
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - start
+        record_db_call(elapsed, (lambda: call.describe(call.rows)) if call.describe else None)
+
+
+def repeated_queries(queries: List[dict], threshold: int) -> Dict[str, int]:
+    """Query shapes that ran at least threshold times: the N+1 pattern."""
+    counts: Dict[str, int] = {}
+    for q in queries:
+        counts[q["shape"]] = counts.get(q["shape"], 0) + 1
+    return {shape: n for shape, n in counts.items() if n >= threshold}
+
+
+def trace_header(queries: List[dict]) -> str:
+    """Compact JSON for X-Query-Trace ({"count", "ms", "queries"}), trimmed to TRACE_HEADER_MAX_BYTES."""
+    summary = {"count": len(queries), "ms": round(sum(q["ms"] for q in queries), 3)}
+    kept = [{k: v for k, v in q.items() if k != "shape"} for q in queries]
+    while True:
+        text = json.dumps({**summary, "queries": kept}, separators=(",", ":"), default=str)
+        if len(text) <= TRACE_HEADER_MAX_BYTES or not kept:
+            return text
+        kept = kept[: len(kept) // 2]
+
+
+def _route_label(scope) -> str:
+    # The route template (e.g. /api/v1/jobs/{job_id}/metrics) keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched and are timed to the last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status, size = 500, 0
+
+        stats = RequestStats(queries=[] if tracing_enabled() else None)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.query_debug and stats.queries is not None:
+                    # Queries issued while a streaming body is produced come after the headers and are not included
+                    headers = list(message.get("headers", []))
+                    headers.append((TRACE_HEADER.lower().encode(), trace_header(stats.queries).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        token = _request_stats.set(stats)
+        REQUESTS_IN_PROGRESS.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            boot.mark("first_response")
+            REQUESTS_IN_PROGRESS.dec((method,))
+            _request_stats.reset(token)
+            labels = (method, _route_label(scope))
+            REQUESTS.inc((*labels, str(status)))
+            REQUEST_DURATION.observe(elapsed, labels)
+            RESPONSE_SIZE.observe(size, labels)
+            REQUEST_DB_CALLS.observe(stats.db_calls, labels)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, labels)
+            if settings.query_debug and stats.queries:
+                for shape, n in repeated_queries(stats.queries, settings.query_repeat_threshold).items():
+                    logger.warning("Repeated query (possible N+1) in %s %s: %d x %s", method, labels[1], n, shape)
@@ -0,0 +1,78 @@
+"""
+Durable training queue: training_jobs is the queue, and a worker process holds each job it has queued or
+running through a lease (claim_training_job and friends in supabase/schema.sql). LeaseKeeper's heartbeat
+thread renews this worker's leases, reports the jobs it lost (cancelled, or taken over by another worker after
+missed heartbeats) and reaps orphaned jobs, whose worker crashed or was redeployed, up to its free capacity.
+Reaped jobs continue after their last written metric row (MetricWriter.resume()).
+"""
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, List, Optional, Sequence
+from app.config import settings
+from app.repositories import get_repositories, run_sync
+
+# Lease owner for this process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseKeeper:
+    def __init__(
+        self,
+        held: Callable[[], List[str]],
+        capacity: Callable[[], int],
+        on_lost: Callable[[str], None],
+        on_reaped: Callable[[dict], None],
+        worker_id: str = WORKER_ID,
+        lease_seconds: Optional[int] = None,
+        heartbeat_seconds: Optional[float] = None,
+    ):
+        self.held = held
+        self.capacity = capacity
+        self.on_lost = on_lost
+        self.on_reaped = on_reaped
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.job_heartbeat_seconds
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the heartbeat thread (idempotent). The first beat reaps right away."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="job-lease-heartbeat", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"Error renewing training job leases: {e}")
+            self._stop.wait(self.heartbeat_seconds)
+
+    def beat(self):
+        """Renew the leases on held jobs, report lost ones, then reap orphaned jobs into the free slots."""
+        repos = get_repositories()
+        held = self.held()
+        if held:
+            kept = run_sync(repos.jobs.renew_leases(self.worker_id, held, self.lease_seconds))
+            for job_id in held:
+                if job_id not in kept:
+                    self.on_lost(job_id)
+        slots = self.capacity()
+        if slots > 0 and not self._stop.is_set():
+            for job in run_sync(repos.jobs.reap(self.worker_id, self.lease_seconds, slots)):
+                self.on_reaped(job)
+
+    def release(self, job_ids: Sequence[str]) -> int:
+        """Hand the given jobs' leases back now, so other workers resume them without waiting for expiry."""
+        if not job_ids:
+            return 0
+        return run_sync(get_repositories().jobs.release_leases(self.worker_id, list(job_ids)))
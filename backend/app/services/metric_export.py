@@ -0,0 +1,171 @@
+"""
+Bulk reads of job metrics for export.
+iter_metric_pages walks a job's metrics in keyset order (epoch, step, id) one page at a time,
+prefetching the next page while the caller consumes the current one. The NDJSON, Arrow and Parquet
+encoders turn each page into lines or a column-projected record batch and yield the encoded bytes as
+they are produced, so memory stays bounded by one page (one row group for Parquet) whatever the job length.
+pyarrow is only needed for the columnar formats and is imported on first use.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+from app.config import settings
+from app.repositories import ROLLUP_METRICS, TIER_COLUMNS, MetricRepository
+
+# Columns a caller may project (job_id, epoch and step are always included)
+EXPORT_COLUMNS = (*ROLLUP_METRICS, "timestamp")
+# NDJSON lines carry everything MetricResponse does
+NDJSON_COLUMNS = (*EXPORT_COLUMNS, "custom_metrics")
+
+
+async def iter_metric_pages(
+    repo: MetricRepository,
+    job_id: str,
+    columns: Sequence[str] = EXPORT_COLUMNS,
+    start_epoch: Optional[int] = None,
+    end_epoch: Optional[int] = None,
+    page_rows: Optional[int] = None,
+) -> AsyncIterator[List[dict]]:
+    """
+    Yield the job's metric rows in (epoch, step) order, page_rows at a time. A job whose raw rows were
+    compacted (app.services.retention) yields its finest downsampled tier instead, in one page.
+    """
+    page_rows = page_rows or settings.metric_page_rows
+
+    def fetch(after: Optional[dict]):
+        return repo.page(job_id, columns, start_epoch, end_epoch, after, page_rows)
+
+    # A short page is not the end (PostgREST max-rows may cap it below page_rows); an empty one is
+    pending = asyncio.ensure_future(fetch(None))
+    try:
+        first = True
+        while True:
+            rows = await pending
+            if not rows:
+                if first:
+                    tier = [c for c in columns if c in TIER_COLUMNS]
+                    rows = (await repo.tier_series([job_id], tier, start_epoch, end_epoch)).get(job_id)
+                    if rows:
+                        yield [{k: r[k] for k in ("job_id", "epoch", "step", *tier)} for r in rows]
+                return
+            first = False
+            pending = asyncio.ensure_future(fetch(rows[-1]))
+            yield rows
+    finally:
+        pending.cancel()
+
+
+async def stream_ndjson(
+    repo: MetricRepository,
+    job_id: str,
+    start_epoch: Optional[int] = None,
+    end_epoch: Optional[int] = None,
+    step: int = 1,
+) -> AsyncIterator[bytes]:
+    """One JSON object per metric row (every step-th row), one chunk per page."""
+    index = 0
+    async for rows in iter_metric_pages(repo, job_id, NDJSON_COLUMNS, start_epoch, end_epoch):
+        lines = []
+        for r in rows:
+            if index % step == 0:
+                lines.append(json.dumps(r, separators=(",", ":")))
+            index += 1
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def _arrow_schema(columns: Sequence[str]):
+    import pyarrow as pa
+
+    fields = [
+        pa.field("job_id", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("epoch", pa.int32()),
+        pa.field("step", pa.int32()),
+    ]
+    for c in columns:
+        fields.append(pa.field(c, pa.timestamp("us", tz="UTC") if c == "timestamp" else pa.float64()))
+    return pa.schema(fields)
+
+
+def _record_batch(rows: List[dict], schema):
+    import pyarrow as pa
+
+    arrays = []
+    for field in schema:
+        values = [r.get(field.name) for r in rows]
+        if field.name == "timestamp":
+            values = [datetime.fromisoformat(v) if v else None for v in values]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object collecting encoder output until the response generator drains it."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def _job_batches(
+    repo: MetricRepository, job_ids: Iterable[str], columns: Sequence[str], schema
+) -> AsyncIterator:
+    for job_id in job_ids:
+        async for rows in iter_metric_pages(repo, job_id, columns):
+            yield _record_batch(rows, schema)
+
+
+async def stream_arrow(repo: MetricRepository, job_ids: Sequence[str], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    """Arrow IPC stream: schema first, then one record batch per metrics page."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    async for batch in _job_batches(repo, job_ids, columns, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+async def stream_parquet(
+    repo: MetricRepository, job_ids: Sequence[str], columns: Sequence[str]
+) -> AsyncIterator[bytes]:
+    """Parquet (zstd): pages are buffered into row groups of parquet_row_group_rows, each written out as it fills."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    pending, pending_rows = [], 0
+    async for batch in _job_batches(repo, job_ids, columns, schema):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= settings.parquet_row_group_rows:
+            writer.write_table(pa.Table.from_batches(pending, schema))
+            pending, pending_rows = [], 0
+            yield sink.drain()
+    if pending:
+        writer.write_table(pa.Table.from_batches(pending, schema))
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,126 @@
+"""
+Buffered metric writer for training jobs.
+Collects metric rows for one job and writes them through the storage backend as a single bulk insert
+(COPY on Postgres), merging progress/current_epoch and the latest metric values into one training_jobs
+update per flush. The job's metric rollups are updated from the same rows and upserted alongside.
+Runs on training worker threads: each flush is one run_sync() call onto the event loop.
+"""
+import asyncio
+import time
+import uuid
+from typing import List, Optional
+from app.config import settings
+from app.repositories import ROLLUP_METRICS, Repositories, run_sync
+from app.services.rollups import MetricRollups
+
+
+class MetricWriter:
+    """Per-job write buffer. Flushes when `batch_size` rows are buffered or `flush_interval` seconds have passed."""
+
+    def __init__(
+        self,
+        repos: Repositories,
+        job_id: str,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        self.repos = repos
+        self.job_id = job_id
+        self.batch_size = batch_size or settings.metric_flush_rows
+        self.flush_interval = flush_interval if flush_interval is not None else settings.metric_flush_interval_seconds
+        self.rollups = MetricRollups(job_id)
+        self._rows: List[dict] = []
+        self._job_update: Optional[dict] = None
+        self._last_flush = time.monotonic()
+
+    def resume(self) -> Optional[dict]:
+        """
+        Continue a job an earlier worker was interrupted on: rebuild its rollups from the rows it wrote, load
+        them into this writer and return the last written point (epoch, step), or None if nothing was written.
+        """
+        return run_sync(self._resume())
+
+    async def _resume(self) -> Optional[dict]:
+        last = await self.repos.metrics.last_point(self.job_id)
+        if last is None:
+            return None
+        # Rows and rollups are written in separate calls, so an interrupted flush can leave the rollups behind
+        await self.repos.metrics.rebuild_rollups(self.job_id)
+        job_rows, epoch_rows = await asyncio.gather(
+            self.repos.metrics.rollup_rows([self.job_id]),
+            self.repos.metrics.rollup_rows([self.job_id], start_epoch=last["epoch"], end_epoch=last["epoch"]),
+        )
+        self.rollups.load([*job_rows, *epoch_rows])
+        return last
+
+    def add(self, row: dict, progress: Optional[float] = None, current_epoch: Optional[int] = None):
+        """Buffer one metric row (and the job progress it implies); flush if the buffer is full or stale."""
+        self._rows.append({"id": str(uuid.uuid4()), "job_id": self.job_id, **row})
+        if progress is not None or current_epoch is not None:
+            update = dict(self._job_update or {})
+            if progress is not None:
+                update["progress"] = progress
+            if current_epoch is not None:
+                update["current_epoch"] = current_epoch
+            self._job_update = update
+        if len(self._rows) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered rows in one insert, the changed rollups in one upsert and the latest progress/metrics in one
+        update. If a write fails, whatever it did not store goes back into the buffer (for the next flush or close())
+        and the error is raised.
+        """
+        rows, self._rows = self._rows, []
+        job_update, self._job_update = self._job_update, None
+        self._last_flush = time.monotonic()
+        if rows:
+            # Feeds experiments.latest_job (current_job.latest_metrics) via the training_jobs trigger
+            last = rows[-1]
+            job_update = {
+                **(job_update or {}),
+                "latest_metrics": {m: float(last[m]) for m in ROLLUP_METRICS if last.get(m) is not None},
+            }
+        if rows or job_update:
+            run_sync(self._write(rows, job_update))
+
+    async def _write(self, rows: List[dict], job_update: Optional[dict]):
+        # The job's thread is blocked in run_sync() meanwhile, so the buffer and rollups are safe to touch here
+        if rows:
+            try:
+                await self.repos.metrics.insert(rows)
+            except Exception:
+                self._requeue(rows, job_update)
+                raise
+            # Rollups only ever count stored rows
+            self.rollups.add(rows)
+        # Also carries rollups left over from a failed upsert (the failure requeues job_update, so a flush follows)
+        rollup_rows = self.rollups.dirty_rows()
+        if rollup_rows:
+            try:
+                await self.repos.metrics.upsert_rollups(rollup_rows)
+            except Exception:
+                self.rollups.mark_dirty(rollup_rows)
+                self._requeue([], job_update)
+                raise
+        if job_update:
+            try:
+                await self.repos.jobs.update(self.job_id, job_update)
+            except Exception:
+                self._requeue([], job_update)
+                raise
+
+    def _requeue(self, rows: List[dict], job_update: Optional[dict]):
+        self._rows[:0] = rows
+        if job_update:
+            # Fields buffered since the failed flush are newer
+            self._job_update = {**job_update, **(self._job_update or {})}
+
+    def close(self):
+        """Flush anything still buffered. Call on completion, failure and cancel."""
+        self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
@@ -0,0 +1,156 @@
+"""
+Process executor for training jobs (TRAINING_EXECUTOR=process). Each scheduler worker thread drives one
+long-lived worker process, started on first use and replaced if it dies. The simulation, metric rollups,
+row building and JSON encoding of updates therefore run off the API process's GIL.
+Workers write through their own storage connection (get_repositories() in the worker). Job updates stream
+back over a pipe as already-encoded pub/sub messages, which the driving thread publishes unchanged.
+Cancel and handoff signals go the other way.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Callable, Dict, Optional, Set
+from app.config import settings
+
+# The API process runs threads and an event loop, so workers are spawned rather than forked
+_context = multiprocessing.get_context("spawn")
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process exited while running a job."""
+
+
+class _Worker:
+    def __init__(self):
+        self.conn, child_conn = _context.Pipe()
+        self.process = _context.Process(target=worker_main, args=(child_conn,), name="training-worker", daemon=True)
+        self.process.start()
+        child_conn.close()  # so recv() raises EOFError once the worker is gone
+        self._send_lock = threading.Lock()
+
+    def send(self, message: tuple):
+        # Signals come from other threads (pub/sub listener, lease heartbeat) than the one driving the job
+        with self._send_lock:
+            self.conn.send(message)
+
+
+class ProcessExecutor:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._by_job: Dict[str, _Worker] = {}
+
+    def _worker(self) -> _Worker:
+        worker = getattr(self._local, "worker", None)
+        if worker is None or not worker.process.is_alive():
+            worker = self._local.worker = _Worker()
+        return worker
+
+    def run(
+        self,
+        job_id: str,
+        config: dict,
+        resume: Optional[dict],
+        cancelled: threading.Event,
+        handed_off: Callable[[], bool],
+        publish: Callable[[str, str], None],
+    ):
+        """
+        Run one job (app.services.training.run_training) in this thread's worker process, publishing its
+        updates as they arrive. Returns when the job ends; raises WorkerCrashed if the process dies first.
+        """
+        worker = self._worker()
+        with self._lock:
+            self._by_job[job_id] = worker
+        try:
+            try:
+                worker.send(("run", job_id, config, resume))
+                # A stop() that came before the job was registered here is forwarded now
+                if cancelled.is_set():
+                    worker.send(("handoff" if handed_off() else "cancel", job_id))
+                while True:
+                    message = worker.conn.recv()
+                    if message[0] == "publish":
+                        publish(message[1], message[2])
+                    elif message[0] == "done":
+                        return
+            except (EOFError, OSError):
+                worker.process.join(5)
+                self._local.worker = None
+                raise WorkerCrashed(f"Training worker process exited unexpectedly (exit code {worker.process.exitcode})")
+        finally:
+            with self._lock:
+                self._by_job.pop(job_id, None)
+
+    def stop(self, job_id: str, handoff: bool = False):
+        """Stop a job at its next step: cancelled, or (handoff) flushed and left for another worker to resume."""
+        with self._lock:
+            worker = self._by_job.get(job_id)
+        if worker is None:
+            return
+        try:
+            worker.send(("handoff" if handoff else "cancel", job_id))
+        except OSError:
+            pass  # The worker is gone; run() reports it
+
+
+def worker_main(conn):
+    """Worker process: run the jobs sent by the driving thread, one at a time."""
+    if settings.training_worker_nice and hasattr(os, "nice"):
+        # Batch work: on contended cores the API process's request handling goes first (also for the imports below)
+        os.nice(settings.training_worker_nice)
+    from app.services.training import run_training
+
+    send_lock = threading.Lock()
+    jobs: "queue.Queue" = queue.Queue()
+    cancel_events: Dict[str, threading.Event] = {}
+    handoff: Set[str] = set()
+
+    def send(message: tuple):
+        with send_lock:
+            conn.send(message)
+
+    def read_control():
+        # Signals arrive while a job runs, so the pipe is read on its own thread
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # The API process is gone and its leases lapse: flush and stop, another worker resumes the job
+                for job_id, event in list(cancel_events.items()):
+                    handoff.add(job_id)
+                    event.set()
+                jobs.put(None)
+                return
+            kind, job_id = message[0], message[1]
+            if kind == "run":
+                cancel_events[job_id] = threading.Event()
+                jobs.put(message[1:])
+            elif job_id in cancel_events:
+                if kind == "handoff":
+                    handoff.add(job_id)
+                cancel_events[job_id].set()
+
+    threading.Thread(target=read_control, name="training-worker-control", daemon=True).start()
+    while True:
+        item = jobs.get()
+        if item is None:
+            return
+        job_id, config, resume = item
+        try:
+            run_training(
+                job_id,
+                config,
+                cancel_events[job_id],
+                lambda: job_id in handoff,
+                lambda channel, message: send(("publish", channel, message)),
+                resume,
+            )
+        finally:
+            cancel_events.pop(job_id, None)
+            handoff.discard(job_id)
+        try:
+            send(("done", job_id))
+        except OSError:
+            return
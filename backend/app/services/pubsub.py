@@ -0,0 +1,117 @@
+"""
+Pub/sub backends for TrainingService notifications.
+Training workers publish to a channel; every API process listens and feeds its own BroadcastHub,
+so a WebSocket connected to one uvicorn worker sees jobs running on any other worker or node.
+PUBSUB_BACKEND=memory (default) delivers in-process; PUBSUB_BACKEND=redis goes through REDIS_URL.
+"""
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Callable, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[str, str], None]  # (channel, message)
+
+
+class PubSubBackend(ABC):
+    def __init__(self):
+        self._listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener):
+        self._listeners.append(listener)
+
+    @abstractmethod
+    def publish(self, channel: str, message: str):
+        ...
+
+    def start(self):
+        """Begin delivering messages to listeners."""
+
+    def close(self):
+        """Stop delivering messages."""
+
+    def _deliver(self, channel: str, message: str):
+        for listener in self._listeners:
+            try:
+                listener(channel, message)
+            except Exception as e:
+                logger.warning("pub/sub listener failed on %s: %s", channel, e)
+
+
+class InProcessPubSub(PubSubBackend):
+    """Single-process fallback: publish() delivers straight to this process's listeners."""
+
+    def publish(self, channel: str, message: str):
+        self._deliver(channel, message)
+
+
+class RedisPubSub(PubSubBackend):
+    """
+    Redis-backed pub/sub. Messages are published to `<prefix><channel>`; a daemon thread
+    pattern-subscribes to `<prefix>*` and delivers everything to local listeners (including
+    this process's own messages, so there is exactly one delivery path).
+    `client` may be any redis-py compatible client (e.g. fakeredis in tests).
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "conductor:"):
+        super().__init__()
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url or settings.redis_url)
+        self._client = client
+        self._prefix = prefix
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def publish(self, channel: str, message: str):
+        self._client.publish(self._prefix + channel, message)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._listen, name="pubsub-redis", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopped.set()
+
+    def _listen(self):
+        backoff = 0.5
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self._prefix + "*")
+                backoff = 0.5
+                while not self._stopped.is_set():
+                    msg = pubsub.get_message(timeout=1.0)
+                    if not msg:
+                        continue
+                    channel = msg["channel"]
+                    data = msg["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self._deliver(channel[len(self._prefix):], data)
+            except Exception as e:
+                logger.warning("Redis pub/sub connection lost (%s); reconnecting in %.1fs", e, backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+def create_pubsub(backend: Optional[str] = None) -> PubSubBackend:
+    backend = (backend or settings.pubsub_backend).lower()
+    if backend == "redis":
+        return RedisPubSub(settings.redis_url)
+    return InProcessPubSub()
@@ -0,0 +1,101 @@
+"""
+Tiered metrics retention. Running and recently finished jobs keep every metrics row; jobs that finished more
+than METRIC_RETENTION_FULL_DAYS ago are compacted into a per-k-step tier and a per-epoch tier
+(metrics_downsampled, see compact_job_metrics in supabase/schema.sql), and after METRIC_RETENTION_STEP_DAYS
+only the per-epoch tier is kept. Reads fall back to the finest stored tier (MetricRepository.tier_series).
+Off unless METRIC_RETENTION_FULL_DAYS is set (both windows default to 0, keep forever).
+
+    python -m app.services.retention [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from app.config import settings
+from app.repositories.base import Repositories
+
+logger = logging.getLogger(__name__)
+
+# (current metrics_tier, target tier, retention setting that triggers the move)
+TIER_STEPS = (
+    ("full", "step", "metric_retention_full_days"),
+    ("step", "epoch", "metric_retention_step_days"),
+)
+
+
+@dataclass
+class CompactionResult:
+    compacted: dict = field(default_factory=lambda: {"step": [], "epoch": []})
+    rows_removed: int = 0
+
+
+async def compact_metrics(
+    repos: Repositories,
+    now: Optional[datetime] = None,
+    batch_size: int = 100,
+    dry_run: bool = False,
+) -> CompactionResult:
+    """Move every job past its retention window down one tier; a job can go full -> step -> epoch in one sweep."""
+    now = now or datetime.now(timezone.utc)
+    result = CompactionResult()
+    for tier, target, setting in TIER_STEPS:
+        days = getattr(settings, setting)
+        if days <= 0:
+            continue
+        cutoff = (now - timedelta(days=days)).isoformat()
+        seen = set()
+        while True:
+            job_ids = [j for j in await repos.jobs.compaction_candidates(tier, cutoff, batch_size) if j not in seen]
+            if not job_ids:
+                break
+            seen.update(job_ids)
+            for job_id in job_ids:
+                if not dry_run:
+                    result.rows_removed += await repos.metrics.compact(job_id, target, settings.metric_compaction_step_bucket)
+                result.compacted[target].append(job_id)
+            if dry_run:
+                break
+    return result
+
+
+async def run_periodically(repos: Repositories, interval_seconds: float):
+    """Background sweep for the API process; errors are logged and retried next interval."""
+    while True:
+        try:
+            result = await compact_metrics(repos)
+            if result.rows_removed:
+                logger.info(
+                    "Compacted metrics: %d job(s) to step tier, %d to epoch tier, %d rows removed",
+                    len(result.compacted["step"]),
+                    len(result.compacted["epoch"]),
+                    result.rows_removed,
+                )
+        except Exception as e:
+            logger.warning("Metrics compaction failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
+async def _main(dry_run: bool):
+    from app.repositories import close_repositories, get_repositories
+
+    try:
+        result = await compact_metrics(get_repositories(), dry_run=dry_run)
+    finally:
+        await close_repositories()
+    verb = "Would compact" if dry_run else "Compacted"
+    for target in ("step", "epoch"):
+        print(f"{verb} {len(result.compacted[target])} job(s) to the {target} tier")
+    if not dry_run:
+        print(f"Removed {result.rows_removed} metric rows")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compact old training jobs' metrics into downsampled tiers.")
+    parser.add_argument("--dry-run", action="store_true", help="list the first batch of candidates without compacting")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(parse_args().dry_run))
@@ -0,0 +1,125 @@
+"""
+Per-job and per-epoch metric rollups (table metric_rollups, see supabase/schema.sql).
+The training metric writer keeps the running count/min/max/last/mean/M2 for its job and upserts the
+changed rollup rows on each flush, so summaries never have to scan the metrics table.
+Rows with epoch = -1 hold the whole-job rollup.
+Writers upsert dirty_rows() through the storage backend (MetricRepository.upsert_rollups), and reads go
+through MetricRepository.rollup_rows().
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from app.repositories.base import JOB_EPOCH, ROLLUP_METRICS
+
+if TYPE_CHECKING:
+    from app.repositories.base import MetricRepository
+
+
+def _empty() -> dict:
+    return {"count": 0, "min": None, "max": None, "last": None, "last_epoch": None, "last_step": None, "mean": 0.0, "m2": 0.0}
+
+
+def merge_rollups(rollups: Iterable[dict]) -> Optional[dict]:
+    """Combine rollup rows (e.g. several epochs) into one, using the parallel variance formula."""
+    out = None
+    for r in rollups:
+        if not r or not r.get("count"):
+            continue
+        if out is None:
+            out = {k: r.get(k) for k in _empty()}
+            out["mean"] = float(r["mean"])
+            out["m2"] = float(r["m2"])
+            continue
+        n_a, n_b = out["count"], int(r["count"])
+        n = n_a + n_b
+        delta = float(r["mean"]) - out["mean"]
+        out["mean"] += delta * n_b / n
+        out["m2"] += float(r["m2"]) + delta * delta * n_a * n_b / n
+        out["count"] = n
+        out["min"] = min(out["min"], r["min"])
+        out["max"] = max(out["max"], r["max"])
+        if (r["last_epoch"], r["last_step"]) >= (out["last_epoch"], out["last_step"]):
+            out["last"], out["last_epoch"], out["last_step"] = r["last"], r["last_epoch"], r["last_step"]
+    return out
+
+
+def variance(rollup: dict) -> float:
+    return float(rollup["m2"]) / rollup["count"] if rollup.get("count") else 0.0
+
+
+class MetricRollups:
+    """Running rollup state for one job, updated from metric rows as they are written."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._stats: Dict[Tuple[int, str], dict] = {}
+        self._dirty: set = set()
+
+    def add(self, rows: Iterable[dict]):
+        for row in rows:
+            epoch, step = row["epoch"], row["step"]
+            for metric in ROLLUP_METRICS:
+                value = row.get(metric)
+                if value is None:
+                    continue
+                value = float(value)
+                for key in ((JOB_EPOCH, metric), (epoch, metric)):
+                    self._update(key, value, epoch, step)
+
+    def load(self, rows: Iterable[dict]):
+        """Seed the running state from stored rollup rows (a resumed job), without marking them dirty."""
+        for r in rows:
+            self._stats[(int(r["epoch"]), r["metric"])] = {
+                **{k: r.get(k) for k in _empty()},
+                "count": int(r["count"]),
+                "mean": float(r["mean"]),
+                "m2": float(r["m2"]),
+            }
+
+    def _update(self, key: Tuple[int, str], value: float, epoch: int, step: int):
+        s = self._stats.get(key)
+        if s is None:
+            s = self._stats[key] = _empty()
+        # Welford's online mean/variance
+        s["count"] += 1
+        delta = value - s["mean"]
+        s["mean"] += delta / s["count"]
+        s["m2"] += delta * (value - s["mean"])
+        s["min"] = value if s["min"] is None else min(s["min"], value)
+        s["max"] = value if s["max"] is None else max(s["max"], value)
+        if s["last_epoch"] is None or (epoch, step) >= (s["last_epoch"], s["last_step"]):
+            s["last"], s["last_epoch"], s["last_step"] = value, epoch, step
+        self._dirty.add(key)
+
+    def dirty_rows(self) -> List[dict]:
+        rows = [{"job_id": self.job_id, "epoch": epoch, "metric": metric, **self._stats[(epoch, metric)]} for epoch, metric in self._dirty]
+        self._dirty = set()
+        return rows
+
+    def mark_dirty(self, rows: Iterable[dict]):
+        """Mark rows from dirty_rows() as changed again (their upsert failed), so the next flush retries them."""
+        self._dirty.update((r["epoch"], r["metric"]) for r in rows)
+
+
+async def get_job_rollups(
+    repo: "MetricRepository",
+    job_id: str,
+    metrics: Optional[Iterable[str]] = None,
+    start_epoch: Optional[int] = None,
+    end_epoch: Optional[int] = None,
+) -> Dict[str, dict]:
+    """Rollup per metric for a job. Without an epoch range this reads only the whole-job rows (O(1) in job length)."""
+    if not start_epoch and end_epoch is None:
+        rows = await repo.rollup_rows([job_id], metrics)
+    else:
+        rows = await repo.rollup_rows([job_id], metrics, start_epoch or 0, end_epoch)
+    by_metric: Dict[str, List[dict]] = {}
+    for r in rows:
+        by_metric.setdefault(r["metric"], []).append(r)
+    return {metric: merged for metric, rows in by_metric.items() if (merged := merge_rollups(rows))}
+
+
+async def get_rollups_for_jobs(repo: "MetricRepository", job_ids: List[str], metrics: Iterable[str]) -> Dict[str, Dict[str, dict]]:
+    """Whole-job rollups for several jobs in one query: {job_id: {metric: rollup}}."""
+    out: Dict[str, Dict[str, dict]] = {}
+    for r in await repo.rollup_rows(job_ids, metrics):
+        out.setdefault(r["job_id"], {})[r["metric"]] = r
+    return out
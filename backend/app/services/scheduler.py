@@ -0,0 +1,136 @@
+"""
+Bounded scheduler for training jobs.
+A fixed pool of worker threads pulls jobs from a priority queue. Among jobs of equal priority,
+the owner (user or tag) with the fewest running jobs goes first, then submission order.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class JobScheduler:
+    def __init__(self, run_job: Callable[[str, dict], None], max_workers: int):
+        self._run_job = run_job
+        self.max_workers = max(1, max_workers)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[Tuple[int, int, str]]] = {}  # owner -> heap of (-priority, seq, job_id)
+        self._pending: Dict[str, dict] = {}  # job_id -> {config, owner, priority, enqueued_at}
+        self._running: Dict[str, str] = {}  # job_id -> owner
+        self._running_per_owner: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._dispatched_total = 0
+
+    def submit(self, job_id: str, config: dict, owner: str = "default", priority: int = 0) -> bool:
+        """Queue a job. Returns False if the job is already queued or running."""
+        with self._cond:
+            if job_id in self._pending or job_id in self._running:
+                return False
+            self._pending[job_id] = {
+                "config": config,
+                "owner": owner,
+                "priority": priority,
+                "enqueued_at": time.monotonic(),
+            }
+            heapq.heappush(self._queues.setdefault(owner, []), (-priority, next(self._seq), job_id))
+            self._ensure_workers()
+            self._cond.notify()
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet. Returns True if it was still queued."""
+        with self._cond:
+            # Heap entry is skipped lazily once the job is gone from _pending
+            return self._pending.pop(job_id, None) is not None
+
+    def is_queued(self, job_id: str) -> bool:
+        return job_id in self._pending
+
+    def is_running(self, job_id: str) -> bool:
+        return job_id in self._running
+
+    def job_ids(self) -> List[str]:
+        """Jobs queued or running here."""
+        with self._cond:
+            return [*self._pending, *self._running]
+
+    def free_slots(self) -> int:
+        """Workers not taken by a running or queued job."""
+        with self._cond:
+            return self.max_workers - len(self._running) - len(self._pending)
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            queued_waits = [now - p["enqueued_at"] for p in self._pending.values()]
+            queued_by_owner: Dict[str, int] = {}
+            for p in self._pending.values():
+                queued_by_owner[p["owner"]] = queued_by_owner.get(p["owner"], 0) + 1
+            waits = sorted(self._wait_times)
+            return {
+                "max_workers": self.max_workers,
+                "running": len(self._running),
+                "queue_depth": len(self._pending),
+                "queued_by_owner": queued_by_owner,
+                "running_by_owner": {o: n for o, n in self._running_per_owner.items() if n},
+                "dispatched_total": self._dispatched_total,
+                "oldest_queued_seconds": round(max(queued_waits), 3) if queued_waits else 0.0,
+                "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "max_wait_seconds": round(waits[-1], 3) if waits else 0.0,
+            }
+
+    def _ensure_workers(self):
+        # Called with the lock held; workers are started lazily up to the pool size
+        if len(self._workers) >= self.max_workers:
+            return
+        worker = threading.Thread(target=self._worker_loop, name=f"training-worker-{len(self._workers)}")
+        worker.daemon = True
+        worker.start()
+        self._workers.append(worker)
+
+    def _next_job(self) -> Optional[Tuple[str, dict]]:
+        # Called with the lock held
+        best_owner = None
+        best_key = None
+        for owner, heap in self._queues.items():
+            while heap and heap[0][2] not in self._pending:
+                heapq.heappop(heap)
+            if not heap:
+                continue
+            neg_priority, seq, _ = heap[0]
+            key = (neg_priority, self._running_per_owner.get(owner, 0), seq)
+            if best_key is None or key < best_key:
+                best_owner, best_key = owner, key
+        if best_owner is None:
+            return None
+        _, _, job_id = heapq.heappop(self._queues[best_owner])
+        if not self._queues[best_owner]:
+            del self._queues[best_owner]
+        return job_id, self._pending.pop(job_id)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                item = self._next_job()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_job()
+                job_id, entry = item
+                owner = entry["owner"]
+                self._running[job_id] = owner
+                self._running_per_owner[owner] = self._running_per_owner.get(owner, 0) + 1
+                self._wait_times.append(time.monotonic() - entry["enqueued_at"])
+                self._dispatched_total += 1
+            try:
+                self._run_job(job_id, entry["config"])
+            except Exception as e:
+                print(f"Error running training job {job_id}: {e}")
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._running_per_owner[owner] = self._running_per_owner.get(owner, 1) - 1
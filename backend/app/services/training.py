@@ -1,165 +1,313 @@
-import asyncio
+import json
 import threading
 import time
-import uuid
 from datetime import datetime
-from typing import Dict, Callable, List
-from supabase import Client
-from app.supabase_client import get_supabase
-from app.utils.simulation import generate_training_metrics
+from typing import Callable, Dict, Optional, Set
+from app.config import settings
+from app.repositories import Repositories, get_repositories, run_sync
+from app.services.broadcast import BroadcastHub, Subscription
+from app.services.cache import cache
+from app.services.job_leases import WORKER_ID, LeaseKeeper
+from app.services.metric_writer import MetricWriter
+from app.services.pubsub import PubSubBackend, create_pubsub
+from app.services.scheduler import JobScheduler
 
+# Lease columns cleared when a job finishes
+_NO_LEASE = {"lease_owner": None, "lease_expires_at": None}
 
-class TrainingService:
-    _instance = None
-    _running_jobs: Dict[str, threading.Thread] = {}
-    _subscribers: Dict[str, List[Callable]] = {}
-    _loop = None  # Main event loop for scheduling async notifications from background thread
+Publish = Callable[[str, str], None]  # (channel, message), as PubSubBackend.publish
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
 
-    def start_training(self, job_id: str, config: dict, supabase: Client):
-        """Start a training job simulation (runs in background thread using Supabase)."""
-        if job_id in self._running_jobs:
-            return  # Already running
+def job_owner(experiment: dict) -> str:
+    """Fair-share key for the scheduler: the submitting user, else the experiment's first tag."""
+    return experiment.get("created_by") or next(iter(experiment.get("tags") or []), None) or "default"
 
-        res = supabase.table("training_jobs").select("*").eq("id", job_id).maybe_single().execute()
-        if not res or not getattr(res, "data", None):
-            return
 
-        now = datetime.utcnow().isoformat()
-        supabase.table("training_jobs").update({
-            "status": "running",
-            "started_at": now,
-        }).eq("id", job_id).execute()
-
-        thread = threading.Thread(target=self._run_training_sync, args=(job_id, config))
-        thread.daemon = True
-        thread.start()
-        self._running_jobs[job_id] = thread
-
-    def _run_training_sync(self, job_id: str, config: dict):
-        """Run training simulation in background thread using Supabase."""
-        supabase = get_supabase()
-        metrics_data = {"loss": 0.0, "accuracy": 0.0}
-        try:
-            hp = config.get("hyperparameters") or {}
-            total_epochs = hp.get("num_epochs", 10)
-            steps_per_epoch = 250
+def _publish_update(publish: Publish, job_id: str, update: dict):
+    publish(f"job:{job_id}:{update.get('type', 'update')}", json.dumps(update, default=str))
+
+
+def fail_job(repos: Repositories, job_id: str, error: str):
+    """Record a job (and its experiment) as failed."""
+    now = datetime.utcnow().isoformat()
+    job = run_sync(repos.jobs.update(job_id, {"status": "failed", "error_message": error, "completed_at": now, **_NO_LEASE}))
+    if job:
+        run_sync(repos.experiments.update(job["experiment_id"], {"status": "failed", "completed_at": now}))
+    cache.invalidate_tables("experiments", "training_jobs")
 
-            for epoch in range(total_epochs):
-                job_res = supabase.table("training_jobs").select("*").eq("id", job_id).maybe_single().execute()
-                if not job_res or not getattr(job_res, "data", None) or job_res.data.get("status") == "cancelled":
+
+def run_training(
+    job_id: str,
+    config: dict,
+    cancelled: threading.Event,
+    handed_off: Callable[[], bool],
+    publish: Publish,
+    resume: Optional[dict] = None,
+):
+    """
+    Run training simulation for a claimed job, writing through the storage backend and publishing its updates.
+    Runs on a scheduler worker thread, or in a training worker process (app.services.process_executor).
+    resume is the job row of a job started before by another worker: it continues after the last metric row
+    written. The loop stops before its next step once cancelled is set; if handed_off() it then only flushes.
+    """
+    # NumPy is only needed once a job runs, so API cold starts skip it
+    import numpy as np
+    from app.utils.simulation import generate_epoch_metrics, job_rng
+
+    repos = get_repositories()
+    metrics_data = {"loss": 0.0, "accuracy": 0.0}
+    writer = MetricWriter(repos, job_id)
+    try:
+        written = (-1, -1)
+        if resume is not None:
+            last = writer.resume()
+            if last is not None:
+                written = (last["epoch"], last["step"])
+                metrics_data.update(resume.get("latest_metrics") or {})
+        hp = config.get("hyperparameters") or {}
+        total_epochs = hp.get("num_epochs", 10)
+        steps_per_epoch = 250
+        steps = np.arange(0, steps_per_epoch, 25)
+        # Seeded per job: re-running a job id reproduces its curves
+        simulation = config.get("simulation") or {}
+        rng = job_rng(job_id, simulation.get("seed"))
+        profile = simulation.get("profile")
+
+        for epoch in range(total_epochs):
+            # Generated for epochs already written too, so a resumed job's seeded curves carry on unchanged
+            batch = generate_epoch_metrics(epoch, total_epochs, steps, steps_per_epoch, rng, profile)
+            if (epoch, int(steps[-1])) <= written:
+                continue
+            for i, step in enumerate(steps.tolist()):
+                if cancelled.is_set():
                     break
-                job = job_res.data
-
-                for step in range(0, steps_per_epoch, 25):
-                    metrics_data = generate_training_metrics(epoch, step, total_epochs)
-                    supabase.table("metrics").insert({
-                        "id": str(uuid.uuid4()),
-                        "job_id": job_id,
-                        "epoch": epoch,
-                        "step": step,
-                        "loss": metrics_data["loss"],
-                        "accuracy": metrics_data["accuracy"],
-                        "learning_rate": metrics_data["learning_rate"],
-                        "throughput": metrics_data["throughput"],
-                    }).execute()
-
-                    progress = ((epoch * steps_per_epoch + step) / (total_epochs * steps_per_epoch)) * 100
-                    supabase.table("training_jobs").update({
-                        "current_epoch": epoch,
-                        "progress": progress,
-                    }).eq("id", job_id).execute()
-
-                self._notify_sync(
-                    job_id,
-                    {
-                        "type": "metric_update",
-                        "job_id": job_id,
-                        "epoch": epoch,
-                        "step": step,
-                        "metrics": {
-                            "loss": metrics_data["loss"],
-                            "accuracy": metrics_data["accuracy"],
-                            "learning_rate": metrics_data["learning_rate"],
-                            "throughput": metrics_data["throughput"],
-                        },
-                        "timestamp": datetime.utcnow().isoformat(),
-                    },
+                if (epoch, step) <= written:
+                    continue
+                metrics_data = {name: float(values[i]) for name, values in batch.items()}
+                progress = ((epoch * steps_per_epoch + step) / (total_epochs * steps_per_epoch)) * 100
+                writer.add(
+                    {"epoch": epoch, "step": step, **metrics_data},
+                    progress=progress,
+                    current_epoch=epoch,
                 )
-                time.sleep(2)
+            if cancelled.is_set():
+                break
 
-            now = datetime.utcnow().isoformat()
-            supabase.table("training_jobs").update({
-                "status": "completed",
-                "completed_at": now,
-                "progress": 100.0,
-            }).eq("id", job_id).execute()
-
-            job_res = supabase.table("training_jobs").select("experiment_id").eq("id", job_id).maybe_single().execute()
-            if job_res and getattr(job_res, "data", None):
-                exp_id = job_res.data["experiment_id"]
-                supabase.table("experiments").update({
-                    "status": "completed",
-                    "completed_at": now,
-                }).eq("id", exp_id).execute()
-
-            self._notify_sync(
+            _publish_update(
+                publish,
                 job_id,
                 {
-                    "type": "job_complete",
+                    "type": "metric_update",
                     "job_id": job_id,
-                    "status": "completed",
-                    "final_metrics": {
-                        "loss": metrics_data["loss"],
-                        "accuracy": metrics_data["accuracy"],
-                    },
-                    "completed_at": now,
+                    "epoch": epoch,
+                    "step": step,
+                    "metrics": dict(metrics_data),
+                    "timestamp": datetime.utcnow().isoformat(),
                 },
             )
-        except Exception as e:
-            now = datetime.utcnow().isoformat()
-            supabase.table("training_jobs").update({
-                "status": "failed",
-                "error_message": str(e),
+            cancelled.wait(2)  # Epoch pacing; returns early on cancel
+
+        writer.close()
+        if handed_off():
+            return  # Everything up to the last step is written; the next worker continues from there
+        now = datetime.utcnow().isoformat()
+        if cancelled.is_set():
+            # cancel_experiment already recorded the cancelled status
+            _publish_update(
+                publish,
+                job_id,
+                {"type": "job_complete", "job_id": job_id, "status": "cancelled", "completed_at": now},
+            )
+            return
+
+        # Conditional on 'running' so a cancel that raced the last step is not overwritten
+        job = run_sync(repos.jobs.update(
+            job_id,
+            {"status": "completed", "completed_at": now, "progress": 100.0, **_NO_LEASE},
+            expect_status="running",
+        ))
+        if job:
+            run_sync(repos.experiments.update(job["experiment_id"], {"status": "completed", "completed_at": now}))
+        cache.invalidate_tables("experiments", "training_jobs")
+
+        _publish_update(
+            publish,
+            job_id,
+            {
+                "type": "job_complete",
+                "job_id": job_id,
+                "status": "completed",
+                "final_metrics": {
+                    "loss": metrics_data["loss"],
+                    "accuracy": metrics_data["accuracy"],
+                },
                 "completed_at": now,
-            }).eq("id", job_id).execute()
-            job_res = supabase.table("training_jobs").select("experiment_id").eq("id", job_id).maybe_single().execute()
-            if job_res and getattr(job_res, "data", None):
-                exp_id = job_res.data["experiment_id"]
-                supabase.table("experiments").update({
-                    "status": "failed",
-                    "completed_at": now,
-                }).eq("id", exp_id).execute()
-        finally:
-            if job_id in self._running_jobs:
-                del self._running_jobs[job_id]
+            },
+        )
+    except Exception as e:
+        try:
+            writer.close()
+        except Exception as flush_error:
+            print(f"Error flushing metrics for job {job_id}: {flush_error}")
+        fail_job(repos, job_id, str(e))
 
-    def _notify_sync(self, job_id: str, update: dict):
-        if not self._subscribers.get(job_id) or not self._loop:
+
+class TrainingService:
+    _instance = None
+    _running_jobs: Dict[str, threading.Thread] = {}
+    _cancel_events: Dict[str, threading.Event] = {}  # Cancellation token per job running in this process
+    _handoff: Set[str] = set()  # Jobs stopped here to be resumed by another worker (lost lease or shutdown)
+    _draining = False
+    hub = BroadcastHub(settings.websocket_queue_size)  # Live updates fan out to WebSocket subscribers
+    _scheduler: Optional[JobScheduler] = None
+    _pubsub: Optional[PubSubBackend] = None
+    _leases: Optional[LeaseKeeper] = None
+    _executor = None  # ProcessExecutor when TRAINING_EXECUTOR=process
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @property
+    def scheduler(self) -> JobScheduler:
+        if TrainingService._scheduler is None:
+            TrainingService._scheduler = JobScheduler(self._execute_job, settings.training_max_workers)
+        return TrainingService._scheduler
+
+    @property
+    def executor(self):
+        """Worker processes that run jobs off this process's GIL (TRAINING_EXECUTOR=process)."""
+        if TrainingService._executor is None:
+            from app.services.process_executor import ProcessExecutor
+
+            TrainingService._executor = ProcessExecutor()
+        return TrainingService._executor
+
+    @property
+    def leases(self) -> LeaseKeeper:
+        """Heartbeats for the jobs queued or running here, and reaping of jobs orphaned by other workers."""
+        if TrainingService._leases is None:
+            TrainingService._leases = LeaseKeeper(
+                held=self.scheduler.job_ids,
+                capacity=self.scheduler.free_slots,
+                on_lost=self._on_lease_lost,
+                on_reaped=self._on_job_reaped,
+            )
+        return TrainingService._leases
+
+    @property
+    def pubsub(self) -> PubSubBackend:
+        """Notification transport (in-process or Redis); every process listens and feeds its own hub."""
+        if TrainingService._pubsub is None:
+            pubsub = create_pubsub()
+            pubsub.add_listener(self._on_pubsub_message)
+            pubsub.start()
+            TrainingService._pubsub = pubsub
+        return TrainingService._pubsub
+
+    def _on_pubsub_message(self, channel: str, message: str):
+        # Channels are "job:<job_id>:<update type>" and "control:cancel" (message = job id)
+        kind, _, rest = channel.partition(":")
+        if kind == "job":
+            job_id, _, update_type = rest.rpartition(":")
+            self.hub.publish_text(job_id, message, droppable=(update_type == "metric_update"))
+        elif kind == "control" and rest == "cancel":
+            self._signal_cancel(message)
+
+    def start_training(self, job_id: str, config: dict, owner: str = "default", priority: int = 0):
+        """Queue a training job; it stays 'pending' until a scheduler worker picks it up."""
+        self.leases.start()
+        self.scheduler.submit(job_id, config, owner=owner, priority=priority)  # no-op if already queued or running
+
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancel a job: drop it from the queue if it has not started, and signal its cancellation token
+        wherever it runs (this process, or any other via pub/sub). Returns True if it was still queued.
+        """
+        queued = self.scheduler.cancel(job_id)
+        self.pubsub.publish("control:cancel", job_id)
+        return queued
+
+    def _signal_cancel(self, job_id: str, handoff: bool = False):
+        event = self._cancel_events.get(job_id)
+        if event is None:
+            return
+        if handoff:
+            self._handoff.add(job_id)
+        event.set()  # The training loop stops before its next step
+        if TrainingService._executor is not None:
+            TrainingService._executor.stop(job_id, handoff)
+
+    def _on_lease_lost(self, job_id: str):
+        # Cancelled, or taken over by another worker after missed heartbeats: stop without writing a final status
+        if not self.scheduler.cancel(job_id):
+            self._signal_cancel(job_id, handoff=True)
+
+    def _on_job_reaped(self, job: dict):
+        self.scheduler.submit(job["id"], job.get("config") or {}, owner=job_owner(job), priority=job.get("priority") or 0)
+
+    def drain(self, timeout: Optional[float] = None):
+        """
+        Graceful shutdown: stop the jobs running here after their current step, flush their metrics and release
+        every lease this process holds, so other workers resume the jobs right away without repeating any steps.
+        """
+        if TrainingService._leases is None:
+            return
+        TrainingService._draining = True
+        self.leases.stop()
+        held = self.scheduler.job_ids()
+        for job_id in held:
+            if not self.scheduler.cancel(job_id):
+                self._signal_cancel(job_id, handoff=True)
+        deadline = time.monotonic() + (timeout if timeout is not None else settings.job_drain_timeout_seconds)
+        while self._running_jobs and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.leases.release(held)
+
+    def _execute_job(self, job_id: str, config: dict):
+        """Scheduler worker entrypoint: claim the job under this worker's lease, then run it from this worker thread."""
+        if self._draining:
+            return  # Shutting down: the lease is released and another worker starts it
+        repos = get_repositories()
+        # Token exists before the claim so a cancel arriving while the job starts is not lost
+        cancelled = self._cancel_events.setdefault(job_id, threading.Event())
+        # Only a job that is still pending (it may have been cancelled while queued), or one whose previous
+        # worker's lease expired, may start
+        job = run_sync(repos.jobs.claim(job_id, WORKER_ID, settings.job_lease_seconds))
+        if not job:
+            self._cancel_events.pop(job_id, None)
             return
-        for callback in self._subscribers[job_id]:
-            try:
-                asyncio.run_coroutine_threadsafe(callback(update), self._loop)
-            except Exception as e:
-                print(f"Error notifying subscriber: {e}")
-
-    def subscribe_to_job(self, job_id: str, callback: Callable):
-        if job_id not in self._subscribers:
-            self._subscribers[job_id] = []
-        self._subscribers[job_id].append(callback)
-
-    def unsubscribe_from_job(self, job_id: str):
-        if job_id in self._subscribers:
-            del self._subscribers[job_id]
-
-    async def _notify_subscribers(self, job_id: str, update: dict):
-        if job_id in self._subscribers:
-            for callback in self._subscribers[job_id]:
+        run_sync(repos.experiments.update(job["experiment_id"], {"status": "running"}))
+        cache.invalidate_tables("experiments", "training_jobs")
+
+        self._running_jobs[job_id] = threading.current_thread()
+        resume = job if job.get("attempts", 1) > 1 else None
+        handed_off = lambda: job_id in self._handoff  # noqa: E731
+        try:
+            if settings.training_executor == "process":
                 try:
-                    await callback(update)
+                    self.executor.run(job_id, config, resume, cancelled, handed_off, self.pubsub.publish)
                 except Exception as e:
-                    print(f"Error notifying subscriber: {e}")
+                    # The worker process died mid-job (killed, out of memory); errors inside the job are recorded there.
+                    # Workers also exit with the API process: then the job's lease lapses and another worker resumes it.
+                    if not self._draining:
+                        fail_job(repos, job_id, str(e))
+                # The worker process wrote these tables behind this process's cache
+                cache.invalidate_tables("experiments", "training_jobs")
+            else:
+                run_training(job_id, config, cancelled, handed_off, self.pubsub.publish, resume)
+        finally:
+            self._running_jobs.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+            self._handoff.discard(job_id)
+
+    def _notify_sync(self, job_id: str, update: dict):
+        _publish_update(self.pubsub.publish, job_id, update)
+
+    def subscribe_to_job(self, job_id: str) -> Subscription:
+        self.pubsub.start()  # idempotent; on fast boot the listener starts with the first subscriber
+        return self.hub.subscribe(job_id)
+
+    def unsubscribe_from_job(self, subscription: Subscription):
+        self.hub.unsubscribe(subscription)
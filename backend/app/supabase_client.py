@@ -1,26 +1,154 @@
 """
-Supabase client for the ML Dashboard.
+Supabase client for the ML Dashboard (STORAGE_BACKEND=supabase; used by app.repositories.supabase).
 Uses SUPABASE_URL and SUPABASE_SERVICE_KEY from config (service role for full DB access).
+get_async_supabase() is an async PostgREST client over one shared, pooled httpx.AsyncClient, so concurrent
+requests reuse keep-alive connections. Training threads and scripts reach it through run_sync() and the
+repositories. Each PostgREST call is timed (until its body is read) and traced for the request metrics in
+app.services.instrumentation.
 """
-import logging
-from supabase import create_client, Client
+import time
+from typing import Optional
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
 from app.config import settings
+from app.services.instrumentation import record_db_call
 
-logger = logging.getLogger(__name__)
-_client: Client | None = None
+_async_client: AsyncPostgrestClient | None = None
 
 
-def get_supabase() -> Client:
-    """Return the Supabase client (singleton)."""
-    global _client
-    if _client is None:
-        url = settings.supabase_url or ""
-        key = settings.supabase_service_key or ""
-        if not url or not key:
-            raise RuntimeError(
-                "SUPABASE_URL and SUPABASE_SERVICE_KEY must be set. "
-                "On Vercel: Settings → Environment Variables → add both for Production, then Redeploy."
+def _credentials() -> tuple[str, str]:
+    url = settings.supabase_url or ""
+    key = settings.supabase_service_key or ""
+    if not url or not key:
+        raise RuntimeError(
+            "SUPABASE_URL and SUPABASE_SERVICE_KEY must be set. "
+            "On Vercel: Settings → Environment Variables → add both for Production, then Redeploy."
+        )
+    return url, key
+
+
+# PostgREST query parameters that shape the result rather than filter it
+_MODIFIERS = ("order", "limit", "offset", "on_conflict", "columns")
+_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+# Filter values kept in a trace (in.(...) lists can be long)
+_TRACE_VALUE_CHARS = 120
+
+
+def _response_rows(response: httpx.Response) -> Optional[int]:
+    # Content-Range: "0-24/*" or "0-24/1000" (25 rows), "*/0" (none); absent on some writes
+    first, _, _ = response.headers.get("content-range", "").partition("/")
+    if first == "*":
+        return 0
+    start, _, end = first.partition("-")
+    return int(end) - int(start) + 1 if start.isdigit() and end.isdigit() else None
+
+
+def describe_postgrest(request: httpx.Request, response: Optional[httpx.Response], size: Optional[int] = None) -> dict:
+    """Trace of one PostgREST call: table (or rpc), operation, filters, projection and modifiers."""
+    resource = request.url.path.split("/rest/v1/", 1)[-1]
+    op = _OPERATIONS.get(request.method, request.method.lower())
+    if resource.startswith("rpc/"):
+        op, resource = "rpc", resource[4:]
+    elif op == "insert" and "resolution=merge-duplicates" in request.headers.get("prefer", ""):
+        op = "upsert"
+    select, filters, modifiers = None, [], {}
+    for key, value in request.url.params.multi_items():
+        if key == "select":
+            select = value
+        elif key in _MODIFIERS:
+            modifiers[key] = value
+        else:
+            filters.append((key, value))
+    # Same shape = same statement with different values: column, operator and the non-value modifiers
+    shape_filters = " ".join(f"{k}={v.split('.', 1)[0] if k not in ('or', 'and') else '(...)'}" for k, v in filters)
+    shape_modifiers = " ".join(f"{k}={v}" for k, v in modifiers.items() if k not in ("limit", "offset"))
+    return {
+        "op": op,
+        "table": resource,
+        "select": select,
+        "filters": [f"{k}={v[:_TRACE_VALUE_CHARS]}" for k, v in filters],
+        **({"modifiers": modifiers} if modifiers else {}),
+        "rows": _response_rows(response) if response is not None else None,
+        "bytes": size,
+        "status": response.status_code if response is not None else None,
+        "shape": " ".join(p for p in (op, resource, f"select={select}" if select else "", shape_filters, shape_modifiers) if p),
+    }
+
+
+class _TracedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, started: float, request: httpx.Request, response: httpx.Response):
+        self._stream = stream
+        self._started = started
+        self._request = request
+        self._response = response
+        self._size = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._size += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            record_db_call(
+                time.perf_counter() - self._started,
+                lambda: describe_postgrest(self._request, self._response, self._size),
             )
-        _client = create_client(url, key)
-        logger.info("Supabase connected (%s)", url.rstrip("/").split("/")[-1] or url)
-    return _client
+
+
+class _TracedTransport(httpx.AsyncBaseTransport):
+    """Records each round trip (latency once the body has been read and closed, plus its trace)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            record_db_call(time.perf_counter() - started, lambda: describe_postgrest(request, None))
+            raise
+        if response.is_closed:  # body already buffered (e.g. mock transports)
+            record_db_call(time.perf_counter() - started, lambda: describe_postgrest(request, response, len(response.content)))
+        else:
+            response.stream = _TracedStream(response.stream, started, request, response)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def get_async_supabase() -> AsyncPostgrestClient:
+    """Return the async PostgREST client (singleton). Same table()/rpc() API as the sync client; await execute()."""
+    global _async_client
+    if _async_client is None:
+        url, key = _credentials()
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry_seconds,
+            ),
+        )
+        http_client = httpx.AsyncClient(
+            transport=_TracedTransport(transport),
+            timeout=httpx.Timeout(settings.http_timeout_seconds, connect=5.0),
+        )
+        _async_client = AsyncPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, "apikey": key, "Authorization": f"Bearer {key}"},
+            http_client=http_client,
+        )
+    return _async_client
+
+
+async def close_async_supabase():
+    """Close the shared connection pool (app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
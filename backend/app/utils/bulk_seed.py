@@ -0,0 +1,269 @@
+"""
+High-volume seeder for load-test-scale data (e.g. 10M+ metric rows).
+Run with: python -m app.utils.bulk_seed --experiments 1000 --jobs 2 --points 5000 --workers 8
+Everything (ids, statuses, curves) derives from --seed, so the same arguments reproduce the same tables.
+Writes go through the configured storage backend (STORAGE_BACKEND), up to --workers at a time; metric rows are
+chunked bulk inserts (binary COPY on postgres). Each phase reports rows/s.
+Requires the tables from supabase/schema.sql (rollups are rebuilt with rebuild_metric_rollups if installed).
+"""
+import argparse
+import asyncio
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Dict, List, Set
+import numpy as np
+from app.repositories import ROLLUP_METRICS, Repositories
+from app.utils.simulation import PROFILES, generate_job_metrics, job_rng
+
+MODALITIES = ("image", "audio", "video", "text", "multimodal")
+MODEL_TYPES = ("vision_transformer", "audio_cnn", "multimodal_transformer", "llm_finetune", "video_3dcnn")
+STEPS_PER_EPOCH = 250
+STEP_INTERVAL = 25
+EPOCH_SECONDS = 60
+REPORT_EVERY_ROWS = 500_000
+
+
+class BulkWriter:
+    """Runs repository writes concurrently, keeping at most `workers` in flight."""
+
+    def __init__(self, repos: Repositories, workers: int, chunk_size: int):
+        self.repos = repos
+        self.chunk_size = chunk_size
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def create(self, table: str, rows: List[dict]):
+        """Catalog rows, one create() each (datasets, experiments, training_jobs)."""
+        repo = {"datasets": self.repos.datasets, "experiments": self.repos.experiments, "training_jobs": self.repos.jobs}[table]
+        for row in rows:
+            await self._submit(repo.create(row))
+
+    async def insert_metrics(self, rows: List[dict]):
+        for i in range(0, len(rows), self.chunk_size):
+            await self._submit(self.repos.metrics.insert(rows[i : i + self.chunk_size]))
+
+    async def _submit(self, write: Awaitable):
+        await self._slots.acquire()
+        self._collect({t for t in self._in_flight if t.done()})
+        self._in_flight.add(asyncio.ensure_future(self._write(write)))
+
+    async def _write(self, write: Awaitable):
+        try:
+            await write
+        finally:
+            self._slots.release()
+
+    def _collect(self, done):
+        for task in done:
+            self._in_flight.discard(task)
+            task.result()  # Re-raise writer errors in the caller
+
+    async def drain(self):
+        """Wait for every submitted write (call between phases: later tables reference earlier ones)."""
+        if self._in_flight:
+            await asyncio.wait(self._in_flight)
+        self._collect(set(self._in_flight))
+
+    async def close(self):
+        """Let writes still in flight settle (after an error) before the connections close."""
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+
+def _report(label: str, rows: int, started: float):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"✓ {label}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+def _uuid(rng: np.random.Generator) -> str:
+    return str(uuid.UUID(bytes=rng.bytes(16), version=4))
+
+
+def build_catalog(args) -> Dict[str, List[dict]]:
+    """Datasets, experiments and jobs for the run (small next to the metrics; built up front)."""
+    rng = np.random.default_rng(args.seed)
+    base = datetime(2024, 1, 1) + timedelta(days=int(args.seed) % 365)
+    epochs = max(1, math.ceil(args.points / (STEPS_PER_EPOCH // STEP_INTERVAL)))
+
+    datasets = [
+        {
+            "id": _uuid(rng),
+            "name": f"{args.prefix} dataset {i:05d}",
+            "modality": MODALITIES[i % len(MODALITIES)],
+            "size_bytes": int(rng.integers(1 << 20, 1 << 40)),
+            "file_count": int(rng.integers(100, 1_000_000)),
+            "description": "Bulk seeded dataset",
+            "created_at": (base + timedelta(minutes=i)).isoformat(),
+            "metadata": {"seed": args.seed},
+        }
+        for i in range(args.datasets)
+    ]
+
+    experiments, jobs = [], []
+    profiles = list(PROFILES)
+    for i in range(args.experiments):
+        created = base + timedelta(hours=i)
+        profile = profiles[int(rng.integers(len(profiles)))]
+        experiment = {
+            "id": _uuid(rng),
+            "name": f"{args.prefix} experiment {i:06d}",
+            "description": f"Bulk seeded ({profile} curve)",
+            "dataset_id": datasets[i % len(datasets)]["id"] if datasets else None,
+            "status": "completed",
+            "config": {
+                "model_type": MODEL_TYPES[i % len(MODEL_TYPES)],
+                "hyperparameters": {
+                    "batch_size": int(rng.choice([16, 32, 64, 128])),
+                    "learning_rate": float(rng.choice([1e-4, 3e-4, 1e-3])),
+                    "optimizer": "adamw",
+                    "num_epochs": epochs,
+                },
+                "simulation": {"profile": profile, "seed": args.seed},
+            },
+            "created_by": f"loadtest-{i % 10}",
+            "created_at": created.isoformat(),
+            "started_at": (created + timedelta(minutes=1)).isoformat(),
+            "completed_at": (created + timedelta(minutes=1, seconds=epochs * EPOCH_SECONDS)).isoformat(),
+            "tags": [args.prefix, profile],
+        }
+        experiments.append(experiment)
+        for j in range(args.jobs):
+            started = created + timedelta(minutes=1 + j)
+            jobs.append(
+                {
+                    "id": _uuid(rng),
+                    "experiment_id": experiment["id"],
+                    "status": "completed",
+                    "progress": 100.0,
+                    "current_epoch": epochs - 1,
+                    "total_epochs": epochs,
+                    "created_at": started.isoformat(),
+                    "started_at": started.isoformat(),
+                    "completed_at": (started + timedelta(seconds=epochs * EPOCH_SECONDS)).isoformat(),
+                    "avg_epoch_time": float(EPOCH_SECONDS),
+                    "_profile": profile,
+                }
+            )
+    return {"datasets": datasets, "experiments": experiments, "training_jobs": jobs}
+
+
+def job_series(job: dict, points: int, seed: int) -> Dict[str, list]:
+    """The job's first `points` metric points as columns, from one vectorized call on its seeded generator."""
+    series = generate_job_metrics(
+        job["total_epochs"],
+        np.arange(0, STEPS_PER_EPOCH, STEP_INTERVAL),
+        STEPS_PER_EPOCH,
+        job_rng(job["id"], seed),
+        job["_profile"],
+    )
+    return {name: values[:points].tolist() for name, values in series.items()}
+
+
+def job_metric_rows(job: dict, series: Dict[str, list]) -> List[dict]:
+    job_id = job["id"]
+    started = datetime.fromisoformat(job["started_at"])
+    step_seconds = EPOCH_SECONDS / STEPS_PER_EPOCH
+    return [
+        {
+            "id": f"{job_id}-{i:08d}",
+            "job_id": job_id,
+            "epoch": epoch,
+            "step": step,
+            "loss": series["loss"][i],
+            "accuracy": series["accuracy"][i],
+            "learning_rate": series["learning_rate"][i],
+            "throughput": series["throughput"][i],
+            "timestamp": (started + timedelta(seconds=(epoch * STEPS_PER_EPOCH + step) * step_seconds)).isoformat(),
+        }
+        for i, (epoch, step) in enumerate(zip(series["epoch"], series["step"]))
+    ]
+
+
+def run(args):
+    asyncio.run(_run(args))
+
+
+async def _run(args):
+    from app.repositories import close_repositories, get_repositories
+
+    try:
+        await _seed(get_repositories(), args)
+    finally:
+        await close_repositories()
+
+
+async def _seed(repos: Repositories, args):
+    catalog = build_catalog(args)
+    jobs = catalog["training_jobs"]
+    total_metrics = len(jobs) * args.points
+    print(
+        f"🌱 Bulk seeding {len(catalog['datasets']):,} datasets, {len(catalog['experiments']):,} experiments, "
+        f"{len(jobs):,} jobs, {total_metrics:,} metrics (seed={args.seed}, workers={args.workers}, chunk={args.chunk_size})"
+    )
+
+    writer = BulkWriter(repos, args.workers, args.chunk_size)
+    overall = time.perf_counter()
+    try:
+        for table in ("datasets", "experiments"):
+            started = time.perf_counter()
+            await writer.create(table, catalog[table])
+            await writer.drain()
+            _report(table, len(catalog[table]), started)
+
+        # Each job carries its final metric values (latest_metrics); only the last point is generated here
+        started = time.perf_counter()
+        job_rows = []
+        for job in jobs:
+            row = {k: v for k, v in job.items() if not k.startswith("_")}
+            if args.points:
+                series = job_series(job, args.points, args.seed)
+                row["latest_metrics"] = {m: series[m][-1] for m in ROLLUP_METRICS if m in series}
+            job_rows.append(row)
+        await writer.create("training_jobs", job_rows)
+        await writer.drain()
+        _report("training_jobs", len(job_rows), started)
+
+        started = time.perf_counter()
+        written, next_report = 0, REPORT_EVERY_ROWS
+        for job in jobs:
+            rows = job_metric_rows(job, job_series(job, args.points, args.seed))
+            await writer.insert_metrics(rows)
+            written += len(rows)
+            if written >= next_report:
+                next_report += REPORT_EVERY_ROWS
+                print(f"  … {written:,}/{total_metrics:,} metrics ({written / (time.perf_counter() - started):,.0f} rows/s)")
+        await writer.drain()
+        _report("metrics", written, started)
+    finally:
+        await writer.close()
+
+    if args.rollups and jobs:
+        started = time.perf_counter()
+        try:
+            for job in jobs:
+                await repos.metrics.rebuild_rollups(job["id"])
+            _report("metric_rollups (jobs rebuilt)", len(jobs), started)
+        except Exception as e:
+            print(f"⊘ Skipped rollups (rebuild_metric_rollups not installed?): {e}")
+
+    rows = sum(len(v) for v in catalog.values()) + total_metrics
+    _report("total", rows, overall)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-seed the storage backend with load-test-scale data.")
+    parser.add_argument("--datasets", type=int, default=10, help="datasets to create")
+    parser.add_argument("--experiments", type=int, default=100, help="experiments to create (N)")
+    parser.add_argument("--jobs", type=int, default=1, help="training jobs per experiment (M)")
+    parser.add_argument("--points", type=int, default=1000, help="metric points per job (K)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per bulk insert")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent writes")
+    parser.add_argument("--seed", type=int, default=0, help="seed for ids, configs and curves")
+    parser.add_argument("--prefix", default="bulk", help="name/tag prefix for seeded rows")
+    parser.add_argument("--no-rollups", dest="rollups", action="store_false", help="skip rebuilding metric rollups")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
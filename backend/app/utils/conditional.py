@@ -0,0 +1,33 @@
+"""
+Conditional GET (ETag / If-None-Match) for polled endpoints.
+Each endpoint derives a weak ETag from a few version columns (updated_at, job progress, latest
+metric step). When the client sends If-None-Match, those columns are read with a cheap probe
+query first, and an unchanged resource is answered with 304 without running the full query.
+"""
+import hashlib
+import json
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of etag against the request's If-None-Match list."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str):
+    # no-cache: clients may store the body but must revalidate every poll
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
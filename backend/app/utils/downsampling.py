@@ -0,0 +1,80 @@
+"""
+Shape-preserving downsampling for metric series.
+LTTB (Largest-Triangle-Three-Buckets) keeps the visual shape of a curve; min/max buckets keep every spike.
+Both return sorted indices into the input so every column of a row can be selected together.
+"""
+from typing import List, Optional, Sequence
+import numpy as np
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Pick the min and max point of each bucket, plus the first and last point (at most n_out indices)."""
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 4:
+        # No room for a min/max pair: keep the endpoints and (for 3) the point furthest from the line between them
+        if n_out < 3:
+            return np.array([0, n - 1])
+        y = np.asarray(y, dtype=float)
+        line = y[0] + (y[-1] - y[0]) * np.arange(1, n - 1) / (n - 1)
+        extreme = 1 + int(np.nan_to_num(np.abs(y[1:-1] - line), nan=-1.0).argmax())
+        return np.array([0, extreme, n - 1])
+    n_buckets = (n_out - 2) // 2
+    size = -(-(n - 2) // n_buckets)  # ceil
+    inner = np.asarray(y[1:-1], dtype=float)
+    rows = -(-len(inner) // size)
+    padded = np.full(rows * size, np.nan)
+    padded[: len(inner)] = inner
+    padded = padded.reshape(rows, size)
+    # NaN (padding or missing values) never wins; a row of only NaN falls back to its first slot
+    lo = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    hi = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    offsets = np.arange(rows) * size + 1
+    idx = np.concatenate(([0], offsets + lo, offsets + hi, [n - 1]))
+    return np.unique(idx[idx < n])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: keep the point of each bucket forming the largest triangle with its neighbours."""
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    # Bucket boundaries for the n_out - 2 inner buckets, and each bucket's centroid (used as the "next" point)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    counts = np.maximum(ends - starts, 1)
+    x_avg = np.add.reduceat(x[: n - 1], starts) / counts
+    y_avg = np.add.reduceat(y[: n - 1], starts) / counts
+    # Centroid of the bucket after each one; the last inner bucket looks ahead to the final point
+    next_x = np.append(x_avg[1:], x[-1])
+    next_y = np.append(y_avg[1:], y[-1])
+
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(len(starts)):
+        bx = x[starts[i]:ends[i]]
+        by = y[starts[i]:ends[i]]
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = starts[i] + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb") -> np.ndarray:
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    return lttb_indices(x, y, n_out)
+
+
+def downsample_rows(rows: List[dict], n_out: int, method: str = "lttb", x: Optional[Sequence[float]] = None, y_key: str = "loss") -> List[dict]:
+    """Select at most n_out rows by their y_key curve; x defaults to the row position."""
+    xs = np.array(x, dtype=float) if x is not None else np.arange(len(rows), dtype=float)
+    ys = np.array([float(r[y_key]) for r in rows])
+    return [rows[i] for i in downsample_indices(xs, ys, n_out, method)]
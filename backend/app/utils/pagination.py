@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+Pages are keyed on (sort column, id), so page N costs the same as page 1. Cursors are opaque
+base64 tokens carrying the sort key of the boundary row and the paging direction.
+"""
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_by: str, order: str, row: dict, direction: str) -> str:
+    payload = {"s": sort_by, "o": order, "v": row.get(sort_by), "id": row["id"], "d": direction}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, dict) or payload.get("s") != sort_by or payload.get("o") != order or "id" not in payload:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/order")
+    return payload
+
+
+def quote_value(value: Any) -> str:
+    # PostgREST logic-tree values: double-quote so commas, dots and parentheses are literal
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def is_backwards(cursor: Optional[dict]) -> bool:
+    """Whether a decoded cursor pages backwards (rows are scanned in reverse and come back reversed)."""
+    return bool(cursor) and cursor.get("d") == "prev"
+
+
+def apply_keyset(q, sort_by: str, desc: bool, cursor: Optional[dict], limit: int, offset: int = 0) -> Tuple[Any, bool]:
+    """
+    Order q by (sort_by, id) and, given a decoded cursor, keep only rows past it (without one, start at offset).
+    Returns the query (limited to limit + 1 rows to detect another page) and whether rows come back reversed.
+    """
+    backwards = is_backwards(cursor)
+    scan_desc = desc != backwards
+    q = q.order(sort_by, desc=scan_desc).order("id", desc=scan_desc)
+    if cursor:
+        op = "lt" if scan_desc else "gt"
+        v, row_id = quote_value(cursor["v"]), quote_value(cursor["id"])
+        q = q.or_(f"{sort_by}.{op}.{v},and({sort_by}.eq.{v},id.{op}.{row_id})")
+        return q.limit(limit + 1), backwards
+    return q.range(offset, offset + limit), backwards
+
+
+def keyset_page(
+    rows: List[dict], page_size: int, sort_by: str, order: str, cursor: Optional[dict], backwards: bool, has_previous: bool
+) -> Tuple[List[dict], Optional[str], Optional[str]]:
+    """Trim the look-ahead row, restore display order and build next/prev cursors."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, has_previous or bool(cursor)
+    next_cursor = encode_cursor(sort_by, order, rows[-1], "next") if rows and has_next else None
+    prev_cursor = encode_cursor(sort_by, order, rows[0], "prev") if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+# count=exact|planned|estimated are PostgREST count methods; cached memoizes an exact count; none skips it
+COUNT_PATTERN = "^(exact|planned|estimated|cached|none)$"
+
+
+def query_count_method(count: str, cached_total: Optional[int]) -> Optional[str]:
+    """Count method to send to PostgREST for a list query."""
+    if count == "none" or (count == "cached" and cached_total is not None):
+        return None
+    return "exact" if count == "cached" else count
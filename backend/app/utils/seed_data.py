@@ -1,16 +1,24 @@
 """
-Database seeder script to populate Supabase with demo data.
+Database seeder script to populate the configured storage backend (STORAGE_BACKEND) with demo data.
 Run with: python -m app.utils.seed_data
-Requires: SUPABASE_URL and SUPABASE_SERVICE_KEY in .env.local / .env
-Create tables first: run supabase/schema.sql in Supabase SQL Editor.
+Requires: SUPABASE_URL and SUPABASE_SERVICE_KEY (or DATABASE_URL for postgres) in .env.local / .env
+Create tables first: run supabase/schema.sql in Supabase SQL Editor (docker-compose applies it to its db).
 """
 import uuid
 from datetime import datetime, timedelta
-from app.supabase_client import get_supabase
-from app.utils.simulation import generate_training_metrics
+import numpy as np
+from app.repositories import ROLLUP_METRICS, Repositories, get_repositories, run_sync
+from app.services.rollups import MetricRollups
+from app.utils.simulation import generate_job_metrics, job_rng
 
 
-def seed_datasets(supabase):
+def is_empty(repos: Repositories) -> bool:
+    """True if there are no datasets yet (auto-seed on startup)."""
+    rows, _ = run_sync(repos.datasets.list(None, "created_at", True, None, 1))
+    return not rows
+
+
+def seed_datasets(repos: Repositories):
     """Seed datasets table (column is 'metadata' in Supabase)."""
     datasets_data = [
         {
@@ -85,15 +93,14 @@ def seed_datasets(supabase):
     ]
 
     for data in datasets_data:
-        res = supabase.table("datasets").select("id").eq("id", data["id"]).maybe_single().execute()
-        if not res or not getattr(res, "data", None):
-            supabase.table("datasets").insert(data).execute()
+        if not run_sync(repos.datasets.get(data["id"])):
+            run_sync(repos.datasets.create(data))
             print(f"✓ Created dataset: {data['name']}")
         else:
             print(f"⊘ Dataset already exists: {data['name']}")
 
 
-def seed_experiments(supabase):
+def seed_experiments(repos: Repositories):
     """Seed experiments table"""
     experiments_data = [
         {
@@ -222,25 +229,23 @@ def seed_experiments(supabase):
     ]
 
     for data in experiments_data:
-        res = supabase.table("experiments").select("id").eq("id", data["id"]).maybe_single().execute()
-        if not res or not getattr(res, "data", None):
-            supabase.table("experiments").insert(data).execute()
+        if not run_sync(repos.experiments.get(data["id"])):
+            run_sync(repos.experiments.create(data))
             print(f"✓ Created experiment: {data['name']}")
         else:
             print(f"⊘ Experiment already exists: {data['name']}")
+    return [data["id"] for data in experiments_data]
 
 
-def seed_jobs_and_metrics(supabase):
-    """Seed training jobs and metrics"""
-    res = supabase.table("experiments").select("*").execute()
-    experiments = (res.data if res else None) or []
+def seed_jobs_and_metrics(repos: Repositories, experiment_ids):
+    """Seed training jobs and metrics for the given (seeded) experiments"""
+    experiments = [exp for exp in (run_sync(repos.experiments.get(i)) for i in experiment_ids) if exp]
 
     for exp in experiments:
         if exp["status"] not in ["running", "completed", "failed"]:
             continue
         job_id = f"job-{exp['id']}"
-        res = supabase.table("training_jobs").select("id").eq("id", job_id).maybe_single().execute()
-        if res and getattr(res, "data", None):
+        if run_sync(repos.jobs.get(job_id)):
             print(f"⊘ Job already exists for: {exp['name']}")
             continue
 
@@ -270,41 +275,56 @@ def seed_jobs_and_metrics(supabase):
             "completed_at": exp.get("completed_at") if exp["status"] != "running" else None,
             "error_message": "Out of memory error" if exp["status"] == "failed" else None,
         }
-        supabase.table("training_jobs").insert(job_payload).execute()
+        run_sync(repos.jobs.create(job_payload))
 
-        metrics_count = 0
+        rollups = MetricRollups(job_id)
         started_at = exp.get("started_at") or datetime.utcnow().isoformat()
-        for epoch in range(current_epoch + 1):
-            for step in range(0, steps_per_epoch, 25):
-                metrics_data = generate_training_metrics(epoch, step, total_epochs)
-                ts = datetime.utcnow() + timedelta(seconds=(epoch * steps_per_epoch + step) * 2)
-                supabase.table("metrics").insert({
-                    "id": str(uuid.uuid4()),
-                    "job_id": job_id,
-                    "epoch": epoch,
-                    "step": step,
-                    "loss": metrics_data["loss"],
-                    "accuracy": metrics_data["accuracy"],
-                    "learning_rate": metrics_data["learning_rate"],
-                    "throughput": metrics_data["throughput"],
-                    "timestamp": ts.isoformat(),
-                }).execute()
-                metrics_count += 1
+        series = generate_job_metrics(
+            total_epochs, np.arange(0, steps_per_epoch, 25), steps_per_epoch, job_rng(job_id), epochs=current_epoch + 1
+        )
+        rows = []
+        for i in range(len(series["epoch"])):
+            epoch, step = int(series["epoch"][i]), int(series["step"][i])
+            ts = datetime.utcnow() + timedelta(seconds=(epoch * steps_per_epoch + step) * 2)
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "job_id": job_id,
+                "epoch": epoch,
+                "step": step,
+                "loss": float(series["loss"][i]),
+                "accuracy": float(series["accuracy"][i]),
+                "learning_rate": float(series["learning_rate"][i]),
+                "throughput": float(series["throughput"][i]),
+                "timestamp": ts.isoformat(),
+            })
+        # Chunked bulk inserts rather than one request per row (app.utils.bulk_seed handles load-test volumes)
+        for start in range(0, len(rows), 1000):
+            run_sync(repos.metrics.insert(rows[start : start + 1000]))
+        rollups.add(rows)
+        metrics_count = len(rows)
+        run_sync(repos.metrics.upsert_rollups(rollups.dirty_rows()))
+        if metrics_count:
+            latest_metrics = {m: rows[-1][m] for m in ROLLUP_METRICS if rows[-1].get(m) is not None}
+            run_sync(repos.jobs.update(job_id, {"latest_metrics": latest_metrics}))
 
         print(f"✓ Created job with {metrics_count} metrics for: {exp['name']}")
 
 
-def main():
-    """Main seeding function"""
-    print("🌱 Starting Supabase seeding...")
-    print("=" * 50)
-    supabase = get_supabase()
+def seed_all(repos: Repositories):
+    """Datasets, then experiments, then their jobs and metrics"""
     print("\n📦 Seeding datasets...")
-    seed_datasets(supabase)
+    seed_datasets(repos)
     print("\n🧪 Seeding experiments...")
-    seed_experiments(supabase)
+    experiment_ids = seed_experiments(repos)
     print("\n⚙️  Seeding training jobs and metrics...")
-    seed_jobs_and_metrics(supabase)
+    seed_jobs_and_metrics(repos, experiment_ids)
+
+
+def main():
+    """Main seeding function"""
+    print("🌱 Starting database seeding...")
+    print("=" * 50)
+    seed_all(get_repositories())
     print("\n" + "=" * 50)
     print("✅ Database seeding completed!")
     print("\nYou can now start the backend and frontend to see the demo data.")
@@ -1,41 +1,134 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
 import numpy as np
 
 
-def generate_training_metrics(epoch: int, step: int, total_epochs: int) -> dict:
-    """
-    Generate realistic training metrics for simulation.
-    Uses exponential decay for loss and sigmoid growth for accuracy.
-    """
-    progress = epoch / total_epochs
-    
-    # Loss: exponential decay with noise
-    base_loss = 2.5
-    decay_rate = 3.0
-    loss = base_loss * np.exp(-decay_rate * progress) + np.random.normal(0, 0.05)
-    loss = max(0.01, loss)  # Ensure loss is positive
-    
-    # Accuracy: sigmoid growth with noise
-    base_accuracy = 0.1
-    max_accuracy = 0.98
-    growth_rate = 5.0
-    accuracy = base_accuracy + (max_accuracy - base_accuracy) / (
-        1 + np.exp(-growth_rate * (progress - 0.5))
-    )
-    accuracy += np.random.normal(0, 0.02)
-    accuracy = np.clip(accuracy, 0.0, 1.0)
-    
-    # Learning rate: linear decay
-    initial_lr = 0.001
-    learning_rate = initial_lr * (1 - progress * 0.5)
-    
-    # Throughput: slight variation around base
-    base_throughput = 320.0
-    throughput = base_throughput + np.random.normal(0, 25)
-    throughput = max(200, min(400, throughput))  # Clamp between 200-400
-    
+@dataclass(frozen=True)
+class CurveProfile:
+    """
+    Shape of a simulated training run. Positions are fractions of total training (0..1).
+    warmup: LR ramps linearly from 0 to its initial value over this fraction.
+    plateaus: (start, end) windows where loss/accuracy stop improving.
+    diverge_at: from here on loss grows exponentially and accuracy collapses.
+    """
+
+    base_loss: float = 2.5
+    decay_rate: float = 3.0
+    loss_noise: float = 0.05
+    accuracy_noise: float = 0.02
+    initial_lr: float = 0.001
+    warmup: float = 0.0
+    plateaus: Tuple[Tuple[float, float], ...] = ()
+    diverge_at: Optional[float] = None
+    divergence_rate: float = 8.0
+
+
+PROFILES: Dict[str, CurveProfile] = {
+    "default": CurveProfile(),
+    "warmup": CurveProfile(warmup=0.1),
+    "plateau": CurveProfile(plateaus=((0.3, 0.5), (0.7, 0.8))),
+    "divergence": CurveProfile(diverge_at=0.6),
+}
+
+
+def job_rng(job_id: str, seed: Optional[int] = None) -> np.random.Generator:
+    """Per-job generator: the same job id (and seed) always reproduces the same run."""
+    digest = hashlib.sha256(job_id.encode()).digest()
+    return np.random.default_rng([int.from_bytes(digest[:8], "little"), seed or 0])
+
+
+def _profile(profile: Union[str, CurveProfile, None]) -> CurveProfile:
+    if isinstance(profile, CurveProfile):
+        return profile
+    return PROFILES.get(profile or "default", PROFILES["default"])
+
+
+def generate_metric_batch(
+    progress: np.ndarray,
+    rng: Optional[np.random.Generator] = None,
+    profile: Union[str, CurveProfile, None] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized metrics for an array of training positions (fraction of total training, 0..1).
+    Uses exponential decay for loss and sigmoid growth for accuracy, shaped by the curve profile.
+    """
+    p = _profile(profile)
+    rng = rng or np.random.default_rng()
+    progress = np.asarray(progress, dtype=float)
+    n = progress.shape[0]
+
+    # Plateaus: learning progress stands still inside each window
+    effective = progress.copy()
+    for start, end in p.plateaus:
+        effective -= np.clip(progress, start, end) - start
+
+    loss = p.base_loss * np.exp(-p.decay_rate * effective) + rng.normal(0, p.loss_noise, n)
+    accuracy = 0.1 + (0.98 - 0.1) / (1 + np.exp(-5.0 * (effective - 0.5))) + rng.normal(0, p.accuracy_noise, n)
+
+    if p.diverge_at is not None:
+        blowup = np.exp(p.divergence_rate * np.clip(progress - p.diverge_at, 0.0, None))
+        loss *= blowup
+        accuracy /= blowup
+
+    # Learning rate: optional linear warmup, then linear decay
+    learning_rate = p.initial_lr * (1 - progress * 0.5)
+    if p.warmup > 0:
+        learning_rate *= np.minimum(1.0, (progress + 1e-9) / p.warmup)
+
+    throughput = np.clip(320.0 + rng.normal(0, 25, n), 200, 400)
+
     return {
-        "loss": float(loss),
-        "accuracy": float(accuracy),
-        "learning_rate": float(learning_rate),
-        "throughput": float(throughput),
+        "loss": np.maximum(0.01, loss),
+        "accuracy": np.clip(accuracy, 0.0, 1.0),
+        "learning_rate": learning_rate,
+        "throughput": throughput,
     }
+
+
+def generate_epoch_metrics(
+    epoch: int,
+    total_epochs: int,
+    steps: np.ndarray,
+    steps_per_epoch: int,
+    rng: Optional[np.random.Generator] = None,
+    profile: Union[str, CurveProfile, None] = None,
+) -> Dict[str, np.ndarray]:
+    """Metrics for the given steps of one epoch in one call."""
+    steps = np.asarray(steps)
+    progress = (epoch + steps / steps_per_epoch) / total_epochs
+    return generate_metric_batch(progress, rng, profile)
+
+
+def generate_job_metrics(
+    total_epochs: int,
+    steps: np.ndarray,
+    steps_per_epoch: int,
+    rng: Optional[np.random.Generator] = None,
+    profile: Union[str, CurveProfile, None] = None,
+    epochs: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    A whole job (or its first `epochs` epochs) in one call: epoch/step arrays plus metric arrays,
+    ordered by (epoch, step).
+    """
+    steps = np.asarray(steps)
+    epoch_idx = np.repeat(np.arange(epochs if epochs is not None else total_epochs), steps.shape[0])
+    step_idx = np.tile(steps, epoch_idx.shape[0] // max(1, steps.shape[0]))
+    metrics = generate_metric_batch((epoch_idx + step_idx / steps_per_epoch) / total_epochs, rng, profile)
+    return {"epoch": epoch_idx, "step": step_idx, **metrics}
+
+
+def generate_training_metrics(
+    epoch: int,
+    step: int,
+    total_epochs: int,
+    rng: Optional[np.random.Generator] = None,
+    profile: Union[str, CurveProfile, None] = None,
+) -> dict:
+    """
+    Generate realistic training metrics for simulation (single point).
+    Prefer generate_epoch_metrics / generate_job_metrics when producing many points.
+    """
+    batch = generate_metric_batch(np.array([epoch / total_epochs]), rng, profile)
+    return {name: float(values[0]) for name, values in batch.items()}
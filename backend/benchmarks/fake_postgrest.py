@@ -0,0 +1,404 @@
+"""
+In-memory stand-in for Supabase's PostgREST API, served through httpx MockTransport.
+It understands the subset of PostgREST the app uses: select projections with embedded
+resources, eq/neq/gt/gte/lt/lte/in/is filters, or()/and() logic trees, order, limit/offset,
+count=..., single-object responses, insert/upsert/update/delete, and the rpc functions from
+supabase/schema.sql (stats_overview, downsample_job_metrics). The latest_job and updated_at
+triggers are mirrored too, so handlers see the same rows as against a migrated database.
+Every request is counted, so benchmarks can report DB calls per API request.
+"""
+import asyncio
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from postgrest import AsyncPostgrestClient
+
+BASE_URL = "http://fake-supabase/rest/v1"
+
+PRIMARY_KEYS = {"metric_rollups": ("job_id", "epoch", "metric")}
+# table -> {fk column: referenced table}
+FOREIGN_KEYS = {
+    "experiments": {"dataset_id": "datasets"},
+    "training_jobs": {"experiment_id": "experiments"},
+    "metrics": {"job_id": "training_jobs"},
+    "metric_rollups": {"job_id": "training_jobs"},
+}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+DEFAULTS: Dict[str, Callable[[], dict]] = {
+    "datasets": lambda: {"created_at": _now(), "updated_at": None, "metadata": {}},
+    "experiments": lambda: {"status": "created", "created_at": _now(), "updated_at": _now(), "tags": [], "latest_job": None},
+    "training_jobs": lambda: {
+        "status": "pending",
+        "progress": 0,
+        "current_epoch": 0,
+        "created_at": _now(),
+        "latest_metrics": {},
+    },
+    "metrics": lambda: {"timestamp": _now(), "custom_metrics": {}},
+}
+
+
+class FakeResponseError(Exception):
+    def __init__(self, status: int, message: str, code: str = "PGRST000", details: Optional[str] = None):
+        self.status, self.message, self.code, self.details = status, message, code, details
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, current, escaped = [], 0, False, [], False
+    for ch in text:
+        if escaped:
+            current.append(ch)
+            escaped = False
+            continue
+        if ch == "\\" and quoted:
+            current.append(ch)
+            escaped = True
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _coerce(raw: str, like: Any) -> Any:
+    if isinstance(like, bool):
+        return raw.lower() == "true"
+    if isinstance(like, int):
+        return int(float(raw))
+    if isinstance(like, float):
+        return float(raw)
+    return raw
+
+
+def _predicate(column: str, op: str, raw: str) -> Callable[[dict], bool]:
+    """Compile one `column=op.value` filter; the value is parsed once and coerced to the stored type."""
+    if op == "is":
+        expected = None if raw.lower() == "null" else raw.lower() == "true"
+        return lambda row: row.get(column) is expected
+    if op == "in":
+        values = [_unquote(v) for v in _split_top_level(raw.strip()[1:-1])]
+        coerced: Dict[type, set] = {}
+
+        def contains(row: dict) -> bool:
+            stored = row.get(column)
+            if stored is None:
+                return False
+            if type(stored) not in coerced:
+                coerced[type(stored)] = {_coerce(v, stored) for v in values}
+            return stored in coerced[type(stored)]
+
+        return contains
+    compare = {
+        "eq": lambda a, b: a == b,
+        "neq": lambda a, b: a != b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b,
+        "lte": lambda a, b: a <= b,
+    }.get(op)
+    if compare is None:
+        raise FakeResponseError(400, f"operator {op} not supported by the fake")
+    value = _unquote(raw)
+
+    def matches(row: dict) -> bool:
+        stored = row.get(column)
+        return stored is not None and compare(stored, _coerce(value, stored))
+
+    return matches
+
+
+def _condition(expr: str) -> Callable[[dict], bool]:
+    """A `col.op.value` item or a nested and(...)/or(...) group from a logic tree."""
+    for group, combine in (("and(", all), ("or(", any)):
+        if expr.startswith(group):
+            inner = [_condition(p) for p in _split_top_level(expr[len(group) : -1])]
+            return lambda row, inner=inner, combine=combine: combine(c(row) for c in inner)
+    column, op, raw = expr.split(".", 2)
+    return _predicate(column, op, raw)
+
+
+def _filters(params: httpx.QueryParams) -> List[Callable[[dict], bool]]:
+    conditions = []
+    for key, value in params.multi_items():
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ("or", "and"):
+            conditions.append(_condition(f"{key}{value}"))
+        else:
+            op, raw = value.split(".", 1)
+            conditions.append(_predicate(key, op, raw))
+    return conditions
+
+
+def _sort(rows: List[dict], order: str) -> List[dict]:
+    for part in reversed([p for p in order.split(",") if p]):
+        column, *modifiers = part.split(".")
+        desc = "desc" in modifiers
+        # Postgres defaults: NULLS LAST ascending, NULLS FIRST descending
+        rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0), reverse=desc)
+    return rows
+
+
+class FakePostgrest:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, Dict[Tuple, dict]] = {}
+        # (table, fk column) -> fk value -> {primary key: row}; keeps per-job metric reads off full scans
+        self._fk_index: Dict[Tuple[str, str], Dict[Any, Dict[Tuple, dict]]] = {}
+        self.calls = Counter()  # (client, table) -> requests
+        self._lock = threading.RLock()
+        self.rpcs: Dict[str, Callable[[dict], Any]] = {
+            "stats_overview": self._rpc_stats_overview,
+            "downsample_job_metrics": self._rpc_downsample_job_metrics,
+        }
+
+    # Clients ----------------------------------------------------------------
+
+    def async_client(self) -> AsyncPostgrestClient:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self.handle(request, "async")
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=BASE_URL)
+        return AsyncPostgrestClient(BASE_URL, http_client=http_client)
+
+    def call_count(self, client: Optional[str] = None) -> int:
+        return sum(n for (c, _), n in self.calls.items() if client is None or c == client)
+
+    # Storage ----------------------------------------------------------------
+
+    def rows(self, table: str) -> List[dict]:
+        return list(self.tables.get(table, {}).values())
+
+    def _index(self, table: str, row: dict, add: bool):
+        for column in FOREIGN_KEYS.get(table, {}):
+            bucket = self._fk_index.setdefault((table, column), {}).setdefault(row.get(column), {})
+            if add:
+                bucket[self._key(table, row)] = row
+            else:
+                bucket.pop(self._key(table, row), None)
+
+    def _children(self, table: str, column: str, value: Any) -> List[dict]:
+        return list(self._fk_index.get((table, column), {}).get(value, {}).values())
+
+    def _candidates(self, table: str, params: httpx.QueryParams) -> List[dict]:
+        """Rows that can match params: primary-key or foreign-key equality/in filters use the indexes."""
+        store = self.tables.get(table, {})
+        for key, value in params.multi_items():
+            op, _, raw = value.partition(".")
+            if key == "id" and PRIMARY_KEYS.get(table, ("id",)) == ("id",) and op in ("eq", "in"):
+                ids = [_unquote(v) for v in _split_top_level(raw[1:-1])] if op == "in" else [_unquote(raw)]
+                return [store[(i,)] for i in ids if (i,) in store]
+            if key in FOREIGN_KEYS.get(table, {}) and op in ("eq", "in"):
+                values = [_unquote(v) for v in _split_top_level(raw[1:-1])] if op == "in" else [_unquote(raw)]
+                return [r for v in values for r in self._children(table, key, v)]
+        return list(store.values())
+
+    def _key(self, table: str, row: dict, columns: Optional[Tuple[str, ...]] = None) -> Tuple:
+        return tuple(row.get(c) for c in (columns or PRIMARY_KEYS.get(table, ("id",))))
+
+    def load(self, table: str, rows: List[dict]):
+        """Bulk-load rows directly (test data setup; not counted as calls)."""
+        with self._lock:
+            for row in rows:
+                self._insert(table, row, upsert=True)
+
+    def _insert(self, table: str, row: dict, upsert: bool, on_conflict: Optional[Tuple[str, ...]] = None) -> dict:
+        store = self.tables.setdefault(table, {})
+        key = self._key(table, row, on_conflict)
+        existing = next((r for r in store.values() if self._key(table, r, on_conflict) == key), None) if on_conflict else store.get(key)
+        if existing is not None:
+            if not upsert:
+                raise FakeResponseError(409, "duplicate key value violates unique constraint", "23505")
+            self._index(table, existing, add=False)
+            existing.update(row)
+            self._index(table, existing, add=True)
+            self._after_write(table, existing)
+            return existing
+        full = {**DEFAULTS.get(table, dict)(), **row}
+        store[self._key(table, full)] = full
+        self._index(table, full, add=True)
+        self._after_write(table, full)
+        return full
+
+    def _after_write(self, table: str, row: dict):
+        # Mirrors trg_training_jobs_latest_job / trg_experiments_updated_at
+        if table == "training_jobs":
+            exp = self.tables.get("experiments", {}).get((row.get("experiment_id"),))
+            latest = exp and exp.get("latest_job")
+            if exp is not None and (not latest or latest["id"] == row["id"] or (latest.get("created_at") or "") <= (row.get("created_at") or "")):
+                exp["latest_job"] = {
+                    k: row.get(k)
+                    for k in ("id", "status", "progress", "current_epoch", "total_epochs", "latest_metrics", "created_at", "started_at", "completed_at")
+                }
+                exp["updated_at"] = _now()
+
+    def _delete(self, table: str, row: dict):
+        self.tables.get(table, {}).pop(self._key(table, row), None)
+        self._index(table, row, add=False)
+        for child, fks in FOREIGN_KEYS.items():
+            for column, parent in fks.items():
+                if parent != table:
+                    continue
+                for child_row in self._children(child, column, row.get("id")):
+                    if child == "experiments":
+                        self._index(child, child_row, add=False)
+                        child_row[column] = None  # ON DELETE SET NULL
+                        self._index(child, child_row, add=True)
+                    else:
+                        self._delete(child, child_row)
+
+    # Projection -------------------------------------------------------------
+
+    def _project(self, table: str, row: dict, select: str) -> dict:
+        out: Dict[str, Any] = {}
+        for item in _split_top_level(select or "*"):
+            if item == "*":
+                out.update(row)
+            elif "(" in item:
+                target, inner = item[: item.index("(")].strip(), item[item.index("(") + 1 : -1]
+                out[target] = self._embed(table, row, target, inner)
+            else:
+                out[item] = row.get(item)
+        return out
+
+    def _embed(self, table: str, row: dict, target: str, select: str):
+        for column, parent in FOREIGN_KEYS.get(table, {}).items():
+            if parent == target:  # many-to-one: object
+                ref = self.tables.get(target, {}).get((row.get(column),))
+                return self._project(target, ref, select) if ref else None
+        for column, parent in FOREIGN_KEYS.get(target, {}).items():
+            if parent == table:  # one-to-many: list
+                return [self._project(target, r, select) for r in self._children(target, column, row.get("id"))]
+        raise FakeResponseError(400, f"no relationship between {table} and {target}", "PGRST200")
+
+    # HTTP -------------------------------------------------------------------
+
+    def handle(self, request: httpx.Request, client: str) -> httpx.Response:
+        path = request.url.path.split("/rest/v1/", 1)[-1]
+        self.calls[(client, path)] += 1
+        try:
+            with self._lock:
+                if path.startswith("rpc/"):
+                    fn = self.rpcs.get(path[4:])
+                    if fn is None:
+                        raise FakeResponseError(404, f"function {path[4:]} not found", "PGRST202")
+                    return httpx.Response(200, json=fn(json.loads(request.content or b"{}")))
+                return self._table_request(request, path)
+        except FakeResponseError as e:
+            return httpx.Response(e.status, json={"message": e.message, "code": e.code, "details": e.details, "hint": None})
+
+    def _table_request(self, request: httpx.Request, table: str) -> httpx.Response:
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        conditions = _filters(params)
+        matched = [r for r in self._candidates(table, params) if all(c(r) for c in conditions)]
+        select = params.get("select", "*")
+
+        if request.method == "POST":
+            body = json.loads(request.content or b"[]")
+            upsert = "resolution=merge-duplicates" in prefer
+            on_conflict = tuple(params["on_conflict"].split(",")) if "on_conflict" in params else None
+            written = [self._insert(table, dict(r), upsert, on_conflict) for r in (body if isinstance(body, list) else [body])]
+            data = [self._project(table, r, select) for r in written] if "return=minimal" not in prefer else None
+            return httpx.Response(201, json=data) if data is not None else httpx.Response(201)
+        if request.method == "PATCH":
+            changes = json.loads(request.content or b"{}")
+            for r in matched:
+                self._index(table, r, add=False)
+                r.update(changes)
+                self._index(table, r, add=True)
+                if table == "experiments":
+                    r["updated_at"] = _now()
+                self._after_write(table, r)
+            return httpx.Response(200, json=[self._project(table, r, select) for r in matched])
+        if request.method == "DELETE":
+            for r in matched:
+                self._delete(table, r)
+            return httpx.Response(200, json=[self._project(table, r, select) for r in matched])
+
+        matched = _sort(matched, params.get("order", ""))
+        total = len(matched)
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        page = matched[offset : offset + limit if limit is not None else None]
+        data = [self._project(table, r, select) for r in page]
+
+        if request.headers.get("accept") == "application/vnd.pgrst.object+json":
+            if len(data) != 1:
+                raise FakeResponseError(
+                    406, "JSON object requested, multiple (or no) rows returned", "PGRST116", f"The result contains {len(data)} rows"
+                )
+            return httpx.Response(200, json=data[0])
+        headers = {}
+        if "count=" in prefer:
+            headers["content-range"] = f"{offset}-{offset + len(data) - 1}/{total}" if data else f"*/{total}"
+        return httpx.Response(200, json=data, headers=headers)
+
+    # RPC functions from supabase/schema.sql ---------------------------------
+
+    def _rpc_stats_overview(self, _: dict) -> dict:
+        def group(rows, column):
+            return dict(Counter((r.get(column) or "unknown") for r in rows))
+
+        jobs = self.rows("training_jobs")
+        durations = [
+            (datetime.fromisoformat(j["completed_at"]) - datetime.fromisoformat(j["started_at"])).total_seconds() / 60
+            for j in jobs
+            if j.get("status") == "completed" and j.get("started_at") and j.get("completed_at")
+        ]
+        datasets = self.rows("datasets")
+        return {
+            "experiments_by_status": group(self.rows("experiments"), "status"),
+            "datasets_by_modality": group(datasets, "modality"),
+            "datasets_total_size_bytes": sum(d.get("size_bytes") or 0 for d in datasets),
+            "jobs_by_status": group(jobs, "status"),
+            "avg_job_duration_minutes": sum(durations) / len(durations) if durations else 0.0,
+        }
+
+    def _rpc_downsample_job_metrics(self, args: dict) -> List[dict]:
+        start, end = args.get("p_start_epoch"), args.get("p_end_epoch")
+        rows = [
+            r
+            for r in self._children("metrics", "job_id", args["p_job_id"])
+            if (start is None or r["epoch"] >= start)
+            and (end is None or r["epoch"] <= end)
+        ]
+        rows = _sort(rows, "epoch,step")
+        n, buckets, metric = len(rows), max(1, int(args["p_buckets"])), args.get("p_metric") or "loss"
+        keep = set(range(n)) if n <= 2 * buckets + 2 else {0, n - 1}
+        if n > 2 * buckets + 2:
+            for b in range(buckets):
+                lo, hi = 1 + b * (n - 2) // buckets, 1 + (b + 1) * (n - 2) // buckets
+                if lo < hi:
+                    idx = range(lo, hi)
+                    keep.add(min(idx, key=lambda i: rows[i][metric]))
+                    keep.add(max(idx, key=lambda i: rows[i][metric]))
+        return [{**rows[i], "point_index": i, "total_points": n} for i in sorted(keep)]
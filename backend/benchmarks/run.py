@@ -0,0 +1,280 @@
+"""
+Endpoint benchmarks against an in-memory Supabase stand-in (benchmarks/fake_postgrest.py).
+Run from backend/:
+    python -m benchmarks.run                          # writes benchmarks/results/latest.json
+    python -m benchmarks.run --output before.json --db-latency-ms 2
+    python -m benchmarks.run --compare before.json after.json
+Each scenario drives one route with --concurrency in-flight requests and records p50/p95/p99
+latency, throughput and PostgREST calls per request. The WebSocket scenario measures
+publish-to-delivery latency across subscribers. Result files are stable JSON (sorted keys,
+rounded values) so two runs can be diffed; --compare flags latency and DB-call regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from argparse import Namespace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+from benchmarks.fake_postgrest import FakePostgrest
+
+# Before the app is first imported (inside the scenarios): settings are read at import time
+os.environ.setdefault("SUPABASE_URL", "http://fake-supabase")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+os.environ.setdefault("SKIP_DB_INIT", "1")
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# --compare: a scenario regresses when p95 grows by more than this fraction or it makes more DB calls
+P95_REGRESSION = 0.20
+
+
+def seed(fake: FakePostgrest, experiments: int, points: int) -> Dict[str, List[str]]:
+    """Deterministic catalog + metrics from the bulk seeder, loaded straight into the fake."""
+    from app.services.rollups import MetricRollups
+    from app.utils.bulk_seed import build_catalog, job_metric_rows, job_series
+
+    catalog = build_catalog(Namespace(seed=0, datasets=10, experiments=experiments, jobs=1, points=points, prefix="bench"))
+    fake.load("datasets", catalog["datasets"])
+    fake.load("experiments", catalog["experiments"])
+    jobs = catalog["training_jobs"]
+    for job in jobs:
+        rows = job_metric_rows(job, job_series(job, points, 0))
+        job_row = {k: v for k, v in job.items() if not k.startswith("_")}
+        job_row["latest_metrics"] = {m: rows[-1][m] for m in ("loss", "accuracy", "learning_rate", "throughput")}
+        fake.load("training_jobs", [job_row])
+        fake.load("metrics", rows)
+        rollups = MetricRollups(job["id"])
+        rollups.add(rows)
+        fake.load("metric_rollups", rollups.dirty_rows())
+    return {
+        "datasets": [d["id"] for d in catalog["datasets"]],
+        "experiments": [e["id"] for e in catalog["experiments"]],
+        "jobs": [j["id"] for j in jobs],
+    }
+
+
+def _summary(latencies: List[float], statuses: Dict[int, int], elapsed: float, db_calls: int, requests: int) -> dict:
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": requests,
+        "errors": sum(n for code, n in statuses.items() if code >= 400),
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed > 0 else 0.0,
+        "db_calls_per_request": round(db_calls / requests, 2) if requests else 0.0,
+    }
+
+
+def http_scenarios(ids: Dict[str, List[str]]) -> Dict[str, Callable[[httpx.AsyncClient, int], "asyncio.Future"]]:
+    """name -> async fn(client, i) issuing one request (i varies ids across requests)."""
+    exp, jobs, datasets = ids["experiments"], ids["jobs"], ids["datasets"]
+    api = "/api/v1"
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    etags: Dict[str, str] = {}
+
+    async def conditional(client, url):
+        headers = {"If-None-Match": etags[url]} if url in etags else {}
+        r = await client.get(url, headers=headers)
+        if "etag" in r.headers:
+            etags[url] = r.headers["etag"]
+        return r
+
+    async def created_experiment(client, i):
+        body = {
+            "name": f"bench create {i}",
+            "dataset_id": pick(datasets, i),
+            "config": {"model_type": "bench", "hyperparameters": {"num_epochs": 1}},
+            "tags": ["bench"],
+        }
+        return await client.post(f"{api}/experiments", json=body)
+
+    return {
+        "datasets_list": lambda c, i: c.get(f"{api}/datasets?page_size=20"),
+        "datasets_list_cursor": lambda c, i: c.get(f"{api}/datasets?page_size=5&count=none"),
+        "dataset_get": lambda c, i: c.get(f"{api}/datasets/{pick(datasets, i)}"),
+        "dataset_get_conditional": lambda c, i: conditional(c, f"{api}/datasets/{pick(datasets, i)}"),
+        "experiments_list": lambda c, i: c.get(f"{api}/experiments?page_size=20"),
+        "experiments_list_deep_page": lambda c, i: c.get(f"{api}/experiments?page_size=20&page={max(1, len(exp) // 20)}"),
+        "experiment_get": lambda c, i: c.get(f"{api}/experiments/{pick(exp, i)}"),
+        "experiment_get_conditional": lambda c, i: conditional(c, f"{api}/experiments/{pick(exp, i)}"),
+        "experiment_create": created_experiment,
+        "job_get": lambda c, i: c.get(f"{api}/jobs/{pick(jobs, i)}"),
+        "job_get_conditional": lambda c, i: conditional(c, f"{api}/jobs/{pick(jobs, i)}"),
+        "scheduler_stats": lambda c, i: c.get(f"{api}/jobs/scheduler/stats"),
+        "job_metrics": lambda c, i: c.get(f"{api}/jobs/{pick(jobs, i)}/metrics"),
+        "job_metrics_downsampled": lambda c, i: c.get(f"{api}/jobs/{pick(jobs, i)}/metrics?max_points=200"),
+        "job_metrics_conditional": lambda c, i: conditional(c, f"{api}/jobs/{pick(jobs, i)}/metrics?max_points=200"),
+        "job_metrics_ndjson": lambda c, i: c.get(f"{api}/jobs/{pick(jobs, i)}/metrics?format=ndjson"),
+        "job_metrics_export_arrow": lambda c, i: c.get(f"{api}/jobs/{pick(jobs, i)}/metrics/export"),
+        "stats_overview": lambda c, i: c.get(f"{api}/stats/overview"),
+        "compare": lambda c, i: c.post(
+            f"{api}/experiments/compare",
+            json={"experiment_ids": [pick(exp, i), pick(exp, i + 1), pick(exp, i + 2)], "metrics": ["loss", "accuracy"]},
+        ),
+    }
+
+
+async def run_http(app, fake: FakePostgrest, name: str, fn, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await fn(client, 0)  # warm-up (imports, caches, first ETag)
+        latencies: List[float] = []
+        statuses: Dict[int, int] = {}
+        counter = iter(range(requests))
+        calls_before = fake.call_count("async")
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                r = await fn(client, i)
+                _ = r.content
+                latencies.append(time.perf_counter() - started)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return _summary(latencies, statuses, elapsed, fake.call_count("async") - calls_before, requests)
+
+
+def run_websocket(app, job_id: str, messages: int, subscribers: int) -> dict:
+    """Publish job updates the way training workers do; time until each subscriber receives them."""
+    from fastapi.testclient import TestClient
+    from app.services.training import TrainingService
+
+    service = TrainingService()
+    latencies: List[float] = []
+    with TestClient(app) as client:
+        sockets = [client.websocket_connect(f"/api/v1/jobs/{job_id}/metrics/stream") for _ in range(subscribers)]
+        connections = [s.__enter__() for s in sockets]
+        try:
+            for ws in connections:  # Subscriptions are registered once the socket answers
+                ws.send_text("ping")
+                ws.receive_text()
+            started = time.perf_counter()
+            for i in range(messages):
+                sent = time.perf_counter()
+                service._notify_sync(job_id, {"type": "metric_update", "job_id": job_id, "epoch": i, "step": 0, "metrics": {}})
+                for ws in connections:
+                    ws.receive_text()
+                    latencies.append(time.perf_counter() - sent)
+            elapsed = time.perf_counter() - started
+        finally:
+            for s in sockets:
+                s.__exit__(None, None, None)
+    result = _summary(latencies, {200: len(latencies)}, elapsed, 0, len(latencies))
+    result["subscribers"] = subscribers
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(args) -> dict:
+    from app import supabase_client
+    from app.main import app
+
+    fake = FakePostgrest(latency=args.db_latency_ms / 1000)
+    supabase_client._async_client = fake.async_client()
+    ids = seed(fake, args.experiments, args.points)
+
+    scenarios = http_scenarios(ids)
+    selected = [s for s in scenarios if not args.only or any(o in s for o in args.only)]
+    results: Dict[str, dict] = {}
+    for name in selected:
+        results[name] = asyncio.run(run_http(app, fake, name, scenarios[name], args.requests, args.concurrency))
+        results[name]["concurrency"] = args.concurrency
+        print(_row(name, results[name]))
+    if not args.only or any(o in "websocket_stream" for o in args.only):
+        results["websocket_stream"] = run_websocket(app, ids["jobs"][0], args.ws_messages, args.ws_subscribers)
+        print(_row("websocket_stream", results["websocket_stream"]))
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "experiments": args.experiments,
+            "points_per_job": args.points,
+            "db_latency_ms": args.db_latency_ms,
+        },
+        "scenarios": results,
+    }
+
+
+def _row(name: str, r: dict) -> str:
+    return (
+        f"{name:<28} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  "
+        f"{r['throughput_rps']:>8.1f} req/s  {r['db_calls_per_request']:>5.2f} db/req  errors {r['errors']}"
+    )
+
+
+def compare(before_path: str, after_path: str) -> int:
+    before = json.loads(Path(before_path).read_text())["scenarios"]
+    after = json.loads(Path(after_path).read_text())["scenarios"]
+    regressions = 0
+    print(f"{'scenario':<28} {'p95 before':>11} {'p95 after':>10} {'change':>8}  {'db/req':>13}")
+    for name in sorted(set(before) | set(after)):
+        b, a = before.get(name), after.get(name)
+        if not b or not a:
+            print(f"{name:<28} {'only in ' + ('after' if a else 'before'):>31}")
+            continue
+        change = (a["p95_ms"] - b["p95_ms"]) / b["p95_ms"] if b["p95_ms"] else 0.0
+        flag = ""
+        if change > P95_REGRESSION or a["db_calls_per_request"] > b["db_calls_per_request"] or a["errors"] > b["errors"]:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{name:<28} {b['p95_ms']:>9.2f}ms {a['p95_ms']:>8.2f}ms {change:>+7.0%}  "
+            f"{b['db_calls_per_request']:>5.2f} → {a['db_calls_per_request']:<5.2f}{flag}"
+        )
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against an in-memory Supabase stand-in.")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="in-flight requests per scenario")
+    parser.add_argument("--experiments", type=int, default=50, help="seeded experiments (one job each)")
+    parser.add_argument("--points", type=int, default=2000, help="seeded metric points per job")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated round-trip time per PostgREST call")
+    parser.add_argument("--ws-messages", type=int, default=200, help="updates published in the WebSocket scenario")
+    parser.add_argument("--ws-subscribers", type=int, default=10, help="WebSocket connections on the job")
+    parser.add_argument("--only", nargs="*", help="run scenarios whose name contains any of these")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/latest.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.compare:
+        return compare(*args.compare)
+    result = benchmark(args)
+    output = Path(args.output) if args.output else RESULTS_DIR / "latest.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import os
+
+# Settings are read at import time. The tests below never reach the database, but the Supabase client
+# needs credentials to be constructed.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+
+import pytest  # noqa: E402 (after the environment above)
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager: startup (pub/sub, leases, seeding) does not run
+    return TestClient(app)
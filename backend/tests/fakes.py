@@ -0,0 +1,80 @@
+"""In-memory stand-ins for the storage repositories, covering the calls the training path makes."""
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.rows: List[dict] = []
+        self.rollups: Dict[tuple, dict] = {}
+        self.fail_inserts = 0
+        self.fail_upserts = 0
+
+    async def insert(self, rows: List[dict]):
+        if self.fail_inserts:
+            self.fail_inserts -= 1
+            raise ConnectionError("insert failed")
+        self.rows.extend(rows)
+
+    async def upsert_rollups(self, rows: List[dict]):
+        if self.fail_upserts:
+            self.fail_upserts -= 1
+            raise ConnectionError("upsert failed")
+        for r in rows:
+            self.rollups[(r["epoch"], r["metric"])] = r
+
+    async def last_point(self, job_id: str) -> Optional[dict]:
+        points = [(r["epoch"], r["step"]) for r in self.rows if r["job_id"] == job_id]
+        return dict(zip(("epoch", "step"), max(points))) if points else None
+
+    async def rebuild_rollups(self, job_id: str):
+        from app.services.rollups import MetricRollups
+
+        rollups = MetricRollups(job_id)
+        rollups.add(r for r in self.rows if r["job_id"] == job_id)
+        self.rollups = {(r["epoch"], r["metric"]): r for r in rollups.dirty_rows()}
+
+    async def rollup_rows(self, job_ids, metrics=None, start_epoch=None, end_epoch=None) -> List[dict]:
+        if start_epoch is None:
+            return [r for (epoch, _), r in self.rollups.items() if epoch == -1]
+        return [r for (epoch, _), r in self.rollups.items() if start_epoch <= epoch <= end_epoch]
+
+
+class FakeJobs:
+    def __init__(self):
+        self.jobs: Dict[str, dict] = {}
+        self.updates: List[tuple] = []
+        self.kept: Optional[set] = None  # renew_leases result; None keeps every lease
+        self.reapable: List[dict] = []
+        self.renewed: List[List[str]] = []
+        self.reap_limits: List[int] = []
+
+    async def update(self, job_id: str, fields: dict, expect_status: Optional[str] = None) -> Optional[dict]:
+        job = self.jobs.setdefault(job_id, {"id": job_id, "experiment_id": f"exp-{job_id}", "status": "running"})
+        if expect_status is not None and job["status"] != expect_status:
+            return None
+        self.updates.append((job_id, dict(fields)))
+        job.update(fields)
+        return job
+
+    async def renew_leases(self, worker: str, job_ids: Sequence[str], lease_seconds: int) -> set:
+        self.renewed.append(list(job_ids))
+        return set(job_ids) if self.kept is None else set(job_ids) & self.kept
+
+    async def reap(self, worker: str, lease_seconds: int, limit: int) -> List[dict]:
+        self.reap_limits.append(limit)
+        reaped, self.reapable = self.reapable[:limit], self.reapable[limit:]
+        return reaped
+
+
+class FakeExperiments:
+    def __init__(self):
+        self.updates: List[tuple] = []
+
+    async def update(self, experiment_id: str, fields: dict) -> Optional[dict]:
+        self.updates.append((experiment_id, dict(fields)))
+        return {"id": experiment_id, **fields}
+
+
+def fake_repositories() -> SimpleNamespace:
+    return SimpleNamespace(metrics=FakeMetrics(), jobs=FakeJobs(), experiments=FakeExperiments())
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from app.services.broadcast import BroadcastHub
+
+
+def _metric(step: int) -> dict:
+    return {"type": "metric_update", "job_id": "job-1", "step": step}
+
+
+async def _drain(subscription) -> list:
+    """Everything queued for the subscription (closing it: get() then returns None once the queue is empty)."""
+    subscription.close()
+    messages = []
+    while (text := await subscription.get()) is not None:
+        messages.append(text)
+    return messages
+
+
+def test_slow_subscriber_drops_oldest_metric_updates_but_keeps_job_complete():
+    async def scenario():
+        hub = BroadcastHub(queue_size=3)
+        slow = hub.subscribe("job-1")
+        for step in range(3):
+            hub.publish("job-1", _metric(step))
+        hub.publish("job-1", {"type": "job_complete", "job_id": "job-1", "status": "completed"})
+        hub.publish("job-1", _metric(3))
+        await asyncio.sleep(0)  # publish() hands off to the loop
+        return slow, [json.loads(m) for m in await _drain(slow)]
+
+    slow, messages = asyncio.run(scenario())
+    assert [(m["type"], m.get("step")) for m in messages] == [
+        ("metric_update", 2),
+        ("job_complete", None),
+        ("metric_update", 3),
+    ]
+    assert slow.dropped == 2
+
+
+def test_queue_of_must_deliver_messages_drops_new_metric_updates_only():
+    async def scenario():
+        hub = BroadcastHub(queue_size=2)
+        slow = hub.subscribe("job-1")
+        hub.publish_text("job-1", "complete-1", droppable=False)
+        hub.publish_text("job-1", "complete-2", droppable=False)
+        hub.publish("job-1", _metric(0))  # No room: this update is dropped
+        hub.publish_text("job-1", "complete-3", droppable=False)  # Must-deliver messages are never dropped
+        await asyncio.sleep(0)
+        return slow, await _drain(slow)
+
+    slow, messages = asyncio.run(scenario())
+    assert messages == ["complete-1", "complete-2", "complete-3"]
+    assert slow.dropped == 1
+
+
+def test_each_subscriber_has_its_own_queue():
+    async def scenario():
+        hub = BroadcastHub(queue_size=1)
+        slow, fast = hub.subscribe("job-1"), hub.subscribe("job-1")
+        hub.publish("job-1", _metric(0))
+        await asyncio.sleep(0)
+        first = json.loads(await fast.get())
+        hub.publish("job-1", _metric(1))
+        await asyncio.sleep(0)
+        return slow, first, await _drain(fast), await _drain(slow)
+
+    slow, first, fast_rest, slow_messages = asyncio.run(scenario())
+    assert first["step"] == 0 and [json.loads(m)["step"] for m in fast_rest] == [1]
+    assert [json.loads(m)["step"] for m in slow_messages] == [1] and slow.dropped == 1
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.api.metrics import _downsample_job_metrics
+from app.utils.downsampling import downsample_rows, lttb_indices, minmax_indices
+
+METHODS = ("lttb", "minmax")
+
+
+def _rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [{"epoch": i // 10, "step": i % 10, "loss": float(v)} for i, v in enumerate(rng.random(n))]
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n", [3, 4, 5, 100, 1001])
+@pytest.mark.parametrize("max_points", [3, 4, 5, 6, 7, 50])
+def test_never_returns_more_than_max_points(method, n, max_points):
+    rows = _rows(n)
+    result = downsample_rows(rows, max_points, method)
+    assert len(result) <= max_points
+    # Always keeps both ends, in order, without duplicates
+    assert result[0] is rows[0] and result[-1] is rows[-1]
+    positions = [rows.index(r) for r in result]
+    assert positions == sorted(set(positions))
+
+
+def test_minmax_with_three_points_keeps_the_largest_excursion():
+    y = np.array([1.0, 0.9, 0.8, 5.0, 0.6, 0.5])
+    assert minmax_indices(y, 3).tolist() == [0, 3, 5]
+    assert lttb_indices(np.arange(6), y, 3).tolist()[1] == 3
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = np.zeros(102)
+    y[10], y[60] = 9.0, -9.0
+    assert {10, 60} <= set(minmax_indices(y, 6).tolist())
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_metrics_endpoint_downsampling_respects_max_points(method):
+    rows = [{**r, "point_index": i} for i, r in enumerate(_rows(500))]
+
+    async def downsample(job_id, buckets, start_epoch, end_epoch, metric="loss"):
+        return rows, len(rows)
+
+    repos = SimpleNamespace(metrics=SimpleNamespace(downsample=downsample))
+    for max_points in (3, 4, 9, 100):
+        result, total = asyncio.run(_downsample_job_metrics(repos, "job-1", 0, None, max_points, method))
+        assert len(result) <= max_points and total == 500
@@ -0,0 +1,54 @@
+import pytest
+from app.services import job_leases
+from app.services.job_leases import LeaseKeeper
+from tests.fakes import fake_repositories
+
+
+@pytest.fixture
+def repos(monkeypatch):
+    repos = fake_repositories()
+    monkeypatch.setattr(job_leases, "get_repositories", lambda: repos)
+    return repos
+
+
+def _keeper(held, capacity, lost, reaped):
+    return LeaseKeeper(
+        held=lambda: list(held),
+        capacity=lambda: capacity,
+        on_lost=lost.append,
+        on_reaped=reaped.append,
+        worker_id="worker-1",
+        lease_seconds=30,
+    )
+
+
+def test_beat_reports_lost_leases_then_reaps_into_free_slots(repos):
+    repos.jobs.kept = {"a", "c"}
+    repos.jobs.reapable = [{"id": "orphan-1"}, {"id": "orphan-2"}, {"id": "orphan-3"}]
+    lost, reaped = [], []
+    _keeper(["a", "b", "c"], 2, lost, reaped).beat()
+
+    assert repos.jobs.renewed == [["a", "b", "c"]]
+    assert lost == ["b"]
+    assert repos.jobs.reap_limits == [2]
+    assert [job["id"] for job in reaped] == ["orphan-1", "orphan-2"]
+
+
+def test_beat_without_held_jobs_or_free_slots(repos):
+    repos.jobs.reapable = [{"id": "orphan"}]
+    lost, reaped = [], []
+    _keeper([], 0, lost, reaped).beat()
+
+    assert repos.jobs.renewed == [] and repos.jobs.reap_limits == []
+    assert lost == [] and reaped == []
+
+
+def test_stopped_keeper_does_not_reap(repos):
+    repos.jobs.reapable = [{"id": "orphan"}]
+    lost, reaped = [], []
+    keeper = _keeper(["a"], 1, lost, reaped)
+    keeper.stop()
+    keeper.beat()
+
+    assert repos.jobs.renewed == [["a"]]
+    assert repos.jobs.reap_limits == [] and reaped == []
@@ -0,0 +1,46 @@
+import pytest
+from app.services.metric_writer import MetricWriter
+from tests.fakes import fake_repositories
+
+
+def _writer(repos):
+    return MetricWriter(repos, "job-1", batch_size=1000, flush_interval=3600)
+
+
+def _add(writer, epoch, steps):
+    for step in steps:
+        writer.add({"epoch": epoch, "step": step, "loss": 1.0 / (step + 1), "accuracy": step / 100}, progress=step, current_epoch=epoch)
+
+
+def test_failed_insert_keeps_rows_for_the_next_flush():
+    repos = fake_repositories()
+    writer = _writer(repos)
+    _add(writer, 0, range(3))
+    repos.metrics.fail_inserts = 1
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    assert writer.pending == 3
+    assert repos.metrics.rollups == {} and repos.jobs.updates == []
+
+    _add(writer, 0, range(3, 5))
+    writer.close()
+    assert [r["step"] for r in repos.metrics.rows] == [0, 1, 2, 3, 4]
+    assert writer.pending == 0
+    # Rollups count each stored row exactly once
+    assert repos.metrics.rollups[(-1, "loss")]["count"] == 5
+    assert repos.jobs.updates[-1][1]["progress"] == 4
+
+
+def test_failed_rollup_upsert_is_retried_without_rewriting_rows():
+    repos = fake_repositories()
+    writer = _writer(repos)
+    _add(writer, 0, range(2))
+    repos.metrics.fail_upserts = 1
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    assert len(repos.metrics.rows) == 2 and writer.pending == 0
+
+    writer.close()
+    assert len(repos.metrics.rows) == 2
+    assert repos.metrics.rollups[(-1, "loss")]["count"] == 2
+    assert repos.jobs.updates[-1][1]["current_epoch"] == 0
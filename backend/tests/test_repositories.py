@@ -0,0 +1,36 @@
+import inspect
+import pytest
+from app.repositories import base, postgres, supabase
+from app.services import pubsub
+from app.utils import prometheus
+
+INTERFACES = (
+    base.DatasetRepository,
+    base.ExperimentRepository,
+    base.JobRepository,
+    base.MetricRepository,
+    base.Repositories,
+    pubsub.PubSubBackend,
+    prometheus._Metric,
+)
+
+
+def _implementations():
+    for module in (postgres, supabase, pubsub, prometheus):
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and issubclass(cls, INTERFACES) and cls not in INTERFACES:
+                yield cls
+
+
+@pytest.mark.parametrize("cls", list(_implementations()), ids=lambda cls: cls.__name__)
+def test_backends_implement_the_whole_interface(cls):
+    assert not cls.__abstractmethods__
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class PartialJobRepository(base.JobRepository):
+        async def get(self, job_id):
+            return None
+
+    with pytest.raises(TypeError, match="claim"):
+        PartialJobRepository()
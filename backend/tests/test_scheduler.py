@@ -0,0 +1,114 @@
+import threading
+import time
+from app.services.scheduler import JobScheduler
+
+
+class Recorder:
+    """run_job for the scheduler: records start order; jobs with a gate block until it is opened."""
+
+    def __init__(self, *gated: str):
+        self.started = []
+        self.finished = []
+        self.gates = {job_id: threading.Event() for job_id in gated}
+        self._lock = threading.Lock()
+
+    def __call__(self, job_id: str, config: dict):
+        with self._lock:
+            self.started.append(job_id)
+        if job_id in self.gates:
+            assert self.gates[job_id].wait(5)
+        with self._lock:
+            self.finished.append(job_id)
+
+    def open(self, job_id: str):
+        self.gates[job_id].set()
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_higher_priority_runs_first_then_submission_order():
+    run = Recorder("gate")
+    scheduler = JobScheduler(run, max_workers=1)
+    scheduler.submit("gate", {})
+    wait_until(lambda: run.started == ["gate"])
+    for job_id, priority in (("low-1", 0), ("high", 5), ("low-2", 0), ("mid", 1)):
+        scheduler.submit(job_id, {}, priority=priority)
+
+    run.open("gate")
+    wait_until(lambda: len(run.finished) == 5)
+    assert run.started == ["gate", "high", "mid", "low-1", "low-2"]
+
+
+def test_owner_with_fewer_running_jobs_goes_first():
+    run = Recorder("alice-running", "bob-running")
+    scheduler = JobScheduler(run, max_workers=2)
+    scheduler.submit("alice-running", {}, owner="alice")
+    scheduler.submit("bob-running", {}, owner="bob")
+    wait_until(lambda: len(run.started) == 2)
+    scheduler.submit("alice-2", {}, owner="alice")
+    scheduler.submit("alice-3", {}, owner="alice")
+    scheduler.submit("carol-1", {}, owner="carol")
+    scheduler.submit("alice-urgent", {}, owner="alice", priority=1)
+
+    # The freed worker takes the highest priority first, then carol (nothing running) before alice (one running)
+    run.open("bob-running")
+    wait_until(lambda: len(run.finished) == 5)
+    assert run.started[2:] == ["alice-urgent", "carol-1", "alice-2", "alice-3"]
+    run.open("alice-running")
+    wait_until(lambda: len(run.finished) == 6)
+
+
+def test_cancel_skips_a_queued_job():
+    run = Recorder("gate")
+    scheduler = JobScheduler(run, max_workers=1)
+    scheduler.submit("gate", {})
+    wait_until(lambda: run.started == ["gate"])
+    scheduler.submit("job-1", {})
+    scheduler.submit("job-2", {})
+
+    assert scheduler.cancel("job-1") is True
+    assert scheduler.cancel("job-1") is False
+    assert scheduler.cancel("gate") is False  # Already running
+    assert not scheduler.is_queued("job-1")
+    run.open("gate")
+    wait_until(lambda: len(run.finished) == 2)
+    assert run.started == ["gate", "job-2"]
+
+
+def test_resubmitting_a_queued_or_running_job_is_a_no_op():
+    run = Recorder("gate")
+    scheduler = JobScheduler(run, max_workers=1)
+    assert scheduler.submit("gate", {})
+    wait_until(lambda: run.started == ["gate"])
+    assert scheduler.submit("job-1", {})
+    assert not scheduler.submit("gate", {})
+    assert not scheduler.submit("job-1", {})
+    run.open("gate")
+    wait_until(lambda: len(run.finished) == 2)
+    assert run.started == ["gate", "job-1"]
+
+
+def test_job_ids_and_free_slots_count_queued_and_running_jobs():
+    run = Recorder("running-1", "running-2")
+    scheduler = JobScheduler(run, max_workers=3)
+    assert scheduler.free_slots() == 3 and scheduler.job_ids() == []
+    scheduler.submit("running-1", {})
+    scheduler.submit("running-2", {})
+    wait_until(lambda: len(run.started) == 2)
+    assert scheduler.free_slots() == 1
+
+    run.gates["queued"] = threading.Event()
+    scheduler.submit("queued", {})
+    wait_until(lambda: len(run.started) == 3)
+    assert sorted(scheduler.job_ids()) == ["queued", "running-1", "running-2"]
+    assert scheduler.free_slots() == 0
+
+    for job_id in ("running-1", "running-2", "queued"):
+        run.open(job_id)
+    wait_until(lambda: scheduler.job_ids() == [])
+    assert scheduler.free_slots() == 3
@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+from app.schemas.experiment import ExperimentCreate
+
+
+def _experiment(simulation):
+    return {
+        "name": "resnet-baseline",
+        "config": {"model_type": "resnet", "hyperparameters": {"num_epochs": 2}, "simulation": simulation},
+    }
+
+
+@pytest.mark.parametrize("seed", [-1, 1.5, "abc"])
+def test_bad_seed_returns_422(client, seed):
+    response = client.post("/api/v1/experiments", json=_experiment({"seed": seed}))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "config", "simulation", "seed"]
+
+
+def test_unknown_profile_returns_422(client):
+    response = client.post("/api/v1/experiments", json=_experiment({"profile": "cosine"}))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "config", "simulation", "profile"]
+
+
+def test_profiles_match_simulation():
+    from app.utils.simulation import PROFILES
+
+    for profile in PROFILES:
+        assert ExperimentCreate(**_experiment({"profile": profile})).config.simulation.profile == profile
+    with pytest.raises(ValidationError):
+        ExperimentCreate(**_experiment({"profile": "cosine"}))
+
+
+def test_simulation_is_optional():
+    experiment = ExperimentCreate(**_experiment({"seed": 7}))
+    assert experiment.config.simulation.seed == 7
+    assert experiment.config.simulation.profile is None
+    assert ExperimentCreate(**_experiment(None)).config.simulation is None
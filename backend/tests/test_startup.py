@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+from app import main
+from app.config import Settings, settings
+from app.services import retention
+from app.services.job_leases import LeaseKeeper
+
+RETENTION_SETTINGS = ("metric_retention_full_days", "metric_retention_step_days", "metric_compaction_interval_minutes")
+
+
+def _defaults(monkeypatch) -> Settings:
+    # Shipped defaults: no .env file and none of the retention variables from the environment
+    for name in RETENTION_SETTINGS:
+        monkeypatch.delenv(name.upper(), raising=False)
+    return Settings(_env_file=None)
+
+
+def test_defaults_keep_metrics_forever(monkeypatch):
+    defaults = _defaults(monkeypatch)
+    assert defaults.metric_retention_full_days == 0
+    assert defaults.metric_retention_step_days == 0
+    assert defaults.metric_compaction_interval_minutes == 0
+
+
+def test_startup_does_not_schedule_compaction_by_default(monkeypatch):
+    defaults = _defaults(monkeypatch)
+    for name in RETENTION_SETTINGS:
+        monkeypatch.setattr(settings, name, getattr(defaults, name))
+    monkeypatch.setattr(main, "FAST_BOOT", False)
+    monkeypatch.delenv("SKIP_DB_INIT", raising=False)
+    monkeypatch.setenv("AUTO_SEED", "false")
+    # Startup otherwise talks to the database: lease heartbeats
+    monkeypatch.setattr(LeaseKeeper, "start", lambda self: None)
+    sweeps = []
+
+    async def run_periodically(*args):
+        sweeps.append(args)
+
+    monkeypatch.setattr(retention, "run_periodically", run_periodically)
+
+    with TestClient(main.app):
+        assert getattr(main.app.state, "compaction_task", None) is None
+    assert sweeps == []
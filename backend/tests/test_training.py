@@ -0,0 +1,87 @@
+import json
+import threading
+import pytest
+from app.services import job_leases, training
+from app.services.job_leases import LeaseKeeper
+from app.services.scheduler import JobScheduler
+from app.services.training import TrainingService, run_training
+from tests.fakes import fake_repositories
+from tests.test_scheduler import wait_until
+
+
+class NoPacing(threading.Event):
+    """Cancellation token whose epoch pacing wait returns right away."""
+
+    def wait(self, timeout=None):
+        return self.is_set()
+
+
+@pytest.fixture
+def repos(monkeypatch):
+    repos = fake_repositories()
+    monkeypatch.setattr(training, "get_repositories", lambda: repos)
+    monkeypatch.setattr(job_leases, "get_repositories", lambda: repos)
+    return repos
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # Fresh class-level state, so the singleton's real scheduler and cancellation tokens stay untouched
+    monkeypatch.setattr(TrainingService, "_scheduler", JobScheduler(lambda job_id, config: None, 1))
+    monkeypatch.setattr(TrainingService, "_cancel_events", {})
+    monkeypatch.setattr(TrainingService, "_handoff", set())
+    monkeypatch.setattr(TrainingService, "_executor", None)
+    return TrainingService()
+
+
+def _config(epochs: int) -> dict:
+    return {"hyperparameters": {"num_epochs": epochs}, "simulation": {"seed": 7}}
+
+
+def _status_updates(repos) -> list:
+    return [fields["status"] for _, fields in repos.jobs.updates if "status" in fields]
+
+
+def test_lost_lease_hands_the_job_off_without_a_final_status(repos, service):
+    job_id = "job-1"
+    cancelled = TrainingService._cancel_events.setdefault(job_id, threading.Event())
+    published = []
+    thread = threading.Thread(
+        target=run_training,
+        args=(job_id, _config(50), cancelled, lambda: job_id in TrainingService._handoff, lambda c, m: published.append(c)),
+    )
+    thread.start()
+    # First epoch written; the job now paces before the next one
+    wait_until(lambda: f"job:{job_id}:metric_update" in published)
+
+    repos.jobs.kept = set()  # Another worker took the job over
+    LeaseKeeper(
+        held=lambda: [job_id], capacity=lambda: 0, on_lost=service._on_lease_lost, on_reaped=service._on_job_reaped
+    ).beat()
+    thread.join(5)
+    assert not thread.is_alive()
+
+    assert job_id in TrainingService._handoff
+    assert _status_updates(repos) == []
+    assert repos.experiments.updates == []
+    assert f"job:{job_id}:job_complete" not in published
+    # Everything written before the handoff is flushed for the next worker
+    assert {(r["epoch"], r["step"]) for r in repos.metrics.rows} == {(0, step) for step in range(0, 250, 25)}
+
+
+def test_resumed_job_continues_after_the_last_written_step(repos):
+    job_id = "job-1"
+    written = [(0, step) for step in range(0, 250, 25)] + [(1, step) for step in (0, 25, 50, 75)]
+    repos.metrics.rows = [{"job_id": job_id, "epoch": e, "step": s, "loss": 1.0, "accuracy": 0.5} for e, s in written]
+    published = []
+    resume = {"id": job_id, "attempts": 2, "latest_metrics": {"loss": 1.0, "accuracy": 0.5}}
+    run_training(job_id, _config(3), NoPacing(), lambda: False, lambda c, m: published.append((c, m)), resume)
+
+    points = [(r["epoch"], r["step"]) for r in repos.metrics.rows]
+    assert len(points) == len(set(points)) == 30
+    assert points[len(written)] == (1, 100)
+    assert all(point > written[-1] for point in points[len(written):])
+    assert _status_updates(repos) == ["completed"]
+    assert repos.metrics.rollups[(-1, "loss")]["count"] == 30
+    complete = [json.loads(m) for c, m in published if c == f"job:{job_id}:job_complete"]
+    assert [m["status"] for m in complete] == ["completed"]
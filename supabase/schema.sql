@@ -18,6 +18,11 @@ CREATE TABLE IF NOT EXISTS datasets (
   metadata JSONB DEFAULT '{}'
 );
 
+-- Keyset pagination: (sort column, id) for each sortable list order
+CREATE INDEX IF NOT EXISTS idx_datasets_created_at_id ON datasets(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_datasets_name_id ON datasets(name, id);
+CREATE INDEX IF NOT EXISTS idx_datasets_size_bytes_id ON datasets(size_bytes, id);
+
 -- Experiments (references datasets)
 CREATE TABLE IF NOT EXISTS experiments (
   id TEXT PRIMARY KEY,
@@ -36,6 +41,8 @@ CREATE TABLE IF NOT EXISTS experiments (
 CREATE INDEX IF NOT EXISTS idx_experiments_dataset_id ON experiments(dataset_id);
 CREATE INDEX IF NOT EXISTS idx_experiments_status ON experiments(status);
 CREATE INDEX IF NOT EXISTS idx_experiments_created_at ON experiments(created_at);
+CREATE INDEX IF NOT EXISTS idx_experiments_created_at_id ON experiments(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_experiments_name_id ON experiments(name, id);
 
 -- Training jobs (references experiments)
 CREATE TABLE IF NOT EXISTS training_jobs (
@@ -57,6 +64,69 @@ CREATE TABLE IF NOT EXISTS training_jobs (
 CREATE INDEX IF NOT EXISTS idx_training_jobs_experiment_id ON training_jobs(experiment_id);
 CREATE INDEX IF NOT EXISTS idx_training_jobs_status ON training_jobs(status);
 
+-- updated_at on datasets and experiments: bumped on every update (ETag validators for conditional GETs).
+-- experiments.updated_at also moves when the latest_job projection below is refreshed.
+ALTER TABLE experiments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();
+
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_datasets_updated_at ON datasets;
+CREATE TRIGGER trg_datasets_updated_at BEFORE UPDATE ON datasets
+FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_experiments_updated_at ON experiments;
+CREATE TRIGGER trg_experiments_updated_at BEFORE UPDATE ON experiments
+FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Latest-job projection: experiments.latest_job mirrors the experiment's newest training job
+-- (id, status, progress, current_epoch, total_epochs, latest_metrics, timestamps) so experiment list/detail
+-- read one JSONB column instead of embedding every job. training_jobs.latest_metrics holds the last metric
+-- values written by the training metric writer. Kept current by the trigger below on job insert/update.
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS latest_metrics JSONB DEFAULT '{}';
+ALTER TABLE experiments ADD COLUMN IF NOT EXISTS latest_job JSONB;
+
+CREATE OR REPLACE FUNCTION sync_experiment_latest_job()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  UPDATE experiments e
+  SET latest_job = jsonb_build_object(
+    'id', NEW.id,
+    'status', NEW.status,
+    'progress', NEW.progress,
+    'current_epoch', NEW.current_epoch,
+    'total_epochs', NEW.total_epochs,
+    'latest_metrics', COALESCE(NEW.latest_metrics, '{}'::jsonb),
+    'created_at', NEW.created_at,
+    'started_at', NEW.started_at,
+    'completed_at', NEW.completed_at
+  )
+  WHERE e.id = NEW.experiment_id
+    AND (
+      e.latest_job IS NULL
+      OR e.latest_job->>'id' = NEW.id
+      OR (e.latest_job->>'created_at')::timestamptz <= NEW.created_at
+    );
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_training_jobs_latest_job ON training_jobs;
+CREATE TRIGGER trg_training_jobs_latest_job
+AFTER INSERT OR UPDATE OF status, progress, current_epoch, latest_metrics, started_at, completed_at ON training_jobs
+FOR EACH ROW EXECUTE FUNCTION sync_experiment_latest_job();
+
+-- Backfill for experiments created before the projection existed (the trigger keeps it current afterwards):
+--   UPDATE training_jobs j SET status = j.status
+--   WHERE j.created_at = (SELECT max(created_at) FROM training_jobs WHERE experiment_id = j.experiment_id);
+
 -- Metrics (references training_jobs)
 CREATE TABLE IF NOT EXISTS metrics (
   id TEXT PRIMARY KEY,
@@ -77,6 +147,299 @@ CREATE INDEX IF NOT EXISTS idx_metrics_job_id ON metrics(job_id);
 CREATE INDEX IF NOT EXISTS idx_metrics_epoch ON metrics(epoch);
 CREATE INDEX IF NOT EXISTS idx_metrics_job_epoch_step ON metrics(job_id, epoch, step);
 
+-- Metric rollups: running count/min/max/last/mean/M2 per metric, per job (epoch = -1) and per epoch.
+-- Maintained incrementally by the training metric writer; variance = m2 / count.
+CREATE TABLE IF NOT EXISTS metric_rollups (
+  job_id TEXT NOT NULL REFERENCES training_jobs(id) ON DELETE CASCADE,
+  epoch INTEGER NOT NULL,
+  metric VARCHAR(50) NOT NULL,
+  count BIGINT NOT NULL DEFAULT 0,
+  min DOUBLE PRECISION,
+  max DOUBLE PRECISION,
+  last DOUBLE PRECISION,
+  last_epoch INTEGER,
+  last_step INTEGER,
+  mean DOUBLE PRECISION DEFAULT 0,
+  m2 DOUBLE PRECISION DEFAULT 0,
+  PRIMARY KEY (job_id, epoch, metric)
+);
+
+-- Recompute a job's rollups from its metrics (backfill for jobs written before metric_rollups existed):
+--   SELECT rebuild_metric_rollups(id) FROM training_jobs;
+CREATE OR REPLACE FUNCTION rebuild_metric_rollups(p_job_id TEXT)
+RETURNS void
+LANGUAGE sql AS $$
+  DELETE FROM metric_rollups WHERE job_id = p_job_id;
+  INSERT INTO metric_rollups (job_id, epoch, metric, count, min, max, last, last_epoch, last_step, mean, m2)
+  SELECT p_job_id,
+         CASE WHEN GROUPING(v.epoch) = 1 THEN -1 ELSE v.epoch END,
+         v.metric,
+         count(*),
+         min(v.value),
+         max(v.value),
+         (array_agg(v.value ORDER BY v.epoch DESC, v.step DESC))[1],
+         (array_agg(v.epoch ORDER BY v.epoch DESC, v.step DESC))[1],
+         (array_agg(v.step ORDER BY v.epoch DESC, v.step DESC))[1],
+         avg(v.value),
+         COALESCE(var_pop(v.value) * count(*), 0)
+  FROM (
+    SELECT m.epoch, m.step, x.metric, x.value::DOUBLE PRECISION AS value
+    FROM metrics m
+    CROSS JOIN LATERAL (VALUES
+      ('loss', m.loss),
+      ('accuracy', m.accuracy),
+      ('learning_rate', m.learning_rate),
+      ('throughput', m.throughput),
+      ('gpu_utilization', m.gpu_utilization),
+      ('memory_used_gb', m.memory_used_gb)
+    ) AS x(metric, value)
+    WHERE m.job_id = p_job_id AND x.value IS NOT NULL
+  ) v
+  GROUP BY GROUPING SETS ((v.metric, v.epoch), (v.metric));
+$$;
+
+-- Metric downsampling (called via supabase.rpc from GET /jobs/{job_id}/metrics?max_points=...)
+-- Splits the job's series into p_buckets equal buckets and returns only the min and max point of p_metric
+-- in each bucket plus the first and last point, so at most 2 * p_buckets + 2 rows leave the database.
+-- point_index is the row's position in the full series (x axis for LTTB), total_points the full series length.
+CREATE OR REPLACE FUNCTION downsample_job_metrics(
+  p_job_id TEXT,
+  p_buckets INTEGER,
+  p_start_epoch INTEGER DEFAULT 0,
+  p_end_epoch INTEGER DEFAULT NULL,
+  p_metric TEXT DEFAULT 'loss'
+)
+RETURNS TABLE (
+  id TEXT,
+  job_id TEXT,
+  epoch INTEGER,
+  step INTEGER,
+  loss NUMERIC,
+  accuracy NUMERIC,
+  learning_rate NUMERIC,
+  throughput NUMERIC,
+  gpu_utilization NUMERIC,
+  memory_used_gb NUMERIC,
+  custom_metrics JSONB,
+  "timestamp" TIMESTAMPTZ,
+  point_index BIGINT,
+  total_points BIGINT
+)
+LANGUAGE sql STABLE AS $$
+  WITH series AS (
+    SELECT m.*,
+           CASE p_metric
+             WHEN 'accuracy' THEN m.accuracy
+             WHEN 'learning_rate' THEN m.learning_rate
+             WHEN 'throughput' THEN m.throughput
+             WHEN 'gpu_utilization' THEN m.gpu_utilization
+             WHEN 'memory_used_gb' THEN m.memory_used_gb
+             ELSE m.loss
+           END AS v,
+           row_number() OVER (ORDER BY m.epoch, m.step) - 1 AS rn,
+           count(*) OVER () AS n
+    FROM metrics m
+    WHERE m.job_id = p_job_id
+      AND m.epoch >= COALESCE(p_start_epoch, 0)
+      AND (p_end_epoch IS NULL OR m.epoch <= p_end_epoch)
+  ),
+  ranked AS (
+    SELECT s.*,
+           row_number() OVER (PARTITION BY (s.rn * GREATEST(p_buckets, 1) / s.n) ORDER BY s.v ASC NULLS LAST, s.rn) AS lo,
+           row_number() OVER (PARTITION BY (s.rn * GREATEST(p_buckets, 1) / s.n) ORDER BY s.v DESC NULLS LAST, s.rn) AS hi
+    FROM series s
+  )
+  SELECT r.id, r.job_id, r.epoch, r.step, r.loss, r.accuracy, r.learning_rate, r.throughput,
+         r.gpu_utilization, r.memory_used_gb, r.custom_metrics, r."timestamp", r.rn, r.n
+  FROM ranked r
+  WHERE r.lo = 1 OR r.hi = 1 OR r.rn = 0 OR r.rn = r.n - 1
+  ORDER BY r.rn;
+$$;
+
+-- Tiered metrics retention (backend/app/services/retention.py). Finished jobs keep their raw metrics rows for
+-- METRIC_RETENTION_FULL_DAYS, then trade them for two downsampled tiers: per-k-step (resolution = k steps per
+-- bucket) and per-epoch (resolution = 0). After METRIC_RETENTION_STEP_DAYS only the per-epoch tier is kept.
+-- Each tier row averages its bucket's raw rows and keeps the bucket's first step and latest timestamp.
+-- metric_rollups are left as they are, so summaries stay exact.
+CREATE TABLE IF NOT EXISTS metrics_downsampled (
+  job_id TEXT NOT NULL REFERENCES training_jobs(id) ON DELETE CASCADE,
+  resolution INTEGER NOT NULL,
+  epoch INTEGER NOT NULL,
+  step INTEGER NOT NULL,
+  points INTEGER NOT NULL,
+  loss DOUBLE PRECISION,
+  accuracy DOUBLE PRECISION,
+  learning_rate DOUBLE PRECISION,
+  throughput DOUBLE PRECISION,
+  gpu_utilization DOUBLE PRECISION,
+  memory_used_gb DOUBLE PRECISION,
+  "timestamp" TIMESTAMPTZ,
+  PRIMARY KEY (job_id, resolution, epoch, step)
+);
+
+-- Finest metrics resolution still stored per job: 'full' (metrics rows), 'step' or 'epoch' (tiers above)
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS metrics_tier VARCHAR(10) NOT NULL DEFAULT 'full';
+CREATE INDEX IF NOT EXISTS idx_training_jobs_tier_completed ON training_jobs(metrics_tier, completed_at);
+
+-- Move a finished job down to p_tier ('step' or 'epoch'; from 'full' both tiers are written and the raw rows
+-- deleted). The job row is locked, so concurrent sweeps are safe; already-compacted jobs are left alone.
+-- Returns the number of rows removed.
+CREATE OR REPLACE FUNCTION compact_job_metrics(p_job_id TEXT, p_tier TEXT, p_step_bucket INTEGER DEFAULT 100)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  v_tier TEXT;
+  v_rows INTEGER;
+  v_removed INTEGER := 0;
+BEGIN
+  SELECT metrics_tier INTO v_tier FROM training_jobs
+  WHERE id = p_job_id AND status IN ('completed', 'failed', 'cancelled')
+  FOR UPDATE;
+  IF v_tier IS NULL OR p_tier NOT IN ('step', 'epoch') THEN
+    RETURN 0;
+  END IF;
+
+  IF v_tier = 'full' THEN
+    INSERT INTO metrics_downsampled (job_id, resolution, epoch, step, points, loss, accuracy, learning_rate,
+                                     throughput, gpu_utilization, memory_used_gb, "timestamp")
+    SELECT p_job_id, b.resolution, m.epoch, min(m.step), count(*),
+           avg(m.loss), avg(m.accuracy), avg(m.learning_rate), avg(m.throughput),
+           avg(m.gpu_utilization), avg(m.memory_used_gb), max(m."timestamp")
+    FROM metrics m
+    CROSS JOIN (VALUES (GREATEST(p_step_bucket, 1)), (0)) AS b(resolution)
+    WHERE m.job_id = p_job_id
+    GROUP BY b.resolution, m.epoch, CASE WHEN b.resolution = 0 THEN 0 ELSE m.step / b.resolution END
+    ON CONFLICT DO NOTHING;
+    DELETE FROM metrics WHERE job_id = p_job_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_removed := v_removed + v_rows;
+    v_tier := 'step';
+  END IF;
+
+  IF v_tier = 'step' AND p_tier = 'epoch' THEN
+    DELETE FROM metrics_downsampled WHERE job_id = p_job_id AND resolution > 0;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_removed := v_removed + v_rows;
+    v_tier := 'epoch';
+  END IF;
+
+  UPDATE training_jobs SET metrics_tier = v_tier WHERE id = p_job_id;
+  RETURN v_removed;
+END;
+$$;
+
+-- Durable training queue (backend/app/services/job_leases.py). training_jobs is the queue: a job is held by one
+-- worker process at a time through a lease (lease_owner until lease_expires_at) that the worker renews while
+-- the job is queued or running there. A pending or running job whose lease expired (its worker died or was
+-- redeployed) is reaped by another worker, which resumes it after its last written metric row.
+-- Pending jobs nobody has leased yet get one lease period of grace from created_at.
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS priority INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE training_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_training_jobs_active_lease ON training_jobs(lease_expires_at)
+  WHERE status IN ('pending', 'running');
+
+-- Start (or resume) a job on p_worker: only if it is unleased, already leased to p_worker, or its lease expired.
+-- Returns the job row, or nothing if another worker holds it or it is no longer pending/running.
+CREATE OR REPLACE FUNCTION claim_training_job(p_job_id TEXT, p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF training_jobs
+LANGUAGE sql AS $$
+  UPDATE training_jobs
+  SET status = 'running',
+      lease_owner = p_worker,
+      lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+      started_at = COALESCE(started_at, now()),
+      attempts = attempts + 1
+  WHERE id = p_job_id
+    AND status IN ('pending', 'running')
+    AND (lease_owner = p_worker OR COALESCE(lease_expires_at, '-infinity') < now())
+  RETURNING *;
+$$;
+
+-- Heartbeat: extend p_worker's leases on the given jobs (and take unleased pending ones).
+-- Returns the ids still held; the worker stops whatever is missing.
+CREATE OR REPLACE FUNCTION renew_job_leases(p_worker TEXT, p_job_ids TEXT[], p_lease_seconds INTEGER)
+RETURNS TABLE (id TEXT)
+LANGUAGE sql AS $$
+  UPDATE training_jobs j
+  SET lease_owner = p_worker, lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+  WHERE j.id = ANY(p_job_ids)
+    AND j.status IN ('pending', 'running')
+    AND (j.lease_owner = p_worker OR (j.lease_owner IS NULL AND j.status = 'pending'))
+  RETURNING j.id;
+$$;
+
+-- Lease up to p_limit orphaned jobs (expired lease, highest priority and oldest first) to p_worker, with what
+-- the worker needs to run them. Concurrent reapers skip each other's rows.
+CREATE OR REPLACE FUNCTION reap_training_jobs(p_worker TEXT, p_lease_seconds INTEGER, p_limit INTEGER)
+RETURNS TABLE (
+  id TEXT,
+  experiment_id TEXT,
+  status VARCHAR,
+  priority INTEGER,
+  config JSONB,
+  created_by VARCHAR,
+  tags JSONB
+)
+LANGUAGE sql AS $$
+  WITH orphaned AS (
+    SELECT j.id
+    FROM training_jobs j
+    WHERE j.status IN ('pending', 'running')
+      AND COALESCE(j.lease_expires_at, j.created_at + make_interval(secs => p_lease_seconds)) < now()
+    ORDER BY j.priority DESC, j.created_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  ),
+  leased AS (
+    UPDATE training_jobs j
+    SET lease_owner = p_worker, lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    FROM orphaned o
+    WHERE j.id = o.id
+    RETURNING j.id, j.experiment_id, j.status, j.priority
+  )
+  SELECT l.id, l.experiment_id, l.status, l.priority, x.config, x.created_by, x.tags
+  FROM leased l
+  JOIN experiments x ON x.id = l.experiment_id;
+$$;
+
+-- Hand p_worker's leases on the given jobs back (graceful shutdown), so other workers reap them right away.
+CREATE OR REPLACE FUNCTION release_job_leases(p_worker TEXT, p_job_ids TEXT[])
+RETURNS INTEGER
+LANGUAGE sql AS $$
+  WITH released AS (
+    UPDATE training_jobs
+    SET lease_expires_at = now()
+    WHERE id = ANY(p_job_ids) AND lease_owner = p_worker AND status IN ('pending', 'running')
+    RETURNING 1
+  )
+  SELECT count(*)::INTEGER FROM released;
+$$;
+
+-- Dashboard overview (called via supabase.rpc from GET /stats/overview): grouped counts instead of full-table reads.
+CREATE OR REPLACE FUNCTION stats_overview()
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+  SELECT jsonb_build_object(
+    'experiments_by_status',
+      (SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb)
+       FROM (SELECT status, count(*) AS n FROM experiments GROUP BY status) e),
+    'datasets_by_modality',
+      (SELECT COALESCE(jsonb_object_agg(modality, n), '{}'::jsonb)
+       FROM (SELECT modality, count(*) AS n FROM datasets GROUP BY modality) d),
+    'datasets_total_size_bytes',
+      (SELECT COALESCE(sum(size_bytes), 0) FROM datasets),
+    'jobs_by_status',
+      (SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb)
+       FROM (SELECT status, count(*) AS n FROM training_jobs GROUP BY status) j),
+    'avg_job_duration_minutes',
+      (SELECT COALESCE(avg(EXTRACT(EPOCH FROM (completed_at - started_at)) / 60), 0)
+       FROM training_jobs
+       WHERE status = 'completed' AND started_at IS NOT NULL AND completed_at IS NOT NULL)
+  );
+$$;
+
 -- Row Level Security (RLS): allow service role full access; enable if you use anon key
 -- ALTER TABLE datasets ENABLE ROW LEVEL SECURITY;
 -- ALTER TABLE experiments ENABLE ROW LEVEL SECURITY;